@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+Load and regression benchmarks for the docker model services
+
+Sends synthetic workloads (see workloads.py) at one or more concurrency levels
+to voiceapi, nomic-embed, rapidocr and yunet running locally, and records
+throughput plus p50/p90/p99 latency per endpoint scenario. Payloads are
+generated up front, so generation cost is not measured and nothing is fetched
+from the network.
+
+Results are written as JSON. Given a baseline (a results file from an earlier
+run), the run fails with exit code 1 when a scenario regresses:
+- throughput drops by more than --tolerance
+- p50 latency rises by more than --tolerance, or p99 by more than --p99-tolerance
+  (latency changes under --min-delta-ms are ignored as noise)
+- the error rate rises by more than one percentage point
+- it is in the baseline and selected by --services, --scenarios and
+  --concurrency but has no result (e.g. its service is unreachable)
+
+Usage:
+    python benchmark/run_benchmarks.py                                  # all reachable services
+    python benchmark/run_benchmarks.py --services rapidocr,yunet --concurrency 1,4,8
+    python benchmark/run_benchmarks.py --url nomic=http://localhost:8010 --requests 100
+    python benchmark/run_benchmarks.py --update-baseline                # record a new baseline
+
+Service URLs default to the ports used by test-all-services.sh and can also be
+set with RAPIDOCR_URL, YUNET_URL, NOMIC_URL and VOICEAPI_URL.
+"""
+
+import argparse
+import base64
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from workloads import make_photo, make_screenshot, make_text, make_tone  # noqa: E402
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, "baseline.json")
+DEFAULT_OUTPUT = os.path.join(BENCHMARK_DIR, "results.json")
+
+DEFAULT_URLS = {
+    "rapidocr": "http://localhost:8000",
+    "yunet": "http://localhost:8002",
+    "nomic": "http://localhost:8003",
+    "voiceapi": "http://localhost:8257",
+}
+
+OCTET_STREAM = {"Content-Type": "application/octet-stream"}
+
+
+def b64(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
+
+
+@dataclass
+class Scenario:
+    """One endpoint under one synthetic workload"""
+
+    service: str
+    name: str
+    path: str
+    # Builds the keyword arguments for one requests.post call (json=, data=, params=, headers=)
+    build: Callable[[np.random.Generator], Dict[str, Any]]
+
+
+SCENARIOS: List[Scenario] = [
+    # RapidOCR: phone and desktop screenshots, small base64 images, batches
+    Scenario("rapidocr", "raw_phone_screenshot", "/ocr/raw",
+             lambda rng: {"data": make_screenshot(rng, (1080, 2340)), "headers": OCTET_STREAM}),
+    Scenario("rapidocr", "raw_desktop_screenshot", "/ocr/raw",
+             lambda rng: {"data": make_screenshot(rng, (1920, 1080), font_size=18), "headers": OCTET_STREAM}),
+    Scenario("rapidocr", "base64_small", "/ocr/base64",
+             lambda rng: {"json": {"image_base64": b64(make_screenshot(rng, (640, 360)))}}),
+    Scenario("rapidocr", "batch_8", "/ocr/batch",
+             lambda rng: {"json": {"images_base64": [b64(make_screenshot(rng, (640, 360))) for _ in range(8)]}}),
+    # YuNet: photo sizes from webcam frames to 12 MP phone shots
+    Scenario("yunet", "raw_vga_1_face", "/face-detect/raw",
+             lambda rng: {"data": make_photo(rng, (640, 480), faces=1), "headers": OCTET_STREAM}),
+    Scenario("yunet", "raw_12mp_3_faces", "/face-detect/raw",
+             lambda rng: {"data": make_photo(rng, (4032, 3024), faces=3), "headers": OCTET_STREAM}),
+    Scenario("yunet", "base64_hd_2_faces", "/face-detect/base64",
+             lambda rng: {"json": {"image_base64": b64(make_photo(rng, (1280, 720), faces=2))}}),
+    # Nomic: queries, document batches, long chunked documents, images
+    Scenario("nomic", "text_query", "/embed/text",
+             lambda rng: {"json": {"text": make_text(rng, int(rng.integers(4, 12))), "task": "search_query"}}),
+    Scenario("nomic", "text_batch_32", "/embed/text",
+             lambda rng: {"json": {"text": [make_text(rng, int(rng.integers(20, 120))) for _ in range(32)]}}),
+    Scenario("nomic", "text_chunked_long", "/embed/text/chunked",
+             lambda rng: {"json": {"documents": [make_text(rng, int(rng.integers(1500, 3000)))]}}),
+    Scenario("nomic", "image_raw", "/embed/image/raw",
+             lambda rng: {"data": make_photo(rng, (1024, 768), faces=1), "headers": OCTET_STREAM}),
+    Scenario("nomic", "image_base64_batch_4", "/embed/image/base64",
+             lambda rng: {"json": {"image_base64": [b64(make_photo(rng, (640, 480), faces=1)) for _ in range(4)]}}),
+    # Voice: short commands to longer utterances
+    Scenario("voiceapi", "raw_2s", "/process/raw",
+             lambda rng: {"data": make_tone(rng, 2.0), "headers": OCTET_STREAM}),
+    Scenario("voiceapi", "raw_10s", "/process/raw",
+             lambda rng: {"data": make_tone(rng, 10.0), "headers": OCTET_STREAM}),
+    Scenario("voiceapi", "base64_5s", "/process/base64",
+             lambda rng: {"json": {"audio_base64": b64(make_tone(rng, 5.0))}}),
+]
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    return round(float(np.percentile(values, q)), 2)
+
+
+def is_success(response: requests.Response) -> bool:
+    """2xx and, for JSON bodies, no "success": false"""
+    if not response.ok:
+        return False
+    if "application/json" not in response.headers.get("content-type", ""):
+        return True  # NDJSON streams and the like
+    try:
+        body = response.json()
+    except ValueError:
+        return False
+    return not (isinstance(body, dict) and body.get("success") is False)
+
+
+def service_available(url: str) -> bool:
+    for path in ("/health", "/healthz"):
+        try:
+            if requests.get(f"{url}{path}", timeout=5).ok:
+                return True
+        except requests.RequestException:
+            pass
+    return False
+
+
+def run_scenario(
+    url: str,
+    scenario: Scenario,
+    payloads: List[Dict[str, Any]],
+    concurrency: int,
+    total_requests: int,
+    warmup: int,
+    timeout: float,
+    headers: Dict[str, str],
+) -> Dict[str, Any]:
+    """Fire total_requests at the endpoint from `concurrency` threads and summarize"""
+    local = threading.local()
+
+    def send(index: int) -> Tuple[float, str, bool]:
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        kwargs = dict(payloads[index % len(payloads)])
+        kwargs["headers"] = {**headers, **kwargs.get("headers", {})}
+        start = time.perf_counter()
+        try:
+            response = session.post(f"{url}{scenario.path}", timeout=timeout, **kwargs)
+            ok = is_success(response)
+            status = str(response.status_code)
+        except requests.RequestException as e:
+            ok, status = False, type(e).__name__
+        return (time.perf_counter() - start) * 1000, status, ok
+
+    for i in range(warmup):
+        send(i)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        samples = list(executor.map(send, range(total_requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for latency, _, ok in samples if ok]
+    succeeded = len(latencies)
+    return {
+        "service": scenario.service,
+        "scenario": scenario.name,
+        "endpoint": scenario.path,
+        "concurrency": concurrency,
+        "requests": total_requests,
+        "succeeded": succeeded,
+        "error_rate": round(1 - succeeded / total_requests, 4) if total_requests else 0.0,
+        "status_counts": dict(Counter(status for _, status, _ in samples)),
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(succeeded / elapsed, 3) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(float(np.mean(latencies)), 2) if latencies else None,
+            "p50": percentile(latencies, 50),
+            "p90": percentile(latencies, 90),
+            "p99": percentile(latencies, 99),
+            "max": round(max(latencies), 2) if latencies else None,
+        },
+    }
+
+
+def result_key(result: Dict[str, Any]) -> str:
+    return f"{result['service']}/{result['scenario']}@c{result['concurrency']}"
+
+
+def compare(
+    results: List[Dict[str, Any]],
+    baseline: List[Dict[str, Any]],
+    tolerance: float,
+    p99_tolerance: float,
+    min_delta_ms: float,
+) -> List[str]:
+    """Describe every regression of results against baseline (empty when there are none)"""
+    previous = {result_key(result): result for result in baseline}
+    regressions = []
+    for result in results:
+        key = result_key(result)
+        before = previous.get(key)
+        if before is None:
+            continue
+
+        if result["error_rate"] > before["error_rate"] + 0.01:
+            regressions.append(f"{key}: error rate {before['error_rate']:.2%} -> {result['error_rate']:.2%}")
+        if before["throughput_rps"] and result["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+            regressions.append(
+                f"{key}: throughput {before['throughput_rps']:.2f} -> {result['throughput_rps']:.2f} req/s"
+            )
+        for name, allowed in (("p50", tolerance), ("p99", p99_tolerance)):
+            old, new = before["latency_ms"][name], result["latency_ms"][name]
+            if old is None or new is None:
+                continue
+            if new > old * (1 + allowed) and new - old > min_delta_ms:
+                regressions.append(f"{key}: {name} latency {old:.1f} -> {new:.1f} ms")
+    return regressions
+
+
+def missing_results(
+    results: List[Dict[str, Any]],
+    baseline: List[Dict[str, Any]],
+    services: List[str],
+    scenario_names: Set[str],
+    levels: List[int],
+) -> List[str]:
+    """Baseline scenarios this run selected but did not produce a result for"""
+    produced = {result_key(result) for result in results}
+    missing = []
+    for before in baseline:
+        if before["service"] not in services or before["concurrency"] not in levels:
+            continue
+        if scenario_names and before["scenario"] not in scenario_names:
+            continue
+        key = result_key(before)
+        if key not in produced:
+            missing.append(f"{key}: in the baseline but no result in this run")
+    return missing
+
+
+def print_table(results: List[Dict[str, Any]]) -> None:
+    print(f"{'scenario':<42} {'conc':>4} {'ok':>9} {'req/s':>8} {'p50 ms':>9} {'p99 ms':>9}")
+    for result in results:
+        latency = result["latency_ms"]
+        print(
+            f"{result['service'] + '/' + result['scenario']:<42} {result['concurrency']:>4} "
+            f"{result['succeeded']:>4}/{result['requests']:<4} {result['throughput_rps']:>8.2f} "
+            f"{latency['p50'] if latency['p50'] is not None else '-':>9} "
+            f"{latency['p99'] if latency['p99'] is not None else '-':>9}"
+        )
+
+
+def parse_urls(overrides: List[str]) -> Dict[str, str]:
+    urls = {
+        service: os.environ.get(f"{service.upper()}_URL", default)
+        for service, default in DEFAULT_URLS.items()
+    }
+    for override in overrides:
+        service, _, url = override.partition("=")
+        if service not in urls or not url:
+            raise SystemExit(f"--url expects SERVICE=URL with SERVICE in {sorted(urls)}, got {override!r}")
+        urls[service] = url.rstrip("/")
+    return urls
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--services", default=",".join(DEFAULT_URLS), help="Comma-separated services to run")
+    parser.add_argument("--scenarios", default="", help="Comma-separated scenario names (default: all)")
+    parser.add_argument("--url", action="append", default=[], metavar="SERVICE=URL", help="Override a service URL")
+    parser.add_argument("--concurrency", default="1,4", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=40, help="Measured requests per scenario and level")
+    parser.add_argument("--warmup", type=int, default=3, help="Unmeasured requests before each measurement")
+    parser.add_argument("--variants", type=int, default=6, help="Distinct payloads generated per scenario")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+    parser.add_argument("--priority", choices=["interactive", "batch"], help="Send an X-Priority header")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Where to write the results JSON")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Results file to compare against")
+    parser.add_argument("--update-baseline", action="store_true", help="Write these results to --baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed throughput / p50 regression")
+    parser.add_argument("--p99-tolerance", type=float, default=0.5, help="Allowed p99 regression")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0, help="Ignore latency changes smaller than this")
+    parser.add_argument("--require-all", action="store_true", help="Fail if a selected service is unreachable")
+    args = parser.parse_args()
+
+    urls = parse_urls(args.url)
+    services = [service.strip() for service in args.services.split(",") if service.strip()]
+    unknown = set(services) - set(urls)
+    if unknown:
+        parser.error(f"Unknown services: {', '.join(sorted(unknown))}")
+    scenario_names = {name.strip() for name in args.scenarios.split(",") if name.strip()}
+    levels = [int(level) for level in args.concurrency.split(",")]
+    headers = {"X-Priority": args.priority} if args.priority else {}
+
+    results: List[Dict[str, Any]] = []
+    skipped: Dict[str, str] = {}
+    for service in services:
+        url = urls[service]
+        if not service_available(url):
+            print(f"{service}: not reachable at {url}, skipping")
+            skipped[service] = url
+            continue
+
+        for scenario in SCENARIOS:
+            if scenario.service != service or (scenario_names and scenario.name not in scenario_names):
+                continue
+            rng = np.random.default_rng(args.seed)
+            payloads = [scenario.build(rng) for _ in range(args.variants)]
+            for concurrency in levels:
+                print(f"{service}/{scenario.name} at concurrency {concurrency}...", flush=True)
+                results.append(run_scenario(
+                    url, scenario, payloads, concurrency, args.requests, args.warmup, args.timeout, headers
+                ))
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "host": platform.node(),
+        "settings": {
+            "urls": {service: urls[service] for service in services},
+            "concurrency": levels,
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "variants": args.variants,
+            "priority": args.priority,
+            "seed": args.seed,
+        },
+        "skipped": skipped,
+        "results": results,
+    }
+
+    print()
+    print_table(results)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    exit_code = 0
+    if skipped and args.require_all:
+        print(f"Unreachable services: {', '.join(skipped)}")
+        exit_code = 1
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline updated: {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = missing_results(results, baseline, services, scenario_names, levels)
+        regressions += compare(results, baseline, args.tolerance, args.p99_tolerance, args.min_delta_ms)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            exit_code = 1
+        else:
+            print(f"No regressions against {args.baseline}")
+    else:
+        print(f"No baseline at {args.baseline}; run with --update-baseline to record one")
+
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+Synthetic, deterministic payloads for the service benchmarks
+
+Everything is generated locally from a seed so runs are repeatable and need no
+network access:
+- screenshots: PNGs of rendered text lines at several resolutions (rapidocr)
+- photos: JPEGs with faces pasted onto a textured background, plus a caption
+  (yunet, nomic). Faces come from yunet's test fixtures; when those are missing
+  a drawn face is used, which exercises the same code path but may not be
+  detected.
+- tones: 16 kHz mono int16 PCM with speech-like harmonics and a syllable-rate
+  envelope (voiceapi)
+- texts: word sequences from short queries to multi-window documents (nomic)
+"""
+
+import io
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+DOCKER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FACE_FIXTURES = [
+    os.path.join(DOCKER_DIR, "yunet-face-detection-raw-api", "test", name)
+    for name in ("test-face.jpg", "test-face2.jpg")
+]
+SAMPLE_RATE = 16000
+
+WORDS = (
+    "the a meeting at noon with alice about quarterly budget review screen shows terminal output "
+    "error message build passed deploy service latency dashboard location home office walk coffee "
+    "shop train station calendar reminder email from bob regarding invoice payment due friday "
+    "photo of family dinner birthday cake candles garden sunset beach mountain trail notes todo "
+    "list groceries milk bread eggs recording voice memo transcript summary project roadmap "
+    "kubernetes cluster database migration backup restore kafka topic consumer lag embedding "
+    "vector search index query result page loading please wait settings privacy battery low"
+).split()
+
+
+def make_text(rng: np.random.Generator, words: int) -> str:
+    """Sentence-cased pseudo text of the given word count"""
+    tokens = [WORDS[i] for i in rng.integers(0, len(WORDS), size=words)]
+    sentences, start = [], 0
+    while start < len(tokens):
+        end = min(len(tokens), start + int(rng.integers(6, 18)))
+        sentence = " ".join(tokens[start:end])
+        sentences.append(sentence[0].upper() + sentence[1:] + ".")
+        start = end
+    return " ".join(sentences)
+
+
+def _font(size: int) -> ImageFont.ImageFont:
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:  # Pillow < 10.1 has a single fixed-size bitmap font
+        return ImageFont.load_default()
+
+
+def _encode(image: Image.Image, image_format: str) -> bytes:
+    buffer = io.BytesIO()
+    if image_format == "JPEG":
+        image.save(buffer, format="JPEG", quality=90)
+    else:
+        image.save(buffer, format=image_format)
+    return buffer.getvalue()
+
+
+def make_screenshot(rng: np.random.Generator, size: Tuple[int, int], font_size: int = 22) -> bytes:
+    """PNG of dark-on-light text lines filling the frame, like a phone or desktop screenshot"""
+    width, height = size
+    image = Image.new("RGB", size, (250, 250, 250))
+    draw = ImageDraw.Draw(image)
+    font = _font(font_size)
+    line_height = int(font_size * 1.6)
+    y = line_height // 2
+    while y + line_height < height:
+        if rng.random() < 0.15:
+            y += line_height  # blank line between paragraphs
+            continue
+        words = int(rng.integers(3, max(4, width // (font_size * 4))))
+        draw.text((font_size, y), make_text(rng, words)[: width // (font_size // 2)], fill=(30, 30, 30), font=font)
+        y += line_height
+    return _encode(image, "PNG")
+
+
+def _load_faces() -> List[Image.Image]:
+    faces = []
+    for path in FACE_FIXTURES:
+        if os.path.exists(path):
+            faces.append(Image.open(path).convert("RGB"))
+    return faces
+
+
+def _drawn_face(size: int) -> Image.Image:
+    face = Image.new("RGB", (size, size), (120, 140, 160))
+    draw = ImageDraw.Draw(face)
+    draw.ellipse((size * 0.15, size * 0.05, size * 0.85, size * 0.95), fill=(224, 180, 150))
+    for x in (0.35, 0.65):
+        draw.ellipse((size * (x - 0.06), size * 0.35, size * (x + 0.06), size * 0.43), fill=(40, 30, 30))
+    draw.polygon([(size * 0.5, size * 0.45), (size * 0.45, size * 0.62), (size * 0.55, size * 0.62)], fill=(200, 150, 120))
+    draw.arc((size * 0.35, size * 0.62, size * 0.65, size * 0.8), 20, 160, fill=(150, 60, 60), width=max(1, size // 40))
+    return face
+
+
+def make_photo(
+    rng: np.random.Generator,
+    size: Tuple[int, int],
+    faces: int = 1,
+    sources: Optional[List[Image.Image]] = None,
+) -> bytes:
+    """JPEG with `faces` face images on a noisy gradient background and a caption strip"""
+    width, height = size
+    gradient = np.linspace(60, 200, width, dtype=np.float32)[None, :, None]
+    noise = rng.normal(0, 12, size=(height, width, 3)).astype(np.float32)
+    background = np.clip(gradient + noise + rng.integers(-30, 30, size=3), 0, 255).astype(np.uint8)
+    image = Image.fromarray(background)
+
+    sources = sources if sources is not None else _load_faces()
+    tile = min(width, height) // max(1, min(faces, 3))
+    for i in range(faces):
+        face_size = int(tile * rng.uniform(0.5, 0.9))
+        face = sources[i % len(sources)].resize((face_size, face_size)) if sources else _drawn_face(face_size)
+        x = int(rng.integers(0, max(1, width - face_size)))
+        y = int(rng.integers(0, max(1, height - face_size)))
+        image.paste(face, (x, y))
+
+    draw = ImageDraw.Draw(image)
+    caption_height = max(24, height // 16)
+    draw.rectangle((0, height - caption_height, width, height), fill=(0, 0, 0))
+    draw.text((8, height - caption_height + 4), make_text(rng, 8), fill=(255, 255, 255), font=_font(caption_height // 2))
+    return _encode(image, "JPEG")
+
+
+def make_tone(rng: np.random.Generator, seconds: float) -> bytes:
+    """Speech-like 16 kHz int16 PCM: a gliding fundamental with harmonics under a ~4 Hz envelope"""
+    t = np.arange(int(seconds * SAMPLE_RATE), dtype=np.float32) / SAMPLE_RATE
+    f0 = rng.uniform(100, 220) * (1 + 0.1 * np.sin(2 * np.pi * rng.uniform(0.2, 0.6) * t))
+    phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+    signal = sum(np.sin(k * phase) / k for k in range(1, 5))
+    envelope = np.clip(np.sin(2 * np.pi * rng.uniform(3, 5) * t), 0, None) ** 0.5
+    audio = signal * envelope + rng.normal(0, 0.02, size=t.shape)
+    audio = 0.3 * audio / max(1e-6, float(np.abs(audio).max()))
+    return (audio * 32767).astype(np.int16).tobytes()
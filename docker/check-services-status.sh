@@ -3,6 +3,9 @@
 # Quick Docker Services Status Check
 # Shows which services are running and their ports
 
+# Directory containing this script and the service directories
+BASE_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+
 # Colors
 RED='\033[0;31m'
 GREEN='\033[0;32m'
@@ -51,9 +54,9 @@ docker ps --format "table {{.Names}}\t{{.Status}}\t{{.Ports}}" | head -20
 
 echo ""
 echo -e "${BLUE}To start a service:${NC}"
-echo "  cd /home/aoi/code/loomv4/docker/<service-name>"
+echo "  cd $BASE_DIR/<service-name>"
 echo "  docker compose up -d --build"
 
 echo ""
 echo -e "${BLUE}To test all services:${NC}"
-echo "  /home/aoi/code/loomv4/docker/test-all-services.sh"
\ No newline at end of file
+echo "  $BASE_DIR/test-all-services.sh"
\ No newline at end of file
@@ -0,0 +1,251 @@
+"""
+Admission control and priority scheduling for the model services
+
+Shared by nomic-embed-api, rapidocr-raw-api, voiceapi-raw-api and
+yunet-face-detection-raw-api (each image builds from its own directory, so the
+module is copied into all of them; keep the copies identical).
+
+Without it, a backfill that floods a service queues every request in front of
+live device traffic, and those requests time out while they wait. This ASGI
+middleware gates POST requests (the inference endpoints) before they reach the
+app:
+
+- At most max_concurrency requests run at once. Batch work may use at most
+  batch_concurrency of those slots, so interactive requests always have room.
+- The X-Priority header ("interactive" or "batch") picks the class. A freed
+  slot goes to the oldest interactive waiter first.
+- Each request has a deadline: the X-Request-Timeout header (seconds), or the
+  class default. A request that would wait past its deadline, or whose class
+  queue is full, is rejected up front with 429 and a Retry-After estimate.
+  One that expires while queued gets a 504 and never reaches inference.
+- Queue depth, wait and service time percentiles per class come from metrics().
+"""
+
+import asyncio
+import json
+import math
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+PRIORITIES = ("interactive", "batch")
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is not admitted"""
+
+    def __init__(self, status_code: int, reason: str, retry_after: Optional[int] = None):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+def _percentile(values: Deque[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 2)
+
+
+class AdmissionController:
+    """Concurrency slots with two priority queues and per-request deadlines"""
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        batch_concurrency: Optional[int] = None,
+        max_queue: int = 64,
+        batch_max_queue: int = 1024,
+        interactive_timeout: float = 30.0,
+        batch_timeout: float = 600.0,
+        default_priority: str = "interactive",
+        window: int = 1000,
+    ):
+        if default_priority not in PRIORITIES:
+            raise ValueError(f"Unknown priority: {default_priority}")
+        self.max_concurrency = max(1, max_concurrency)
+        # Leave at least one slot to interactive traffic unless there is only one
+        self.batch_concurrency = max(1, min(
+            batch_concurrency if batch_concurrency else self.max_concurrency - 1, self.max_concurrency
+        ))
+        self.max_queue = {"interactive": max_queue, "batch": batch_max_queue}
+        self.timeouts = {"interactive": interactive_timeout, "batch": batch_timeout}
+        self.default_priority = default_priority
+
+        self.in_flight = {priority: 0 for priority in PRIORITIES}
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {priority: deque() for priority in PRIORITIES}
+        # Smoothed service time drives Retry-After and the up-front deadline check
+        self._service_ewma = 0.1
+        self._wait_ms = {priority: deque(maxlen=window) for priority in PRIORITIES}
+        self._service_ms = {priority: deque(maxlen=window) for priority in PRIORITIES}
+        self.stats = {
+            priority: {"admitted": 0, "completed": 0, "rejected": 0, "expired": 0}
+            for priority in PRIORITIES
+        }
+
+    @classmethod
+    def from_env(cls, default_concurrency: int) -> "AdmissionController":
+        """Build from ADMISSION_* environment variables"""
+        return cls(
+            max_concurrency=int(os.environ.get("ADMISSION_MAX_CONCURRENCY", str(default_concurrency))),
+            batch_concurrency=int(os.environ.get("ADMISSION_BATCH_CONCURRENCY") or 0) or None,
+            max_queue=int(os.environ.get("ADMISSION_MAX_QUEUE", "64")),
+            batch_max_queue=int(os.environ.get("ADMISSION_BATCH_MAX_QUEUE", "1024")),
+            interactive_timeout=float(os.environ.get("ADMISSION_INTERACTIVE_TIMEOUT", "30")),
+            batch_timeout=float(os.environ.get("ADMISSION_BATCH_TIMEOUT", "600")),
+            default_priority=os.environ.get("ADMISSION_DEFAULT_PRIORITY", "interactive"),
+        )
+
+    def settings(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "batch_concurrency": self.batch_concurrency,
+            "max_queue": self.max_queue,
+            "timeouts": self.timeouts,
+            "default_priority": self.default_priority,
+        }
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            priority: {
+                **self.stats[priority],
+                "queued": self.queued(priority),
+                "in_flight": self.in_flight[priority],
+                "wait_ms_p50": _percentile(self._wait_ms[priority], 0.5),
+                "wait_ms_p99": _percentile(self._wait_ms[priority], 0.99),
+                "service_ms_p50": _percentile(self._service_ms[priority], 0.5),
+                "service_ms_p99": _percentile(self._service_ms[priority], 0.99),
+            }
+            for priority in PRIORITIES
+        }
+
+    def queued(self, priority: str) -> int:
+        return sum(1 for waiter in self._waiters[priority] if not waiter.done())
+
+    def _has_slot(self, priority: str) -> bool:
+        total = self.in_flight["interactive"] + self.in_flight["batch"]
+        if total >= self.max_concurrency:
+            return False
+        return priority == "interactive" or self.in_flight["batch"] < self.batch_concurrency
+
+    def _dispatch(self) -> None:
+        """Hand free slots to waiters, interactive first"""
+        for priority in PRIORITIES:
+            waiters = self._waiters[priority]
+            while waiters and self._has_slot(priority):
+                waiter = waiters.popleft()
+                if waiter.done():
+                    continue  # expired or disconnected while queued
+                self.in_flight[priority] += 1
+                waiter.set_result(None)
+
+    def estimated_wait(self, priority: str) -> float:
+        """Seconds until a new request of this class would start, from the smoothed service time"""
+        ahead = self.queued("interactive") + self.in_flight["interactive"] + self.in_flight["batch"]
+        slots = self.max_concurrency
+        if priority == "batch":
+            ahead += self.queued("batch")
+            slots = self.batch_concurrency
+        return max(0, ahead - slots + 1) * self._service_ewma / slots
+
+    def _retry_after(self, priority: str) -> int:
+        return max(1, math.ceil(self.estimated_wait(priority)))
+
+    def deadline(self, priority: str, timeout: Optional[float]) -> Optional[float]:
+        timeout = timeout if timeout is not None else self.timeouts[priority]
+        return time.monotonic() + timeout if timeout and timeout > 0 else None
+
+    async def acquire(self, priority: str, deadline: Optional[float]) -> None:
+        """Wait for a slot; raises AdmissionRejected on overload or expiry"""
+        if not self._waiters[priority] and self._has_slot(priority):
+            self.in_flight[priority] += 1
+            self.stats[priority]["admitted"] += 1
+            self._wait_ms[priority].append(0.0)
+            return
+
+        if self.queued(priority) >= self.max_queue[priority]:
+            self.stats[priority]["rejected"] += 1
+            raise AdmissionRejected(429, f"{priority} queue is full", self._retry_after(priority))
+        if deadline is not None and time.monotonic() + self.estimated_wait(priority) > deadline:
+            self.stats[priority]["rejected"] += 1
+            raise AdmissionRejected(
+                429, "Estimated queue wait exceeds the request deadline", self._retry_after(priority)
+            )
+
+        start = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[priority].append(waiter)
+        # Entries left behind by expired waiters can hide a free slot from the fast path
+        self._dispatch()
+        try:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was granted just as the deadline hit; give it back
+                self.release(priority)
+            else:
+                waiter.cancel()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.stats[priority]["expired"] += 1
+            raise AdmissionRejected(504, "Request deadline expired while queued")
+
+        self.stats[priority]["admitted"] += 1
+        self._wait_ms[priority].append((time.monotonic() - start) * 1000)
+
+    def release(self, priority: str, service_seconds: Optional[float] = None) -> None:
+        self.in_flight[priority] -= 1
+        if service_seconds is not None:
+            self.stats[priority]["completed"] += 1
+            self._service_ms[priority].append(service_seconds * 1000)
+            self._service_ewma = 0.9 * self._service_ewma + 0.1 * service_seconds
+        self._dispatch()
+
+
+class AdmissionMiddleware:
+    """ASGI middleware that runs POST requests through an AdmissionController"""
+
+    def __init__(self, app: Any, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    def _classify(self, scope: Dict[str, Any]) -> Tuple[str, Optional[float]]:
+        headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in scope["headers"]}
+        priority = headers.get("x-priority", self.controller.default_priority).strip().lower()
+        if priority not in PRIORITIES:
+            priority = self.controller.default_priority
+        try:
+            timeout = float(headers["x-request-timeout"]) if "x-request-timeout" in headers else None
+        except ValueError:
+            timeout = None
+        return priority, self.controller.deadline(priority, timeout)
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+
+        priority, deadline = self._classify(scope)
+        try:
+            await self.controller.acquire(priority, deadline)
+        except AdmissionRejected as e:
+            await self._reject(send, e)
+            return
+
+        start = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(priority, time.monotonic() - start)
+
+    @staticmethod
+    async def _reject(send: Any, error: AdmissionRejected) -> None:
+        body = json.dumps({"success": False, "error": error.reason, "retry_after": error.retry_after}).encode("utf-8")
+        headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        if error.retry_after is not None:
+            headers.append((b"retry-after", str(error.retry_after).encode()))
+        await send({"type": "http.response.start", "status": error.status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
@@ -1,19 +1,31 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel, HttpUrl
 import torch
 from transformers import AutoModel, AutoTokenizer, AutoImageProcessor
 import base64
-import io
 import os
 import tempfile
 import numpy as np
-from typing import Optional, List, Dict, Any, Union
-import requests
+from typing import Optional, List, Dict, Any, Union, AsyncIterator, Tuple
 import logging
 from pathlib import Path
 from PIL import Image
 import time
+import asyncio
+import json
+import re
+import shutil
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from admission import AdmissionController, AdmissionMiddleware
+from bulk_jobs import BulkEmbeddingJob
+from fetch import AsyncFetcher, FetchError
+from image_pipeline import ImagePreprocessor
+from local_input import BytesLike, LocalInput
+from text_chunking import TextWindow, split_token_windows
+from vector_index import VectorCollection
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -28,16 +40,44 @@ AUTO_DOWNLOAD_MODELS = os.environ.get("AUTO_DOWNLOAD_MODELS", "true").lower() ==
 DEVICE = os.environ.get("DEVICE", "cuda" if torch.cuda.is_available() else "cpu")
 MAX_TEXT_LENGTH = int(os.environ.get("MAX_TEXT_LENGTH", "8192"))
 MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", "32"))
+PREPROCESS_WORKERS = int(os.environ.get("PREPROCESS_WORKERS", str(os.cpu_count() or 1)))
+PIPELINE_CHUNK_SIZE = int(os.environ.get("PIPELINE_CHUNK_SIZE", "8"))
+CHUNK_TOKENS = int(os.environ.get("CHUNK_TOKENS", "512"))
+CHUNK_OVERLAP_TOKENS = int(os.environ.get("CHUNK_OVERLAP_TOKENS", "64"))
+BULK_JOBS_ROOT = os.environ.get("BULK_JOBS_ROOT", "/app/jobs")
+COLLECTIONS_ROOT = os.environ.get("COLLECTIONS_ROOT", "/app/collections")
+
+# Task-specific prefixes expected by Nomic embedding models
+TASK_PREFIXES = {
+    "search_document": "search_document: ",
+    "search_query": "search_query: ",
+    "classification": "classification: ",
+    "clustering": "clustering: "
+}
 
 # Global model, tokenizer, and processor
 model = None
 tokenizer = None
 processor = None
+image_preprocessor = None
 models_loaded_from_volume = False
 
+# Single inference thread keeps the event loop free while the model runs
+inference_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+
+# Pooled, size-capped downloader for /embed/image/url (configured via FETCH_* env vars)
+fetcher = AsyncFetcher.from_env()
+
+# Raw request bodies and path / file:// references under INPUT_ROOTS
+local_input = LocalInput.from_env()
+
+# Concurrency limits, X-Priority classes and deadlines for POST requests (ADMISSION_* env vars)
+admission = AdmissionController.from_env(default_concurrency=4)
+app.add_middleware(AdmissionMiddleware, controller=admission)
+
 def initialize_model():
     """Initialize Nomic embedding model with tokenizer and image processor"""
-    global model, tokenizer, processor, models_loaded_from_volume
+    global model, tokenizer, processor, image_preprocessor, models_loaded_from_volume
     
     try:
         # Set cache directory if models should be stored locally
@@ -87,6 +127,9 @@ def initialize_model():
             cache_dir=MODEL_DIR if AUTO_DOWNLOAD_MODELS else None
         )
         
+        # Decode/resize/normalize pool mirroring the processor settings
+        image_preprocessor = ImagePreprocessor.from_processor(processor, max_workers=PREPROCESS_WORKERS)
+        
         models_loaded_from_volume = True
         logger.info("Successfully loaded Nomic embedding model")
         
@@ -120,11 +163,75 @@ class ImageURLEmbeddingRequest(BaseModel):
     image_url: Union[HttpUrl, List[HttpUrl]]
     normalize: bool = True
 
+class ImagePathEmbeddingRequest(BaseModel):
+    """Request model for image embedding with paths or file:// URLs under INPUT_ROOTS"""
+    path: Union[str, List[str]]
+    normalize: bool = True
+
 class MultiModalEmbeddingRequest(BaseModel):
     """Request model for mixed text and image embedding"""
-    inputs: List[Dict[str, str]]  # List of {"type": "text"|"image", "content": str}
+    inputs: List[Dict[str, str]]  # List of {"type": "text"|"image"|"image_path", "content": str}
     normalize: bool = True
 
+class ChunkedTextEmbeddingRequest(BaseModel):
+    """Request model for long-document chunked text embedding"""
+    documents: List[Union[str, Dict[str, Any]]]  # Plain strings or {"id": ..., "text": ...}
+    task: Optional[str] = "search_document"
+    normalize: bool = True
+    chunk_tokens: int = CHUNK_TOKENS
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS
+    pooled: bool = True
+    batch_size: int = MAX_BATCH_SIZE
+
+class BulkJobRequest(BaseModel):
+    """Request model for a bulk embedding job (paths are relative to BULK_JOBS_ROOT)"""
+    input_path: str  # JSONL file or directory of text/image files
+    output_dir: str  # Reusing an output_dir resumes the job from its checkpoint
+    kind: str = "text"  # text, image
+    task: Optional[str] = "search_document"
+    normalize: bool = True
+    batch_size: Optional[int] = None
+    dtype: str = "float16"  # float16, float32
+    job_id: Optional[str] = None
+
+class CollectionCreateRequest(BaseModel):
+    """Request model for creating a vector collection"""
+    name: str
+    storage: str = "float16"  # float16, int8
+    nlist: Optional[int] = None  # Coarse lists; defaults to 4 * sqrt(size) at training time
+    pq_m: int = 48  # PQ sub-quantizers (bytes per vector code); must divide the embedding dim
+    train_threshold: int = 10000  # Brute-force search until the collection reaches this size
+    nprobe: int = 16
+    rerank: int = 4
+
+class CollectionAddRequest(BaseModel):
+    """Request model for adding items to a collection (texts are embedded, or pass embeddings)"""
+    ids: List[Union[str, int]]
+    texts: Optional[List[str]] = None
+    embeddings: Optional[List[List[float]]] = None
+    task: Optional[str] = "search_document"
+
+class CollectionDeleteRequest(BaseModel):
+    """Request model for deleting items from a collection"""
+    ids: List[Union[str, int]]
+
+class CollectionQueryRequest(BaseModel):
+    """Request model for embed-and-search in one call"""
+    text: Optional[Union[str, List[str]]] = None
+    embedding: Optional[List[float]] = None
+    task: Optional[str] = "search_query"
+    k: int = 10
+    nprobe: Optional[int] = None
+    rerank: Optional[int] = None
+    exact: bool = False
+
+class CollectionBenchmarkRequest(BaseModel):
+    """Request model for measuring recall@k against brute-force search"""
+    k: int = 10
+    nprobe: List[int] = [1, 4, 16, 64]
+    rerank: Optional[int] = None
+    num_queries: int = 100
+
 class EmbeddingResponse(BaseModel):
     """Response model for embedding results"""
     success: bool
@@ -150,13 +257,7 @@ def embed_text(texts: List[str], task: str = "search_document", normalize: bool
         raise RuntimeError("Model not initialized")
     
     # Add task-specific prefix
-    task_prefixes = {
-        "search_document": "search_document: ",
-        "search_query": "search_query: ",
-        "classification": "classification: ",
-        "clustering": "clustering: "
-    }
-    prefix = task_prefixes.get(task, "")
+    prefix = TASK_PREFIXES.get(task, "")
     
     # Add prefix to texts
     prefixed_texts = [prefix + text for text in texts]
@@ -211,6 +312,331 @@ def embed_images(images: List[Image.Image], normalize: bool = True) -> np.ndarra
     
     return embeddings.cpu().numpy()
 
+def embed_token_windows(input_ids: List[List[int]]) -> np.ndarray:
+    """
+    Generate unnormalized embeddings for pre-tokenized windows
+    
+    Uses attention-masked mean pooling so a window's vector does not depend
+    on how much padding the other windows in its batch needed.
+    
+    Args:
+        input_ids: Token ids per window, special tokens already included
+    
+    Returns:
+        Numpy array of embeddings
+    """
+    if model is None or tokenizer is None:
+        raise RuntimeError("Model not initialized")
+    
+    encoded = tokenizer.pad({"input_ids": input_ids}, padding=True, return_tensors="pt")
+    encoded = {k: v.to(DEVICE) for k, v in encoded.items()}
+    
+    with torch.no_grad():
+        outputs = model.text_model(**encoded)
+        mask = encoded["attention_mask"].unsqueeze(-1).to(outputs.last_hidden_state.dtype)
+        embeddings = (outputs.last_hidden_state * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+    
+    return embeddings.float().cpu().numpy()
+
+def embed_pixel_values(pixel_values: np.ndarray, normalize: bool = True) -> np.ndarray:
+    """
+    Generate embeddings for already preprocessed pixel values
+    
+    Args:
+        pixel_values: Contiguous (N, 3, H, W) float32 array from ImagePreprocessor
+        normalize: Whether to normalize embeddings
+    
+    Returns:
+        Numpy array of embeddings
+    """
+    if model is None:
+        raise RuntimeError("Model not initialized")
+    
+    # from_numpy shares memory with the preprocessed batch (no copy on CPU)
+    dtype = next(model.parameters()).dtype
+    pixel_values = torch.from_numpy(pixel_values).to(DEVICE, dtype=dtype)
+    
+    with torch.no_grad():
+        outputs = model.vision_model(pixel_values=pixel_values)
+        embeddings = outputs.last_hidden_state.mean(dim=1)  # Mean pooling
+        
+        if normalize:
+            embeddings = torch.nn.functional.normalize(embeddings, p=2, dim=1)
+    
+    return embeddings.float().cpu().numpy()
+
+async def embed_image_bytes(items: List[BytesLike], normalize: bool = True) -> np.ndarray:
+    """
+    Generate embeddings for encoded image bytes through the preprocessing pipeline
+    
+    Images are split into chunks of PIPELINE_CHUNK_SIZE; the decode pool works
+    on chunk i+1 while chunk i runs through the model.
+    
+    Args:
+        items: Encoded images (JPEG, PNG, etc.), as bytes or memory-mapped files
+        normalize: Whether to normalize embeddings
+    
+    Returns:
+        Numpy array of embeddings
+    """
+    if image_preprocessor is None:
+        raise RuntimeError("Model not initialized")
+    
+    if not items:
+        return np.zeros((0, getattr(model.config, "hidden_size", 768)), dtype=np.float32)
+    
+    loop = asyncio.get_running_loop()
+    chunks = [items[i:i + PIPELINE_CHUNK_SIZE] for i in range(0, len(items), PIPELINE_CHUNK_SIZE)]
+    results = []
+    
+    pending = image_preprocessor.submit_batch(chunks[0])
+    for index in range(len(chunks)):
+        pixel_values = await pending
+        if index + 1 < len(chunks):
+            pending = image_preprocessor.submit_batch(chunks[index + 1])
+        results.append(
+            await loop.run_in_executor(inference_executor, embed_pixel_values, pixel_values, normalize)
+        )
+    
+    return np.concatenate(results, axis=0)
+
+def _l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+async def spool_request_body(request: Request) -> tempfile.SpooledTemporaryFile:
+    """
+    Copy a request body into a spooled temp file (memory up to 8 MB, then disk)
+    
+    The body has to be drained before a StreamingResponse starts, since the
+    response task consumes the ASGI receive channel to watch for disconnects.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=8 * 1024 * 1024, mode="w+b")
+    async for chunk in request.stream():
+        spool.write(chunk)
+    spool.seek(0)
+    return spool
+
+async def iter_ndjson_documents(spool: tempfile.SpooledTemporaryFile) -> AsyncIterator[Dict[str, Any]]:
+    """Parse a spooled NDJSON body one line at a time"""
+    try:
+        for line in spool:
+            if line.strip():
+                yield json.loads(line)
+    finally:
+        spool.close()
+
+async def _iter_list(items: List[Any]) -> AsyncIterator[Any]:
+    for item in items:
+        yield item
+
+async def stream_chunked_embeddings(
+    documents: AsyncIterator[Union[str, Dict[str, Any]]],
+    options: ChunkedTextEmbeddingRequest,
+) -> AsyncIterator[bytes]:
+    """
+    Embed documents as overlapping token windows, yielding one NDJSON line per document
+    
+    Windows from consecutive documents are packed into shared batches of
+    options.batch_size. Only documents whose windows have not all been embedded
+    yet are held in memory, and results are emitted in input order as soon as
+    a document is complete.
+    """
+    start_time = time.time()
+    loop = asyncio.get_running_loop()
+    prefix = TASK_PREFIXES.get(options.task, "")
+    
+    pending_documents = deque()
+    window_buffer: List[Tuple[Dict[str, Any], TextWindow]] = []
+    totals = {"documents": 0, "chunks": 0}
+    
+    async def run_batch(batch: List[Tuple[Dict[str, Any], TextWindow]]):
+        vectors = await loop.run_in_executor(
+            inference_executor, embed_token_windows, [window.input_ids for _, window in batch]
+        )
+        for (state, window), vector in zip(batch, vectors):
+            state["vectors"][window.chunk_index] = vector
+            state["remaining"] -= 1
+    
+    def completed_lines() -> List[bytes]:
+        lines = []
+        while pending_documents and pending_documents[0]["remaining"] == 0:
+            state = pending_documents.popleft()
+            vectors = np.stack(state["vectors"])
+            weights = np.array([max(window.num_tokens, 1) for window in state["windows"]], dtype=np.float32)
+            
+            document = {
+                "index": state["index"],
+                "id": state["id"],
+                "num_chunks": len(state["windows"]),
+                "chunks": [
+                    {
+                        "chunk_index": window.chunk_index,
+                        "start_char": window.start_char,
+                        "end_char": window.end_char,
+                        "num_tokens": window.num_tokens,
+                        "embedding": (_l2_normalize(vector) if options.normalize else vector).tolist()
+                    }
+                    for window, vector in zip(state["windows"], vectors)
+                ]
+            }
+            if options.pooled:
+                # Token-weighted mean of the raw chunk vectors
+                pooled = (vectors * weights[:, None]).sum(axis=0) / weights.sum()
+                document["pooled_embedding"] = (_l2_normalize(pooled) if options.normalize else pooled).tolist()
+            
+            totals["chunks"] += len(state["windows"])
+            lines.append(json.dumps(document).encode("utf-8") + b"\n")
+        return lines
+    
+    try:
+        index = 0
+        async for item in documents:
+            if isinstance(item, str):
+                doc_id, text = None, item
+            else:
+                doc_id, text = item.get("id"), item.get("text", "")
+            
+            # Every tokenizer and model call runs on inference_executor: a fast tokenizer
+            # cannot be used from two threads at once
+            windows = await loop.run_in_executor(
+                inference_executor, split_token_windows, tokenizer, text, prefix,
+                options.chunk_tokens, options.overlap_tokens
+            )
+            state = {
+                "index": index,
+                "id": doc_id,
+                "windows": windows,
+                "vectors": [None] * len(windows),
+                "remaining": len(windows)
+            }
+            pending_documents.append(state)
+            window_buffer.extend((state, window) for window in windows)
+            index += 1
+            totals["documents"] += 1
+            
+            while len(window_buffer) >= options.batch_size:
+                batch, window_buffer = window_buffer[:options.batch_size], window_buffer[options.batch_size:]
+                await run_batch(batch)
+                for line in completed_lines():
+                    yield line
+        
+        if window_buffer:
+            await run_batch(window_buffer)
+            window_buffer = []
+        for line in completed_lines():
+            yield line
+        
+        yield json.dumps({
+            "done": True,
+            "num_documents": totals["documents"],
+            "num_chunks": totals["chunks"],
+            "processing_time_ms": (time.time() - start_time) * 1000
+        }).encode("utf-8") + b"\n"
+        
+    except Exception as e:
+        logger.error(f"Chunked embedding failed: {e}")
+        yield json.dumps({"done": False, "error": str(e)}).encode("utf-8") + b"\n"
+
+# Bulk jobs started through the API, keyed by job_id
+bulk_jobs: Dict[str, BulkEmbeddingJob] = {}
+
+def create_bulk_job(
+    input_path: str,
+    output_dir: str,
+    kind: str = "text",
+    task: str = "search_document",
+    normalize: bool = True,
+    batch_size: int = MAX_BATCH_SIZE,
+    dtype: str = "float16",
+    job_id: Optional[str] = None,
+    input_root: Optional[str] = None,
+) -> BulkEmbeddingJob:
+    """
+    Build a bulk job whose model calls share the inference thread with live requests
+    
+    Image decoding runs in the preprocessing pool on the job's own thread, so
+    only the forward pass is serialized with online traffic. With input_root
+    set, files the job reads (including JSONL image paths) must resolve under it.
+    """
+    if model is None:
+        raise RuntimeError("Model not initialized")
+    
+    if kind == "text":
+        def embed_fn(texts: List[str]) -> np.ndarray:
+            return inference_executor.submit(embed_text, texts, task, normalize).result()
+    else:
+        def embed_fn(items: List[bytes]) -> np.ndarray:
+            pixel_values = image_preprocessor.preprocess_batch(items)
+            return inference_executor.submit(embed_pixel_values, pixel_values, normalize).result()
+    
+    return BulkEmbeddingJob(
+        job_id=job_id or os.path.basename(os.path.normpath(output_dir)),
+        input_path=input_path,
+        output_dir=output_dir,
+        kind=kind,
+        embed_fn=embed_fn,
+        embedding_dim=getattr(model.config, "hidden_size", 768),
+        batch_size=batch_size,
+        dtype=dtype,
+        settings={"model": MODEL_NAME, "task": task if kind == "text" else None, "normalize": normalize},
+        input_root=input_root,
+    )
+
+def _resolve_job_path(path: str) -> str:
+    """Resolve a job path under BULK_JOBS_ROOT, rejecting paths that escape it"""
+    root = os.path.realpath(BULK_JOBS_ROOT)
+    resolved = os.path.realpath(os.path.join(root, path))
+    if resolved != root and not resolved.startswith(root + os.sep):
+        raise HTTPException(status_code=422, detail=f"Path must be inside {BULK_JOBS_ROOT}: {path}")
+    return resolved
+
+# Vector collections persisted under COLLECTIONS_ROOT, keyed by name
+collections: Dict[str, VectorCollection] = {}
+COLLECTION_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+def load_collections():
+    """Open every collection found under COLLECTIONS_ROOT"""
+    if not os.path.isdir(COLLECTIONS_ROOT):
+        return
+    for name in sorted(os.listdir(COLLECTIONS_ROOT)):
+        path = os.path.join(COLLECTIONS_ROOT, name)
+        if not os.path.exists(os.path.join(path, "meta.json")):
+            continue
+        try:
+            collections[name] = VectorCollection(path)
+            logger.info(f"Loaded collection {name} ({collections[name].size} vectors)")
+        except Exception as e:
+            logger.error(f"Failed to load collection {name}: {e}")
+
+load_collections()
+
+def _get_collection(name: str) -> VectorCollection:
+    collection = collections.get(name)
+    if collection is None:
+        raise HTTPException(status_code=404, detail=f"Collection not found: {name}")
+    return collection
+
+async def embed_texts_batched(texts: List[str], task: str) -> np.ndarray:
+    """Embed texts in MAX_BATCH_SIZE batches on the inference thread"""
+    loop = asyncio.get_running_loop()
+    batches = []
+    for start in range(0, len(texts), MAX_BATCH_SIZE):
+        batches.append(await loop.run_in_executor(
+            inference_executor, embed_text, texts[start:start + MAX_BATCH_SIZE], task, True
+        ))
+    return np.concatenate(batches)
+
+@app.on_event("shutdown")
+async def shutdown_executors():
+    """Stop bulk jobs, the preprocessing and inference thread pools, and close the HTTP client"""
+    for job in bulk_jobs.values():
+        job.cancel()
+    if image_preprocessor is not None:
+        image_preprocessor.shutdown()
+    inference_executor.shutdown(wait=False, cancel_futures=True)
+    await fetcher.aclose()
+
 @app.get("/")
 async def root():
     """Root endpoint with API information"""
@@ -224,7 +650,22 @@ async def root():
             "/embed/image/file": "POST - Generate embeddings for uploaded images",
             "/embed/image/base64": "POST - Generate embeddings for base64 images",
             "/embed/image/url": "POST - Generate embeddings for image URLs",
+            "/embed/image/raw": "POST - Generate an embedding for an image sent as an octet-stream body",
+            "/embed/image/path": "POST - Generate embeddings for images under INPUT_ROOTS (paths or file:// URLs)",
             "/embed/multimodal": "POST - Generate embeddings for mixed text and images",
+            "/embed/text/chunked": "POST - Chunked embeddings for long documents (streams NDJSON)",
+            "/jobs/embed": "POST - Start or resume a bulk embedding job",
+            "/jobs": "GET - List bulk embedding jobs",
+            "/jobs/{job_id}": "GET - Bulk job progress (rows/s, ETA)",
+            "/jobs/{job_id}/cancel": "POST - Stop a bulk job after its current block",
+            "/collections": "GET/POST - List or create vector collections",
+            "/collections/{name}": "GET/DELETE - Collection stats or drop it",
+            "/collections/{name}/items": "POST - Embed and add (or replace) items",
+            "/collections/{name}/delete": "POST - Delete items by id",
+            "/collections/{name}/query": "POST - Embed a query and return nearest items",
+            "/collections/{name}/train": "POST - (Re)train the IVF-PQ index",
+            "/collections/{name}/benchmark": "POST - Recall@k and latency vs brute force",
+            "/admission": "GET - Admission queue depth, wait and service times per priority",
             "/health": "GET - Health check",
             "/healthz": "GET - Health check (Kubernetes-style)",
             "/docs": "GET - API documentation"
@@ -245,8 +686,20 @@ async def health_check():
         "device": DEVICE,
         "settings": {
             "max_text_length": MAX_TEXT_LENGTH,
-            "max_batch_size": MAX_BATCH_SIZE
-        }
+            "max_batch_size": MAX_BATCH_SIZE,
+            "preprocess_workers": PREPROCESS_WORKERS,
+            "pipeline_chunk_size": PIPELINE_CHUNK_SIZE,
+            "chunk_tokens": CHUNK_TOKENS,
+            "chunk_overlap_tokens": CHUNK_OVERLAP_TOKENS,
+            "bulk_jobs_root": BULK_JOBS_ROOT,
+            "collections_root": COLLECTIONS_ROOT,
+            "fetch": fetcher.settings(),
+            "local_input": local_input.settings(),
+            "admission": admission.settings()
+        },
+        "fetch_stats": fetcher.stats,
+        "admission_stats": admission.metrics(),
+        "collections": {name: collection.size for name, collection in collections.items()}
     }
 
 @app.post("/embed/text", response_model=EmbeddingResponse)
@@ -280,7 +733,9 @@ async def embed_text_endpoint(request: TextEmbeddingRequest):
             )
         
         # Generate embeddings
-        embeddings = embed_text(texts, request.task, request.normalize)
+        embeddings = await asyncio.get_running_loop().run_in_executor(
+            inference_executor, embed_text, texts, request.task, request.normalize
+        )
         
         processing_time = (time.time() - start_time) * 1000
         
@@ -298,6 +753,51 @@ async def embed_text_endpoint(request: TextEmbeddingRequest):
             error=str(e)
         )
 
+@app.post("/embed/text/chunked")
+async def embed_text_chunked_endpoint(http_request: Request):
+    """
+    Generate per-chunk (and optionally pooled) embeddings for long documents
+    
+    Accepts either a JSON ChunkedTextEmbeddingRequest body, or an
+    application/x-ndjson body with one {"id": ..., "text": ...} object per line
+    (options then come from query parameters). The NDJSON body is spooled to
+    disk and parsed line by line, so whole archives can be streamed through
+    without being held in memory.
+    
+    Returns:
+        NDJSON stream: one line per document in input order, then a summary line
+    """
+    if not models_loaded_from_volume:
+        raise HTTPException(status_code=503, detail="Model not loaded. Please ensure model is initialized.")
+    
+    content_type = http_request.headers.get("content-type", "")
+    try:
+        if "ndjson" in content_type:
+            options = ChunkedTextEmbeddingRequest(documents=[], **dict(http_request.query_params))
+            documents = iter_ndjson_documents(await spool_request_body(http_request))
+        else:
+            options = ChunkedTextEmbeddingRequest(**(await http_request.json()))
+            documents = _iter_list(options.documents)
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    if options.chunk_tokens > MAX_TEXT_LENGTH:
+        raise HTTPException(status_code=422, detail=f"chunk_tokens exceeds maximum {MAX_TEXT_LENGTH}")
+    if not 1 <= options.batch_size <= MAX_BATCH_SIZE:
+        raise HTTPException(status_code=422, detail=f"batch_size must be between 1 and {MAX_BATCH_SIZE}")
+    try:
+        await asyncio.get_running_loop().run_in_executor(
+            inference_executor, split_token_windows, tokenizer, "",
+            TASK_PREFIXES.get(options.task, ""), options.chunk_tokens, options.overlap_tokens
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    return StreamingResponse(
+        stream_chunked_embeddings(documents, options),
+        media_type="application/x-ndjson"
+    )
+
 @app.post("/embed/image/file", response_model=EmbeddingResponse)
 async def embed_image_file(
     files: List[UploadFile] = File(...),
@@ -329,15 +829,11 @@ async def embed_image_file(
                 error=f"Batch size {len(files)} exceeds maximum {MAX_BATCH_SIZE}"
             )
         
-        # Load images
-        images = []
-        for file in files:
-            content = await file.read()
-            image = Image.open(io.BytesIO(content)).convert("RGB")
-            images.append(image)
+        # Read raw bytes; decoding happens in the preprocessing pool
+        contents = [await file.read() for file in files]
         
         # Generate embeddings
-        embeddings = embed_images(images, normalize)
+        embeddings = await embed_image_bytes(contents, normalize)
         
         processing_time = (time.time() - start_time) * 1000
         
@@ -385,15 +881,11 @@ async def embed_image_base64(request: ImageEmbeddingRequest):
                 error=f"Batch size {len(image_data_list)} exceeds maximum {MAX_BATCH_SIZE}"
             )
         
-        # Decode and load images
-        images = []
-        for image_base64 in image_data_list:
-            image_data = base64.b64decode(image_base64)
-            image = Image.open(io.BytesIO(image_data)).convert("RGB")
-            images.append(image)
+        # Decode base64 only; image decoding happens in the preprocessing pool
+        contents = [base64.b64decode(image_base64) for image_base64 in image_data_list]
         
         # Generate embeddings
-        embeddings = embed_images(images, request.normalize)
+        embeddings = await embed_image_bytes(contents, request.normalize)
         
         processing_time = (time.time() - start_time) * 1000
         
@@ -441,16 +933,11 @@ async def embed_image_url(request: ImageURLEmbeddingRequest):
                 error=f"Batch size {len(urls)} exceeds maximum {MAX_BATCH_SIZE}"
             )
         
-        # Download and load images
-        images = []
-        for url in urls:
-            response = requests.get(str(url), timeout=30)
-            response.raise_for_status()
-            image = Image.open(io.BytesIO(response.content)).convert("RGB")
-            images.append(image)
+        # Download images concurrently (pooled, per-host limited, size capped)
+        contents = await fetcher.fetch_many([str(url) for url in urls])
         
         # Generate embeddings
-        embeddings = embed_images(images, request.normalize)
+        embeddings = await embed_image_bytes(contents, request.normalize)
         
         processing_time = (time.time() - start_time) * 1000
         
@@ -462,7 +949,7 @@ async def embed_image_url(request: ImageURLEmbeddingRequest):
             processing_time_ms=processing_time
         )
         
-    except requests.RequestException as e:
+    except FetchError as e:
         return EmbeddingResponse(
             success=False,
             error=f"Failed to download image: {str(e)}"
@@ -473,6 +960,94 @@ async def embed_image_url(request: ImageURLEmbeddingRequest):
             error=str(e)
         )
 
+@app.post("/embed/image/raw", response_model=EmbeddingResponse)
+async def embed_image_raw(request: Request, normalize: bool = True):
+    """
+    Generate an embedding for an image sent as the raw request body (Content-Type: application/octet-stream)
+    
+    Args:
+        normalize: Whether to normalize embeddings
+    
+    Returns:
+        Embedding for the input image
+    """
+    start_time = time.time()
+    
+    try:
+        if not models_loaded_from_volume:
+            return EmbeddingResponse(
+                success=False,
+                error="Model not loaded. Please ensure model is initialized."
+            )
+        
+        content = await local_input.read_body(request)
+        embeddings = await embed_image_bytes([content], normalize)
+        
+        processing_time = (time.time() - start_time) * 1000
+        
+        return EmbeddingResponse(
+            success=True,
+            embeddings=embeddings.tolist(),
+            embedding_dim=embeddings.shape[1],
+            num_embeddings=len(embeddings),
+            processing_time_ms=processing_time
+        )
+        
+    except Exception as e:
+        return EmbeddingResponse(
+            success=False,
+            error=str(e)
+        )
+
+@app.post("/embed/image/path", response_model=EmbeddingResponse)
+async def embed_image_path(request: ImagePathEmbeddingRequest):
+    """
+    Generate embeddings for image(s) on a shared volume, memory-mapped instead of uploaded
+    
+    Args:
+        request: ImagePathEmbeddingRequest with path(s) or file:// URL(s) inside INPUT_ROOTS
+    
+    Returns:
+        Embeddings for the input image(s)
+    """
+    start_time = time.time()
+    
+    try:
+        if not models_loaded_from_volume:
+            return EmbeddingResponse(
+                success=False,
+                error="Model not loaded. Please ensure model is initialized."
+            )
+        
+        paths = request.path if isinstance(request.path, list) else [request.path]
+        
+        # Check batch size
+        if len(paths) > MAX_BATCH_SIZE:
+            return EmbeddingResponse(
+                success=False,
+                error=f"Batch size {len(paths)} exceeds maximum {MAX_BATCH_SIZE}"
+            )
+        
+        # Map files in place; decoding happens in the preprocessing pool
+        contents = await asyncio.to_thread(local_input.read_many, paths)
+        embeddings = await embed_image_bytes(contents, request.normalize)
+        
+        processing_time = (time.time() - start_time) * 1000
+        
+        return EmbeddingResponse(
+            success=True,
+            embeddings=embeddings.tolist(),
+            embedding_dim=embeddings.shape[1],
+            num_embeddings=len(embeddings),
+            processing_time_ms=processing_time
+        )
+        
+    except Exception as e:
+        return EmbeddingResponse(
+            success=False,
+            error=str(e)
+        )
+
 @app.post("/embed/multimodal", response_model=EmbeddingResponse)
 async def embed_multimodal(request: MultiModalEmbeddingRequest):
     """
@@ -511,10 +1086,11 @@ async def embed_multimodal(request: MultiModalEmbeddingRequest):
                 text_inputs.append(item["content"])
                 text_indices.append(i)
             elif item["type"] == "image":
-                # Assume base64 encoded image
-                image_data = base64.b64decode(item["content"])
-                image = Image.open(io.BytesIO(image_data)).convert("RGB")
-                image_inputs.append(image)
+                # Assume base64 encoded image; decoded in the preprocessing pool
+                image_inputs.append(base64.b64decode(item["content"]))
+                image_indices.append(i)
+            elif item["type"] == "image_path":
+                image_inputs.append(await asyncio.to_thread(local_input.read, item["content"]))
                 image_indices.append(i)
             else:
                 return EmbeddingResponse(
@@ -526,12 +1102,14 @@ async def embed_multimodal(request: MultiModalEmbeddingRequest):
         all_embeddings = np.zeros((len(request.inputs), 768))  # Assuming 768-dim embeddings
         
         if text_inputs:
-            text_embeddings = embed_text(text_inputs, normalize=request.normalize)
+            text_embeddings = await asyncio.get_running_loop().run_in_executor(
+                inference_executor, embed_text, text_inputs, "search_document", request.normalize
+            )
             for idx, orig_idx in enumerate(text_indices):
                 all_embeddings[orig_idx] = text_embeddings[idx]
         
         if image_inputs:
-            image_embeddings = embed_images(image_inputs, normalize=request.normalize)
+            image_embeddings = await embed_image_bytes(image_inputs, normalize=request.normalize)
             for idx, orig_idx in enumerate(image_indices):
                 all_embeddings[orig_idx] = image_embeddings[idx]
         
@@ -551,6 +1129,259 @@ async def embed_multimodal(request: MultiModalEmbeddingRequest):
             error=str(e)
         )
 
+@app.post("/jobs/embed")
+async def start_bulk_job(request: BulkJobRequest):
+    """
+    Start a bulk embedding job, or resume one from its output directory
+    
+    Args:
+        request: BulkJobRequest with input/output paths and embedding options
+    
+    Returns:
+        Job status including rows done, rows per second and ETA
+    """
+    if not models_loaded_from_volume:
+        raise HTTPException(status_code=503, detail="Model not loaded. Please ensure model is initialized.")
+    if request.kind not in ("text", "image"):
+        raise HTTPException(status_code=422, detail=f"Unknown job kind: {request.kind}")
+    if request.dtype not in ("float16", "float32"):
+        raise HTTPException(status_code=422, detail=f"Unsupported dtype: {request.dtype}")
+    
+    input_path = _resolve_job_path(request.input_path)
+    output_dir = _resolve_job_path(request.output_dir)
+    if not os.path.exists(input_path):
+        raise HTTPException(status_code=404, detail=f"Input not found: {request.input_path}")
+    
+    job_id = request.job_id or os.path.basename(output_dir)
+    for existing in bulk_jobs.values():
+        if existing.status not in ("pending", "running"):
+            continue
+        if existing.job_id == job_id:
+            raise HTTPException(status_code=409, detail=f"Job {job_id} is already running")
+        if existing.output_dir == output_dir:
+            # Two jobs would write the same memmap and ids.jsonl
+            raise HTTPException(
+                status_code=409,
+                detail=f"Job {existing.job_id} is already writing to {request.output_dir}"
+            )
+    
+    job = create_bulk_job(
+        input_path=input_path,
+        output_dir=output_dir,
+        kind=request.kind,
+        task=request.task,
+        normalize=request.normalize,
+        batch_size=request.batch_size or MAX_BATCH_SIZE,
+        dtype=request.dtype,
+        job_id=job_id,
+        input_root=BULK_JOBS_ROOT,
+    )
+    bulk_jobs[job_id] = job
+    job.start()
+    
+    return job.to_dict()
+
+@app.get("/admission")
+async def admission_stats():
+    """Admission settings and per-priority queue metrics"""
+    return {"settings": admission.settings(), "stats": admission.metrics()}
+
+@app.get("/jobs")
+async def list_bulk_jobs():
+    """List bulk embedding jobs started since the service came up"""
+    return {"jobs": [job.to_dict() for job in bulk_jobs.values()]}
+
+@app.get("/jobs/{job_id}")
+async def get_bulk_job(job_id: str):
+    """Get progress of a bulk embedding job"""
+    job = bulk_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job.to_dict()
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancel_bulk_job(job_id: str):
+    """Stop a bulk embedding job after its current block (resumable later)"""
+    job = bulk_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    job.cancel()
+    return job.to_dict()
+
+@app.post("/collections")
+async def create_collection(request: CollectionCreateRequest):
+    """
+    Create a persistent vector collection sized to the model's embedding dim
+    
+    Args:
+        request: CollectionCreateRequest with name and index parameters
+    
+    Returns:
+        Collection stats
+    """
+    if not models_loaded_from_volume:
+        raise HTTPException(status_code=503, detail="Model not loaded. Please ensure model is initialized.")
+    if not COLLECTION_NAME_PATTERN.match(request.name):
+        raise HTTPException(status_code=422, detail="Collection names may only use letters, digits, '_' and '-'")
+    if request.name in collections:
+        raise HTTPException(status_code=409, detail=f"Collection already exists: {request.name}")
+    
+    try:
+        collection = VectorCollection.create(
+            os.path.join(COLLECTIONS_ROOT, request.name),
+            dim=getattr(model.config, "hidden_size", 768),
+            storage=request.storage,
+            nlist=request.nlist,
+            pq_m=request.pq_m,
+            train_threshold=request.train_threshold,
+            nprobe=request.nprobe,
+            rerank=request.rerank,
+        )
+    except (ValueError, FileExistsError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    collections[request.name] = collection
+    return collection.stats()
+
+@app.get("/collections")
+async def list_collections():
+    """List vector collections"""
+    return {"collections": [collection.stats() for collection in collections.values()]}
+
+@app.get("/collections/{name}")
+async def get_collection(name: str):
+    """Get stats for a vector collection"""
+    return _get_collection(name).stats()
+
+@app.delete("/collections/{name}")
+async def drop_collection(name: str):
+    """Delete a vector collection and its files"""
+    collection = _get_collection(name)
+    collections.pop(name, None)
+    
+    def _drop():
+        # The lock is taken off the event loop: an add or train may hold it for a while
+        with collection.lock:
+            collection.close()
+            shutil.rmtree(collection.path)
+    
+    await asyncio.to_thread(_drop)
+    return {"success": True, "name": name}
+
+@app.post("/collections/{name}/items")
+async def add_collection_items(name: str, request: CollectionAddRequest):
+    """
+    Add or replace items in a collection
+    
+    Args:
+        name: Collection name
+        request: CollectionAddRequest with ids and either texts or embeddings
+    
+    Returns:
+        Number of items added and collection stats
+    """
+    collection = _get_collection(name)
+    start_time = time.time()
+    
+    if (request.texts is None) == (request.embeddings is None):
+        raise HTTPException(status_code=422, detail="Provide exactly one of texts or embeddings")
+    items = request.texts if request.texts is not None else request.embeddings
+    if len(items) != len(request.ids):
+        raise HTTPException(status_code=422, detail=f"Got {len(request.ids)} ids for {len(items)} items")
+    
+    if request.texts is not None:
+        if not models_loaded_from_volume:
+            raise HTTPException(status_code=503, detail="Model not loaded. Please ensure model is initialized.")
+        vectors = await embed_texts_batched(request.texts, request.task)
+    else:
+        vectors = np.asarray(request.embeddings, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[1] != collection.dim:
+            raise HTTPException(status_code=422, detail=f"Embeddings must have dimension {collection.dim}")
+    
+    try:
+        added = await asyncio.to_thread(collection.add, request.ids, vectors)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    return {
+        "success": True,
+        "added": added,
+        "collection": collection.stats(),
+        "processing_time_ms": (time.time() - start_time) * 1000
+    }
+
+@app.post("/collections/{name}/delete")
+async def delete_collection_items(name: str, request: CollectionDeleteRequest):
+    """Delete items from a collection by id"""
+    collection = _get_collection(name)
+    deleted = await asyncio.to_thread(collection.delete, request.ids)
+    return {"success": True, "deleted": deleted, "size": collection.size}
+
+@app.post("/collections/{name}/query")
+async def query_collection(name: str, request: CollectionQueryRequest):
+    """
+    Embed query text and return its nearest items in one call
+    
+    Args:
+        name: Collection name
+        request: CollectionQueryRequest with text (or a precomputed embedding) and search parameters
+    
+    Returns:
+        Top-k ids with cosine scores per query
+    """
+    collection = _get_collection(name)
+    start_time = time.time()
+    
+    if (request.text is None) == (request.embedding is None):
+        raise HTTPException(status_code=422, detail="Provide exactly one of text or embedding")
+    if request.k < 1:
+        raise HTTPException(status_code=422, detail="k must be at least 1")
+    
+    if request.text is not None:
+        if not models_loaded_from_volume:
+            raise HTTPException(status_code=503, detail="Model not loaded. Please ensure model is initialized.")
+        texts = request.text if isinstance(request.text, list) else [request.text]
+        if len(texts) > MAX_BATCH_SIZE:
+            raise HTTPException(status_code=422, detail=f"Batch size {len(texts)} exceeds maximum {MAX_BATCH_SIZE}")
+        queries = await embed_texts_batched(texts, request.task)
+    else:
+        queries = np.asarray([request.embedding], dtype=np.float32)
+        if queries.shape[1] != collection.dim:
+            raise HTTPException(status_code=422, detail=f"Embedding must have dimension {collection.dim}")
+    embed_time = (time.time() - start_time) * 1000
+    
+    results = await asyncio.to_thread(
+        collection.search, queries, request.k, request.nprobe, request.rerank, request.exact
+    )
+    
+    return {
+        "success": True,
+        "results": results,
+        "embed_time_ms": embed_time,
+        "processing_time_ms": (time.time() - start_time) * 1000
+    }
+
+@app.post("/collections/{name}/train")
+async def train_collection(name: str):
+    """(Re)train a collection's IVF-PQ index on its current contents"""
+    collection = _get_collection(name)
+    try:
+        await asyncio.to_thread(collection.train)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return collection.stats()
+
+@app.post("/collections/{name}/benchmark")
+async def benchmark_collection(name: str, request: CollectionBenchmarkRequest):
+    """Measure recall@k and per-query latency for several nprobe values against brute force"""
+    collection = _get_collection(name)
+    try:
+        return await asyncio.to_thread(
+            collection.benchmark, request.k, request.nprobe, request.rerank, request.num_queries
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Resumable bulk embedding jobs for Nomic Embed
+
+Re-embeds large corpora (tweets, emails, OCR text, image folders) with maximal
+batching instead of 32-item HTTP requests. Output layout in the job directory:
+
+    embeddings.npy    preallocated (rows, dim) memmap, row i = input record i
+    ids.jsonl         one JSON-encoded id per row, in input order
+    checkpoint.json   rows completed + settings; rewritten atomically per block
+
+A killed job resumes from the last checkpoint: rows past it are recomputed,
+rows before it are never touched again.
+
+Usage:
+    python bulk_jobs.py --input tweets.jsonl --output /data/jobs/tweets --kind text
+    python bulk_jobs.py --input /app/screenshots --output /data/jobs/shots --kind image
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TEXT_EXTENSIONS = {".txt", ".md", ".json", ".html", ".eml"}
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".bmp", ".gif", ".tif", ".tiff"}
+
+EMBEDDINGS_FILE = "embeddings.npy"
+IDS_FILE = "ids.jsonl"
+CHECKPOINT_FILE = "checkpoint.json"
+
+
+def _list_directory(input_path: str, kind: str) -> List[str]:
+    """Sorted file list so record order is stable across restarts"""
+    extensions = TEXT_EXTENSIONS if kind == "text" else IMAGE_EXTENSIONS
+    files = []
+    for root, _, names in os.walk(input_path):
+        for name in names:
+            if os.path.splitext(name)[1].lower() in extensions:
+                files.append(os.path.join(root, name))
+    return sorted(files)
+
+
+def count_records(input_path: str, kind: str) -> int:
+    """Count input records without loading them"""
+    if os.path.isdir(input_path):
+        return len(_list_directory(input_path, kind))
+    count = 0
+    with open(input_path, "rb") as f:
+        for line in f:
+            if line.strip():
+                count += 1
+    return count
+
+
+def _confine(path: str, root: Optional[str]) -> str:
+    """Resolve path, rejecting it if it (or a symlink in it) escapes root"""
+    resolved = os.path.realpath(path)
+    if root is not None:
+        root = os.path.realpath(root)
+        if resolved != root and not resolved.startswith(root + os.sep):
+            raise ValueError(f"Path must be inside {root}: {path}")
+    return resolved
+
+
+def iter_records(
+    input_path: str, kind: str, skip: int = 0, root: Optional[str] = None
+) -> Iterator[Tuple[Any, Any]]:
+    """
+    Yield (id, payload) records; payload is text for text jobs, bytes for image jobs
+
+    JSONL lines look like {"id": ..., "text": ...} or {"id": ..., "path": ...};
+    a missing id falls back to the record index. Image paths in JSONL are
+    resolved relative to the JSONL file. With root set, any file resolving
+    outside it raises ValueError, which fails the job.
+    """
+    if os.path.isdir(input_path):
+        for path in _list_directory(input_path, kind)[skip:]:
+            record_id = os.path.relpath(path, input_path)
+            path = _confine(path, root)
+            if kind == "text":
+                with open(path, "r", encoding="utf-8", errors="replace") as f:
+                    yield record_id, f.read()
+            else:
+                with open(path, "rb") as f:
+                    yield record_id, f.read()
+        return
+
+    base_dir = os.path.dirname(os.path.abspath(input_path))
+    index = 0
+    with open(input_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            if index >= skip:
+                record = json.loads(line)
+                record_id = record.get("id", index)
+                if kind == "text":
+                    yield record_id, record.get("text") or ""
+                else:
+                    path = record.get("path") or record.get("image_path")
+                    if not path:
+                        raise ValueError(f"Record {record_id} has no image path")
+                    with open(_confine(os.path.join(base_dir, path), root), "rb") as image_file:
+                        yield record_id, image_file.read()
+            index += 1
+
+
+class BulkEmbeddingJob:
+    """Embeds an input file/directory into a memmapped matrix with checkpoints"""
+
+    def __init__(
+        self,
+        job_id: str,
+        input_path: str,
+        output_dir: str,
+        kind: str,
+        embed_fn: Callable[[List[Any]], np.ndarray],
+        embedding_dim: int,
+        batch_size: int = 32,
+        block_batches: int = 8,
+        dtype: str = "float16",
+        settings: Optional[Dict[str, Any]] = None,
+        input_root: Optional[str] = None,
+    ):
+        if kind not in ("text", "image"):
+            raise ValueError(f"Unknown job kind: {kind}")
+
+        self.job_id = job_id
+        self.input_path = input_path
+        self.output_dir = output_dir
+        self.kind = kind
+        self.embed_fn = embed_fn
+        self.embedding_dim = embedding_dim
+        self.batch_size = batch_size
+        self.block_size = batch_size * block_batches
+        self.dtype = dtype
+        # Extra settings (model, task, normalize) that must match to resume
+        self.settings = settings or {}
+        # Files read by the job must resolve under this directory (None: anywhere)
+        self.input_root = input_root
+
+        self.status = "pending"
+        self.error: Optional[str] = None
+        self.total_rows = 0
+        self.rows_done = 0
+        self._session_start_rows = 0
+        self._session_start_time: Optional[float] = None
+        self._cancel = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # Progress -------------------------------------------------------------
+
+    @property
+    def rows_per_second(self) -> float:
+        if not self._session_start_time:
+            return 0.0
+        elapsed = time.time() - self._session_start_time
+        return (self.rows_done - self._session_start_rows) / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        rate = self.rows_per_second
+        if rate <= 0:
+            return None
+        return (self.total_rows - self.rows_done) / rate
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "kind": self.kind,
+            "input_path": self.input_path,
+            "output_dir": self.output_dir,
+            "total_rows": self.total_rows,
+            "rows_done": self.rows_done,
+            "rows_per_second": round(self.rows_per_second, 2),
+            "eta_seconds": round(self.eta_seconds, 1) if self.eta_seconds is not None else None,
+            "embedding_dim": self.embedding_dim,
+            "dtype": self.dtype,
+            "error": self.error,
+        }
+
+    # Checkpointing --------------------------------------------------------
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.output_dir, name)
+
+    def _load_checkpoint(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(CHECKPOINT_FILE), "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_checkpoint(self, ids_offset: int) -> None:
+        checkpoint = {
+            "job_id": self.job_id,
+            "input_path": os.path.abspath(self.input_path),
+            "kind": self.kind,
+            "total_rows": self.total_rows,
+            "rows_done": self.rows_done,
+            "ids_offset": ids_offset,
+            "embedding_dim": self.embedding_dim,
+            "dtype": self.dtype,
+            "settings": self.settings,
+            "status": self.status,
+            "updated_at": datetime.utcnow().isoformat(),
+        }
+        tmp_path = self._path(CHECKPOINT_FILE + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(checkpoint, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._path(CHECKPOINT_FILE))
+
+    def _open_outputs(self) -> Tuple[np.memmap, Any]:
+        """Open (or preallocate) outputs, restoring position from a compatible checkpoint"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.total_rows = count_records(self.input_path, self.kind)
+        checkpoint = self._load_checkpoint()
+
+        resumable = (
+            checkpoint is not None
+            and checkpoint["input_path"] == os.path.abspath(self.input_path)
+            and checkpoint["kind"] == self.kind
+            and checkpoint["total_rows"] == self.total_rows
+            and checkpoint["embedding_dim"] == self.embedding_dim
+            and checkpoint["dtype"] == self.dtype
+            and checkpoint.get("settings", {}) == self.settings
+            and os.path.exists(self._path(EMBEDDINGS_FILE))
+        )
+
+        if resumable:
+            self.rows_done = checkpoint["rows_done"]
+            embeddings = np.load(self._path(EMBEDDINGS_FILE), mmap_mode="r+")
+            ids_file = open(self._path(IDS_FILE), "r+b")
+            # Drop ids written after the last checkpoint
+            ids_file.truncate(checkpoint["ids_offset"])
+            ids_file.seek(checkpoint["ids_offset"])
+            logger.info(f"Resuming job {self.job_id} at row {self.rows_done}/{self.total_rows}")
+        else:
+            if checkpoint is not None:
+                logger.warning(f"Checkpoint in {self.output_dir} does not match job settings, starting over")
+            self.rows_done = 0
+            embeddings = np.lib.format.open_memmap(
+                self._path(EMBEDDINGS_FILE), mode="w+",
+                dtype=np.dtype(self.dtype), shape=(self.total_rows, self.embedding_dim)
+            )
+            ids_file = open(self._path(IDS_FILE), "wb")
+            self._write_checkpoint(ids_offset=0)
+
+        return embeddings, ids_file
+
+    # Execution ------------------------------------------------------------
+
+    def _iter_blocks(self) -> Iterator[List[Tuple[Any, Any]]]:
+        block = []
+        for record in iter_records(self.input_path, self.kind, skip=self.rows_done, root=self.input_root):
+            block.append(record)
+            if len(block) >= self.block_size:
+                yield block
+                block = []
+        if block:
+            yield block
+
+    def _embed_block(self, payloads: List[Any]) -> np.ndarray:
+        """Embed one block; text is length-sorted so each batch pads to similar lengths"""
+        order = list(range(len(payloads)))
+        if self.kind == "text":
+            order.sort(key=lambda i: len(payloads[i]))
+
+        vectors = np.empty((len(payloads), self.embedding_dim), dtype=np.float32)
+        for start in range(0, len(order), self.batch_size):
+            indices = order[start:start + self.batch_size]
+            vectors[indices] = self.embed_fn([payloads[i] for i in indices])
+        return vectors
+
+    def run(self) -> None:
+        """Run the job to completion (or cancellation) in the calling thread"""
+        self.status = "running"
+        embeddings = ids_file = reader = None
+        try:
+            embeddings, ids_file = self._open_outputs()
+            self._session_start_rows = self.rows_done
+            self._session_start_time = time.time()
+            last_log = 0.0
+
+            # Read the next block from disk while the current one is being embedded
+            reader = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"bulk-read-{self.job_id}")
+            blocks = self._iter_blocks()
+            next_block = reader.submit(next, blocks, None)
+            while True:
+                block = next_block.result()
+                if block is None:
+                    break
+                next_block = reader.submit(next, blocks, None)
+
+                ids = [record_id for record_id, _ in block]
+                vectors = self._embed_block([payload for _, payload in block])
+
+                # Data first, checkpoint last: a crash can only lose the current block
+                embeddings[self.rows_done:self.rows_done + len(block)] = vectors
+                embeddings.flush()
+                ids_file.write("".join(json.dumps(i) + "\n" for i in ids).encode("utf-8"))
+                ids_file.flush()
+                os.fsync(ids_file.fileno())
+                self.rows_done += len(block)
+                self._write_checkpoint(ids_offset=ids_file.tell())
+
+                if time.time() - last_log >= 10:
+                    last_log = time.time()
+                    eta = self.eta_seconds
+                    logger.info(
+                        f"Job {self.job_id}: {self.rows_done}/{self.total_rows} rows, "
+                        f"{self.rows_per_second:.1f} rows/s, "
+                        f"ETA {f'{eta:.0f}s' if eta is not None else 'unknown'}"
+                    )
+
+                if self._cancel.is_set():
+                    self.status = "cancelled"
+                    break
+
+            if self.status == "running":
+                self.status = "completed"
+            self._write_checkpoint(ids_offset=ids_file.tell())
+            logger.info(f"Job {self.job_id} {self.status}: {self.rows_done}/{self.total_rows} rows")
+
+        except Exception as e:
+            self.status = "failed"
+            self.error = str(e)
+            logger.error(f"Job {self.job_id} failed at row {self.rows_done}: {e}")
+            raise
+        finally:
+            # Outputs may never have been opened if setup failed
+            if reader is not None:
+                reader.shutdown(wait=False, cancel_futures=True)
+            if ids_file is not None:
+                ids_file.close()
+            del embeddings
+
+    def start(self) -> None:
+        """Run the job in a background thread"""
+        def _target():
+            try:
+                self.run()
+            except Exception:
+                pass  # Already recorded in status/error
+
+        self._thread = threading.Thread(target=_target, name=f"bulk-job-{self.job_id}", daemon=True)
+        self._thread.start()
+
+    def cancel(self) -> None:
+        """Stop after the current block; the job can be resumed later"""
+        self._cancel.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Resumable bulk embedding with Nomic Embed")
+    parser.add_argument("--input", required=True, help="JSONL file or directory of text/image files")
+    parser.add_argument("--output", required=True, help="Job directory (re-run with the same directory to resume)")
+    parser.add_argument("--kind", choices=["text", "image"], default="text")
+    parser.add_argument("--task", default="search_document", help="Text task prefix")
+    parser.add_argument("--batch-size", type=int, default=None, help="Rows per model call (default: MAX_BATCH_SIZE)")
+    parser.add_argument("--dtype", choices=["float16", "float32"], default="float16")
+    parser.add_argument("--no-normalize", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    # Importing the app loads the model
+    import app as nomic_app
+
+    job = nomic_app.create_bulk_job(
+        input_path=args.input,
+        output_dir=args.output,
+        kind=args.kind,
+        task=args.task,
+        normalize=not args.no_normalize,
+        batch_size=args.batch_size or nomic_app.MAX_BATCH_SIZE,
+        dtype=args.dtype,
+    )
+    job.run()
+    print(json.dumps(job.to_dict(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -12,7 +12,8 @@ NC='\033[0m' # No Color
 # Configuration
 BASE_URL="${BASE_URL:-http://localhost:8003}"
 VERBOSE="${VERBOSE:-false}"
-TEST_DIR="test"
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+TEST_DIR="$SCRIPT_DIR/test"
 
 # Test counters
 TESTS_PASSED=0
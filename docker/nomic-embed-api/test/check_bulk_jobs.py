@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Offline checks for bulk_jobs failure handling (no model needed)
+
+- a job whose input is missing, or whose output directory cannot be created,
+  ends up "failed" with an error instead of staying "running"
+- JSONL image paths that escape the job root fail the job
+- a small text job still completes
+
+Usage: python test/check_bulk_jobs.py
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+
+from bulk_jobs import BulkEmbeddingJob  # noqa: E402
+
+DIM = 8
+
+
+def fake_embed(payloads):
+    return np.ones((len(payloads), DIM), dtype=np.float32)
+
+
+def make_job(root, input_path, output_dir, kind="text"):
+    return BulkEmbeddingJob(
+        job_id="check", input_path=input_path, output_dir=output_dir, kind=kind,
+        embed_fn=fake_embed, embedding_dim=DIM, batch_size=2, input_root=root,
+    )
+
+
+def run_in_thread(job):
+    """Run through start() like the API does, so a raising run() must not leave it running"""
+    job.start()
+    job._thread.join(timeout=30)
+    assert not job._thread.is_alive()
+
+
+def write_jsonl(path, records):
+    with open(path, "w") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+
+def check_setup_failures(root):
+    """Outputs that cannot be opened must mark the job failed"""
+    missing = make_job(root, os.path.join(root, "missing.jsonl"), os.path.join(root, "out-missing"))
+    run_in_thread(missing)
+    assert missing.status == "failed" and missing.error, missing.to_dict()
+
+    input_path = os.path.join(root, "texts.jsonl")
+    write_jsonl(input_path, [{"id": 1, "text": "hello"}])
+    blocker = os.path.join(root, "blocker")
+    open(blocker, "w").close()
+    # makedirs fails: a regular file sits where the parent directory should be
+    unwritable = make_job(root, input_path, os.path.join(blocker, "out"))
+    run_in_thread(unwritable)
+    assert unwritable.status == "failed" and unwritable.error, unwritable.to_dict()
+    print("setup failure check: missing input and unwritable output both leave status 'failed'")
+
+
+def check_path_confinement(root, outside):
+    """JSONL image paths resolving outside the job root must not be read"""
+    secret = os.path.join(outside, "secret.jpg")
+    with open(secret, "wb") as f:
+        f.write(b"not for this job")
+
+    for name, path in (("relative", os.path.relpath(secret, root)), ("absolute", secret)):
+        input_path = os.path.join(root, f"images-{name}.jsonl")
+        write_jsonl(input_path, [{"id": name, "path": path}])
+        job = make_job(root, input_path, os.path.join(root, f"out-{name}"), kind="image")
+        run_in_thread(job)
+        assert job.status == "failed" and "inside" in job.error, job.to_dict()
+        assert job.rows_done == 0, job.to_dict()
+    print("path confinement check: ../ and absolute image paths outside the root fail the job")
+
+
+def check_completes(root):
+    input_path = os.path.join(root, "ok.jsonl")
+    write_jsonl(input_path, [{"id": i, "text": f"text {i}"} for i in range(5)])
+    job = make_job(root, input_path, os.path.join(root, "out-ok"))
+    run_in_thread(job)
+    assert job.status == "completed" and job.rows_done == 5, job.to_dict()
+    print("completion check: 5/5 rows embedded")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as root, tempfile.TemporaryDirectory() as outside:
+        check_setup_failures(root)
+        check_path_confinement(root, outside)
+        check_completes(root)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,7 @@
 Test script for Nomic Embed Vision API
 """
 
+import os
 import requests
 import base64
 import json
@@ -12,7 +13,7 @@ from pathlib import Path
 from typing import List
 
 # API base URL
-BASE_URL = "http://localhost:8002"
+BASE_URL = os.environ.get("BASE_URL", "http://localhost:8003")
 
 def calculate_cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
     """Calculate cosine similarity between two vectors"""
@@ -274,8 +275,9 @@ def main():
     if len(sys.argv) > 1:
         test_image = sys.argv[1]
     else:
-        # Look for a test image in the current directory
-        test_images = list(Path('.').glob('*.jpg')) + list(Path('.').glob('*.png'))
+        # Look for a test image in this service's test directory
+        test_dir = Path(__file__).resolve().parent / "test"
+        test_images = sorted(test_dir.glob('*.jpg')) + sorted(test_dir.glob('*.png'))
         if test_images:
             test_image = str(test_images[0])
             print(f"Using test image: {test_image}")
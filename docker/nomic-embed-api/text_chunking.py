@@ -0,0 +1,79 @@
+"""
+Token-window chunking for long-document text embedding
+
+Documents longer than the model's useful context are split into overlapping
+token windows instead of being truncated. Every window carries the task prefix
+and the tokenizer's special tokens, plus the character span it covers in the
+original text so callers can map chunk vectors back to passages.
+"""
+
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+
+@dataclass
+class TextWindow:
+    """One token window of a document, ready to be batched with others"""
+    chunk_index: int
+    input_ids: List[int]
+    num_tokens: int
+    start_char: Optional[int]
+    end_char: Optional[int]
+
+
+def split_token_windows(
+    tokenizer: Any,
+    text: str,
+    prefix: str = "",
+    chunk_tokens: int = 512,
+    overlap_tokens: int = 64,
+) -> List[TextWindow]:
+    """
+    Split text into overlapping token windows of at most chunk_tokens tokens
+
+    Args:
+        tokenizer: HF tokenizer (fast tokenizers also yield character offsets)
+        text: Document text
+        prefix: Task prefix prepended to every window (e.g. "search_document: ")
+        chunk_tokens: Window size including prefix and special tokens
+        overlap_tokens: Tokens shared between consecutive windows
+
+    Returns:
+        Windows in document order; an empty document yields one empty window
+    """
+    prefix_ids = tokenizer(prefix, add_special_tokens=False)["input_ids"] if prefix else []
+    body_tokens = chunk_tokens - len(prefix_ids) - tokenizer.num_special_tokens_to_add(pair=False)
+    if body_tokens <= 0:
+        raise ValueError(f"chunk_tokens={chunk_tokens} leaves no room for text after prefix and special tokens")
+    if not 0 <= overlap_tokens < body_tokens:
+        raise ValueError(f"overlap_tokens must be in [0, {body_tokens}) for chunk_tokens={chunk_tokens}")
+
+    use_offsets = getattr(tokenizer, "is_fast", False)
+    encoded = tokenizer(text, add_special_tokens=False, return_offsets_mapping=use_offsets)
+    ids = encoded["input_ids"]
+    offsets = encoded.get("offset_mapping") if use_offsets else None
+
+    windows = []
+    step = body_tokens - overlap_tokens
+    start = 0
+    while True:
+        end = min(start + body_tokens, len(ids))
+        window_ids = ids[start:end]
+
+        if offsets is None:
+            start_char = end_char = None
+        elif window_ids:
+            start_char, end_char = offsets[start][0], offsets[end - 1][1]
+        else:
+            start_char = end_char = 0
+
+        windows.append(TextWindow(
+            chunk_index=len(windows),
+            input_ids=tokenizer.build_inputs_with_special_tokens(prefix_ids + window_ids),
+            num_tokens=len(window_ids),
+            start_char=start_char,
+            end_char=end_char,
+        ))
+        if end >= len(ids):
+            return windows
+        start += step
@@ -0,0 +1,523 @@
+"""
+In-process IVF-PQ vector collections for Nomic Embed
+
+Lets the embedding service answer "embed this query and find the nearest
+memories" in one call instead of a round trip to Postgres.
+
+Index layout (inner product over L2-normalized vectors):
+- Coarse quantizer: nlist k-means centroids; every vector lives in one list
+- Residual product quantizer: pq_m sub-spaces x 256 centroids, 1 byte each
+- Full vectors kept as float16 or int8 (+ per-row scale) for exact re-ranking
+
+Search probes the nprobe closest lists, ranks candidates with PQ lookup tables,
+then re-ranks the best k * rerank candidates with the stored vectors. nprobe
+and rerank trade recall for latency per query. Collections smaller than
+train_threshold are searched by brute force.
+
+Files per collection directory (all arrays are .npy memmaps that grow by doubling):
+    meta.json      settings, row count, trained flag
+    vectors.npy    (capacity, dim) float16 | int8
+    scales.npy     (capacity,) float32, int8 storage only
+    codes.npy      (capacity, pq_m) uint8 PQ codes
+    lists.npy      (capacity,) int32 coarse list per row (-1 before training)
+    deleted.npy    (capacity,) bool tombstones
+    ids.jsonl      external id per row, append-only
+    centroids.npy, codebooks.npy   trained quantizers
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INITIAL_CAPACITY = 1024
+ROW_ARRAYS = ("vectors", "scales", "codes", "lists", "deleted")
+
+
+def _kmeans(data: np.ndarray, k: int, iterations: int = 20, seed: int = 0) -> np.ndarray:
+    """Lloyd's k-means with random init; empty clusters are re-seeded from random points"""
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(len(data), size=k, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignment = _nearest(data, centroids)
+        counts = np.bincount(assignment, minlength=k)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, data)
+
+        empty = counts == 0
+        centroids[~empty] = sums[~empty] / counts[~empty, None]
+        if empty.any():
+            centroids[empty] = data[rng.choice(len(data), size=int(empty.sum()), replace=False)]
+
+    return centroids
+
+
+def _nearest(data: np.ndarray, centroids: np.ndarray, chunk_size: int = 8192) -> np.ndarray:
+    """Index of the nearest centroid (L2) for each row, chunked to bound memory"""
+    centroid_norms = (centroids ** 2).sum(axis=1)
+    out = np.empty(len(data), dtype=np.int32)
+    for start in range(0, len(data), chunk_size):
+        chunk = data[start:start + chunk_size]
+        distances = centroid_norms[None, :] - 2 * chunk @ centroids.T
+        out[start:start + chunk_size] = distances.argmin(axis=1)
+    return out
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class VectorCollection:
+    """A named, persistent IVF-PQ collection with incremental add and delete"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.RLock()
+        self.closed = False
+
+        with open(self._file("meta.json"), "r") as f:
+            self.meta: Dict[str, Any] = json.load(f)
+
+        self.dim = self.meta["dim"]
+        self.storage = self.meta["storage"]
+        self.pq_m = self.meta["pq_m"]
+        self.dsub = self.dim // self.pq_m
+
+        self._open_arrays()
+        self._load_ids()
+        self._load_quantizers()
+
+    # Creation / persistence -----------------------------------------------
+
+    @classmethod
+    def create(
+        cls,
+        path: str,
+        dim: int,
+        storage: str = "float16",
+        nlist: Optional[int] = None,
+        pq_m: int = 48,
+        train_threshold: int = 10000,
+        nprobe: int = 16,
+        rerank: int = 4,
+    ) -> "VectorCollection":
+        """Create an empty collection on disk"""
+        if storage not in ("float16", "int8"):
+            raise ValueError(f"Unsupported storage: {storage}")
+        if dim % pq_m != 0:
+            raise ValueError(f"pq_m={pq_m} must divide dim={dim}")
+        if os.path.exists(os.path.join(path, "meta.json")):
+            raise FileExistsError(f"Collection already exists at {path}")
+
+        os.makedirs(path, exist_ok=True)
+        meta = {
+            "dim": dim,
+            "storage": storage,
+            "nlist": nlist,
+            "pq_m": pq_m,
+            "train_threshold": train_threshold,
+            "nprobe": nprobe,
+            "rerank": rerank,
+            "count": 0,
+            "capacity": INITIAL_CAPACITY,
+            "trained": False,
+            "created_at": time.time(),
+        }
+        collection_files = cls._row_array_specs(dim, storage, pq_m)
+        for name, (dtype, row_shape) in collection_files.items():
+            array = np.lib.format.open_memmap(
+                os.path.join(path, f"{name}.npy"), mode="w+",
+                dtype=dtype, shape=(INITIAL_CAPACITY, *row_shape)
+            )
+            if name == "lists":
+                array[:] = -1
+            array.flush()
+            del array
+        open(os.path.join(path, "ids.jsonl"), "w").close()
+        cls._write_json(os.path.join(path, "meta.json"), meta)
+        return cls(path)
+
+    @staticmethod
+    def _row_array_specs(dim: int, storage: str, pq_m: int) -> Dict[str, Tuple[Any, Tuple[int, ...]]]:
+        return {
+            "vectors": (np.float16 if storage == "float16" else np.int8, (dim,)),
+            "scales": (np.float32, ()),
+            "codes": (np.uint8, (pq_m,)),
+            "lists": (np.int32, ()),
+            "deleted": (np.bool_, ()),
+        }
+
+    @staticmethod
+    def _write_json(path: str, payload: Dict[str, Any]) -> None:
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(payload, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _open_arrays(self) -> None:
+        for name in ROW_ARRAYS:
+            setattr(self, name, np.load(self._file(f"{name}.npy"), mmap_mode="r+"))
+
+    def _load_ids(self) -> None:
+        """Read row ids; lines past the committed count (crash mid-add) are discarded"""
+        count = self.meta["count"]
+        with open(self._file("ids.jsonl"), "r") as f:
+            lines = f.readlines()
+        if len(lines) != count:
+            lines = lines[:count]
+            with open(self._file("ids.jsonl"), "w") as f:
+                f.writelines(lines)
+
+        self.row_ids: List[Any] = [json.loads(line) for line in lines]
+        self.id_to_row: Dict[Any, int] = {
+            row_id: row for row, row_id in enumerate(self.row_ids) if not self.deleted[row]
+        }
+
+    def _load_quantizers(self) -> None:
+        self.centroids: Optional[np.ndarray] = None
+        self.codebooks: Optional[np.ndarray] = None
+        self._inverted: List[np.ndarray] = []
+        if not self.meta["trained"]:
+            return
+
+        self.centroids = np.load(self._file("centroids.npy"))
+        self.codebooks = np.load(self._file("codebooks.npy"))
+        self._rebuild_inverted_lists()
+
+    def _rebuild_inverted_lists(self) -> None:
+        count = self.meta["count"]
+        lists = np.asarray(self.lists[:count])
+        order = np.argsort(lists, kind="stable").astype(np.int64)
+        bounds = np.searchsorted(lists[order], np.arange(len(self.centroids) + 1))
+        self._inverted = [order[bounds[i]:bounds[i + 1]] for i in range(len(self.centroids))]
+
+    def _grow(self, min_capacity: int) -> None:
+        """Double the row arrays until min_capacity fits (copy into new memmaps)"""
+        capacity = self.meta["capacity"]
+        while capacity < min_capacity:
+            capacity *= 2
+        specs = self._row_array_specs(self.dim, self.storage, self.pq_m)
+
+        for name in ROW_ARRAYS:
+            dtype, row_shape = specs[name]
+            old = getattr(self, name)
+            tmp_path = self._file(f"{name}.npy.tmp")
+            new = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=dtype, shape=(capacity, *row_shape))
+            new[:len(old)] = old
+            if name == "lists":
+                new[len(old):] = -1
+            new.flush()
+            del new, old
+            setattr(self, name, None)
+            os.replace(tmp_path, self._file(f"{name}.npy"))
+
+        self.meta["capacity"] = capacity
+        self._open_arrays()
+
+    def _commit(self) -> None:
+        for name in ROW_ARRAYS:
+            getattr(self, name).flush()
+        self._write_json(self._file("meta.json"), self.meta)
+
+    def _require_open(self) -> None:
+        if self.closed:
+            raise ValueError(f"Collection is closed: {os.path.basename(self.path)}")
+
+    def close(self) -> None:
+        """Flush and release the memmaps; waits for any add, train or search in progress"""
+        with self.lock:
+            if self.closed:
+                return
+            self._commit()
+            for name in ROW_ARRAYS:
+                setattr(self, name, None)
+            self.closed = True
+
+    # Vector storage -------------------------------------------------------
+
+    def _store(self, rows: np.ndarray, vectors: np.ndarray) -> None:
+        if self.storage == "float16":
+            self.vectors[rows] = vectors.astype(np.float16)
+        else:
+            scales = np.abs(vectors).max(axis=1) / 127.0
+            scales = np.maximum(scales, 1e-12)
+            self.vectors[rows] = np.round(vectors / scales[:, None]).astype(np.int8)
+            self.scales[rows] = scales
+
+    def _decode(self, rows: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(self.vectors[rows], dtype=np.float32)
+        if self.storage == "int8":
+            vectors *= np.asarray(self.scales[rows])[:, None]
+        return vectors
+
+    def _encode(self, rows: np.ndarray, vectors: np.ndarray) -> None:
+        """Assign rows to coarse lists and PQ-encode their residuals"""
+        assignment = _nearest(vectors, self.centroids)
+        residuals = vectors - self.centroids[assignment]
+        codes = np.empty((len(vectors), self.pq_m), dtype=np.uint8)
+        for j in range(self.pq_m):
+            sub = residuals[:, j * self.dsub:(j + 1) * self.dsub]
+            codes[:, j] = _nearest(sub, self.codebooks[j])
+        self.lists[rows] = assignment
+        self.codes[rows] = codes
+
+    # Public API -----------------------------------------------------------
+
+    @property
+    def size(self) -> int:
+        return len(self.id_to_row)
+
+    def add(self, ids: Sequence[Any], vectors: np.ndarray) -> int:
+        """Add or replace vectors by id; trains automatically once train_threshold is reached"""
+        if len(ids) == 0:
+            return 0
+        if len(set(ids)) != len(ids):
+            raise ValueError("Duplicate ids in a single add")
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32).reshape(len(ids), self.dim))
+
+        with self.lock:
+            self._require_open()
+            # Upsert: tombstone any previous row for the same id
+            for row_id in ids:
+                previous = self.id_to_row.pop(row_id, None)
+                if previous is not None:
+                    self.deleted[previous] = True
+
+            start = self.meta["count"]
+            rows = np.arange(start, start + len(ids))
+            if start + len(ids) > self.meta["capacity"]:
+                self._grow(start + len(ids))
+
+            self._store(rows, vectors)
+            self.deleted[rows] = False
+            if self.meta["trained"]:
+                self._encode(rows, vectors)
+                new_lists = np.asarray(self.lists[rows])
+                for list_id in np.unique(new_lists):
+                    self._inverted[list_id] = np.concatenate([self._inverted[list_id], rows[new_lists == list_id]])
+
+            with open(self._file("ids.jsonl"), "a") as f:
+                f.write("".join(json.dumps(row_id) + "\n" for row_id in ids))
+            for row, row_id in zip(rows, ids):
+                self.row_ids.append(row_id)
+                self.id_to_row[row_id] = int(row)
+
+            self.meta["count"] = start + len(ids)
+            self._commit()
+
+            if not self.meta["trained"] and self.size >= self.meta["train_threshold"]:
+                self.train()
+
+        return len(ids)
+
+    def delete(self, ids: Sequence[Any]) -> int:
+        """Tombstone vectors by id; returns how many existed"""
+        with self.lock:
+            self._require_open()
+            deleted = 0
+            for row_id in ids:
+                row = self.id_to_row.pop(row_id, None)
+                if row is not None:
+                    self.deleted[row] = True
+                    deleted += 1
+            self._commit()
+        return deleted
+
+    def train(self, sample_size: int = 50000, iterations: int = 20) -> None:
+        """(Re)train the coarse quantizer and PQ codebooks, then re-encode every row"""
+        with self.lock:
+            self._require_open()
+            live_rows = np.fromiter(self.id_to_row.values(), dtype=np.int64, count=self.size)
+            if len(live_rows) == 0:
+                raise ValueError("Cannot train an empty collection")
+
+            rng = np.random.default_rng(0)
+            sample_rows = np.sort(rng.choice(live_rows, size=min(sample_size, len(live_rows)), replace=False))
+            sample = self._decode(sample_rows)
+
+            nlist = self.meta["nlist"] or int(4 * np.sqrt(len(live_rows)))
+            nlist = max(1, min(nlist, len(sample), 65536))
+            ksub = min(256, len(sample))
+
+            started = time.time()
+            centroids = _kmeans(sample, nlist, iterations)
+            residuals = sample - centroids[_nearest(sample, centroids)]
+            codebooks = np.stack([
+                _kmeans(residuals[:, j * self.dsub:(j + 1) * self.dsub], ksub, iterations, seed=j)
+                for j in range(self.pq_m)
+            ])
+
+            self.centroids, self.codebooks = centroids, codebooks
+            np.save(self._file("centroids.npy"), centroids)
+            np.save(self._file("codebooks.npy"), codebooks)
+
+            count = self.meta["count"]
+            for start in range(0, count, 16384):
+                rows = np.arange(start, min(start + 16384, count))
+                self._encode(rows, self._decode(rows))
+
+            self.meta["trained"] = True
+            self.meta["nlist_trained"] = nlist
+            self._rebuild_inverted_lists()
+            self._commit()
+            logger.info(
+                f"Trained collection {os.path.basename(self.path)}: {len(live_rows)} vectors, "
+                f"nlist={nlist}, pq_m={self.pq_m}, {time.time() - started:.1f}s"
+            )
+
+    def _brute_force_rows(self, queries: np.ndarray, k: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Exact top-k by scanning every live row in chunks"""
+        count = self.meta["count"]
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+
+        for start in range(0, count, 65536):
+            rows = np.arange(start, min(start + 65536, count))
+            scores = queries @ self._decode(rows).T
+            scores[:, np.asarray(self.deleted[rows])] = -np.inf
+            best_scores = np.concatenate([best_scores, scores], axis=1)
+            best_rows = np.concatenate([best_rows, np.broadcast_to(rows, scores.shape)], axis=1)
+            if best_scores.shape[1] > k:
+                top = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+                best_scores = np.take_along_axis(best_scores, top, axis=1)
+                best_rows = np.take_along_axis(best_rows, top, axis=1)
+
+        results = []
+        for scores, rows in zip(best_scores, best_rows):
+            order = np.argsort(-scores)
+            keep = np.isfinite(scores[order])
+            results.append((rows[order][keep], scores[order][keep]))
+        return results
+
+    def _ivfpq_rows(self, queries: np.ndarray, k: int, nprobe: int, rerank: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        nprobe = max(1, min(nprobe, len(self.centroids)))
+        coarse = queries @ self.centroids.T
+        # Inner product with the decoded residual splits per sub-space, so the
+        # lookup table is shared by every probed list
+        lut = np.einsum(
+            "qmd,mkd->qmk", queries.reshape(len(queries), self.pq_m, self.dsub), self.codebooks
+        )
+        sub_index = np.arange(self.pq_m)[None, :]
+
+        results = []
+        for i, query in enumerate(queries):
+            probes = np.argpartition(-coarse[i], nprobe - 1)[:nprobe]
+            rows = np.concatenate([self._inverted[p] for p in probes])
+            rows = rows[~np.asarray(self.deleted[rows])]
+            if len(rows) == 0:
+                results.append((rows, np.zeros(0, dtype=np.float32)))
+                continue
+
+            approx = coarse[i, np.asarray(self.lists[rows])] + lut[i][sub_index, np.asarray(self.codes[rows])].sum(axis=1)
+            n_candidates = min(len(rows), k * max(rerank, 1))
+            # Sorted rows keep the memmap gather sequential
+            candidates = np.sort(rows[np.argpartition(-approx, n_candidates - 1)[:n_candidates]])
+            exact = self._decode(candidates) @ query
+            order = np.argsort(-exact)[:k]
+            results.append((candidates[order], exact[order]))
+        return results
+
+    def search_rows(
+        self, queries: np.ndarray, k: int = 10, nprobe: Optional[int] = None, rerank: Optional[int] = None,
+        exact: bool = False,
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        queries = _normalize(np.asarray(queries, dtype=np.float32).reshape(-1, self.dim))
+        with self.lock:
+            self._require_open()
+            if exact or not self.meta["trained"]:
+                return self._brute_force_rows(queries, k)
+            return self._ivfpq_rows(
+                queries, k,
+                nprobe if nprobe is not None else self.meta["nprobe"],
+                rerank if rerank is not None else self.meta["rerank"],
+            )
+
+    def search(
+        self, queries: np.ndarray, k: int = 10, nprobe: Optional[int] = None, rerank: Optional[int] = None,
+        exact: bool = False,
+    ) -> List[List[Dict[str, Any]]]:
+        """Top-k ids and cosine scores for each query"""
+        results = self.search_rows(queries, k, nprobe, rerank, exact)
+        return [
+            [{"id": self.row_ids[row], "score": float(score)} for row, score in zip(rows, scores)]
+            for rows, scores in results
+        ]
+
+    def benchmark(
+        self, k: int = 10, nprobe_values: Sequence[int] = (1, 4, 16, 64), rerank: Optional[int] = None,
+        num_queries: int = 100, noise: float = 0.05, seed: int = 0,
+    ) -> Dict[str, Any]:
+        """
+        Measure recall@k and latency against brute-force search
+
+        Queries are stored vectors perturbed with Gaussian noise, so the exact
+        neighbor is not trivially the query itself.
+        """
+        with self.lock:
+            self._require_open()
+            live_rows = np.fromiter(self.id_to_row.values(), dtype=np.int64, count=self.size)
+            if len(live_rows) == 0:
+                raise ValueError("Cannot benchmark an empty collection")
+            rng = np.random.default_rng(seed)
+            query_rows = np.sort(rng.choice(live_rows, size=min(num_queries, len(live_rows)), replace=False))
+            queries = self._decode(query_rows)
+            queries += rng.normal(scale=noise / np.sqrt(self.dim), size=queries.shape).astype(np.float32)
+
+            started = time.perf_counter()
+            truth = self.search_rows(queries, k, exact=True)
+            brute_force_ms = (time.perf_counter() - started) * 1000 / len(queries)
+
+            results = []
+            if self.meta["trained"]:
+                for nprobe in nprobe_values:
+                    started = time.perf_counter()
+                    approx = self.search_rows(queries, k, nprobe=nprobe, rerank=rerank)
+                    elapsed_ms = (time.perf_counter() - started) * 1000 / len(queries)
+                    recall = np.mean([
+                        len(set(a_rows.tolist()) & set(t_rows.tolist())) / max(len(t_rows), 1)
+                        for (a_rows, _), (t_rows, _) in zip(approx, truth)
+                    ])
+                    results.append({
+                        "nprobe": nprobe,
+                        "rerank": rerank if rerank is not None else self.meta["rerank"],
+                        "recall_at_k": round(float(recall), 4),
+                        "ms_per_query": round(elapsed_ms, 3),
+                    })
+
+        return {
+            "k": k,
+            "num_queries": len(queries),
+            "size": self.size,
+            "trained": self.meta["trained"],
+            "brute_force_ms_per_query": round(brute_force_ms, 3),
+            "results": results,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": os.path.basename(self.path),
+            "size": self.size,
+            "rows": self.meta["count"],
+            "capacity": self.meta["capacity"],
+            "dim": self.dim,
+            "storage": self.storage,
+            "trained": self.meta["trained"],
+            "nlist": self.meta.get("nlist_trained", self.meta["nlist"]),
+            "pq_m": self.pq_m,
+            "nprobe": self.meta["nprobe"],
+            "rerank": self.meta["rerank"],
+            "train_threshold": self.meta["train_threshold"],
+        }
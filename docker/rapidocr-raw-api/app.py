@@ -1,7 +1,8 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request
 from fastapi.responses import JSONResponse, FileResponse
 from pydantic import BaseModel, HttpUrl
 from rapidocr_onnxruntime import RapidOCR
+import asyncio
 import base64
 import io
 import os
@@ -9,11 +10,19 @@ import tempfile
 from PIL import Image
 import numpy as np
 from typing import Optional, List, Dict, Any
-import requests
 import logging
 import shutil
+import time
 from pathlib import Path
 
+from admission import AdmissionController, AdmissionMiddleware
+from engine_pool import OCREnginePool, default_pool_size, parse_ocr_result, thread_kwargs
+from fetch import AsyncFetcher, FetchError
+from local_input import BytesLike, InputError, LocalInput
+from ocr_cache import OCRCache, scale_boxes
+from screen_sessions import ScreenOCR
+from tiling import decode_rgb, image_size, ocr_tiled
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -23,6 +32,22 @@ app = FastAPI(title="RapidOCR Raw API", version="1.0.0")
 # Model paths configuration
 MODEL_DIR = os.environ.get("MODEL_DIR", "/app/models")
 AUTO_DOWNLOAD_MODELS = os.environ.get("AUTO_DOWNLOAD_MODELS", "true").lower() == "true"
+OCR_ENGINES = int(os.environ.get("OCR_ENGINES", str(default_pool_size())))
+OCR_INTRA_OP_THREADS = int(os.environ.get("OCR_INTRA_OP_THREADS", str(max(1, (os.cpu_count() or 1) // OCR_ENGINES))))
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", "64"))
+OCR_TILE_SIZE = int(os.environ.get("OCR_TILE_SIZE", "1280"))
+OCR_TILE_OVERLAP = int(os.environ.get("OCR_TILE_OVERLAP", "160"))
+# Images whose longest side exceeds this are tiled automatically (0 disables auto tiling)
+OCR_TILE_THRESHOLD = int(os.environ.get("OCR_TILE_THRESHOLD", "2400"))
+OCR_CACHE_SIZE = int(os.environ.get("OCR_CACHE_SIZE", "10000"))  # 0 disables the result cache
+OCR_CACHE_TTL = float(os.environ.get("OCR_CACHE_TTL", "86400"))
+OCR_CACHE_HASH_SIZE = int(os.environ.get("OCR_CACHE_HASH_SIZE", "16"))  # hash is size x size bits
+OCR_CACHE_MAX_DISTANCE = int(os.environ.get("OCR_CACHE_MAX_DISTANCE", "10"))
+SCREEN_BLOCK_SIZE = int(os.environ.get("SCREEN_BLOCK_SIZE", "32"))
+SCREEN_DIFF_THRESHOLD = int(os.environ.get("SCREEN_DIFF_THRESHOLD", "16"))
+SCREEN_FULL_OCR_RATIO = float(os.environ.get("SCREEN_FULL_OCR_RATIO", "0.6"))
+SCREEN_MAX_SESSIONS = int(os.environ.get("SCREEN_MAX_SESSIONS", "32"))
+SCREEN_SESSION_TTL = float(os.environ.get("SCREEN_SESSION_TTL", "600"))
 
 def download_default_models():
     """
@@ -73,8 +98,8 @@ def download_default_models():
         logger.error(f"Error copying default models: {e}")
         return False
 
-def initialize_engine():
-    """Initialize RapidOCR engine with proper model paths"""
+def resolve_model_paths() -> Dict[str, str]:
+    """Find det/rec/cls models in MODEL_DIR (copying them from the package if allowed)"""
     
     # Check if models directory exists and has models
     models_exist = os.path.exists(MODEL_DIR) and any(f.endswith('.onnx') for f in os.listdir(MODEL_DIR))
@@ -109,31 +134,99 @@ def initialize_engine():
         
         # Initialize with found models
         if det_model or rec_model:
-            return RapidOCR(
-                det_model_path=det_model,
-                rec_model_path=rec_model,
-                cls_model_path=cls_model
-            )
+            return {
+                "det_model_path": det_model,
+                "rec_model_path": rec_model,
+                "cls_model_path": cls_model
+            }
         else:
             logger.warning("Found ONNX files but couldn't identify model types, using defaults")
-            return RapidOCR()
+            return {}
     else:
         logger.warning(f"No models found in {MODEL_DIR}, using default models from package")
-        return RapidOCR()
+        return {}
+
+def initialize_engine_pool() -> OCREnginePool:
+    """Start OCR_ENGINES RapidOCR engines sharing the resolved model paths"""
+    engine_kwargs = {**resolve_model_paths(), **thread_kwargs(OCR_INTRA_OP_THREADS)}
+    return OCREnginePool(
+        lambda: RapidOCR(**engine_kwargs),
+        size=OCR_ENGINES,
+        intra_op_num_threads=OCR_INTRA_OP_THREADS,
+    )
+
+# Pooled, size-capped downloader for /ocr/url (configured via FETCH_* env vars)
+fetcher = AsyncFetcher.from_env()
 
-# Initialize the engine and track model loading status
-engine = initialize_engine()
+# Raw request bodies and path / file:// references under INPUT_ROOTS
+local_input = LocalInput.from_env()
+
+# Concurrency limits, X-Priority classes and deadlines for POST requests (ADMISSION_* env vars)
+admission = AdmissionController.from_env(default_concurrency=OCR_ENGINES * 2)
+app.add_middleware(AdmissionMiddleware, controller=admission)
+
+# Initialize the engine pool and track model loading status
+engine_pool = initialize_engine_pool()
 models_loaded_from_volume = os.path.exists(MODEL_DIR) and any(f.endswith('.onnx') for f in os.listdir(MODEL_DIR) if os.path.exists(MODEL_DIR))
 
+# Exact + perceptual-hash cache of OCR results
+ocr_cache = OCRCache(
+    max_entries=OCR_CACHE_SIZE,
+    ttl=OCR_CACHE_TTL,
+    max_distance=OCR_CACHE_MAX_DISTANCE,
+    hash_size=OCR_CACHE_HASH_SIZE,
+)
+
+# Per-device previous frames and lines for /ocr/screen
+screen_ocr = ScreenOCR(
+    engine_pool,
+    block_size=SCREEN_BLOCK_SIZE,
+    diff_threshold=SCREEN_DIFF_THRESHOLD,
+    full_ocr_ratio=SCREEN_FULL_OCR_RATIO,
+    max_sessions=SCREEN_MAX_SESSIONS,
+    session_ttl=SCREEN_SESSION_TTL,
+)
+
+@app.on_event("shutdown")
+async def shutdown_resources():
+    """Close pooled HTTP connections and stop the OCR worker threads"""
+    await fetcher.aclose()
+    engine_pool.shutdown()
+
 class OCRRequest(BaseModel):
     """Request model for OCR with base64 image"""
     image_base64: str
     visualize: bool = False
+    tiled: Optional[bool] = None  # None = tile automatically when the image is very tall/wide
 
 class OCRURLRequest(BaseModel):
     """Request model for OCR with image URL"""
     image_url: HttpUrl
     visualize: bool = False
+    tiled: Optional[bool] = None
+
+class OCRPathRequest(BaseModel):
+    """Request model for OCR with a path or file:// URL under INPUT_ROOTS"""
+    path: str
+    visualize: bool = False
+    tiled: Optional[bool] = None
+
+class OCRScreenRequest(BaseModel):
+    """Request model for incremental screen OCR"""
+    device_id: str
+    image_base64: str
+
+class OCRScreenPathRequest(BaseModel):
+    """Request model for incremental screen OCR of a frame under INPUT_ROOTS"""
+    device_id: str
+    path: str
+
+class OCRBatchRequest(BaseModel):
+    """Request model for batch OCR (base64 images, URLs and/or paths, results keep input order)"""
+    images_base64: List[str] = []
+    image_urls: List[HttpUrl] = []
+    paths: List[str] = []
+    tiled: Optional[bool] = None
 
 class OCRResponse(BaseModel):
     """Response model for OCR results"""
@@ -142,6 +235,165 @@ class OCRResponse(BaseModel):
     boxes: Optional[List[Dict[str, Any]]] = None
     error: Optional[str] = None
     visualization_path: Optional[str] = None
+    timings: Optional[Dict[str, float]] = None  # det_ms, cls_ms, rec_ms, total_ms
+    tiles: Optional[int] = None  # Number of tiles when the image was OCR'd in tiled mode
+    screen: Optional[Dict[str, Any]] = None  # Incremental screen OCR details (mode, regions, reused lines)
+    cache: Optional[str] = None  # exact, perceptual or miss when the result cache is enabled
+
+class OCRBatchResponse(BaseModel):
+    """Response model for batch OCR results"""
+    success: bool
+    results: List[OCRResponse] = []
+    error: Optional[str] = None
+    processing_time_ms: Optional[float] = None
+
+CACHED_FIELDS = ("success", "text", "boxes", "error", "tiles")
+NO_TEXT_ERROR = "No text detected in the image"
+
+def build_ocr_response(result: Any, total_ms: float) -> OCRResponse:
+    """
+    Convert a raw RapidOCR result into an OCRResponse
+    
+    Args:
+        result: Raw return value of the engine
+        total_ms: Wall time spent in the engine call
+    
+    Returns:
+        OCRResponse with text, boxes and per-stage timings
+    """
+    try:
+        texts, boxes, timings = parse_ocr_result(result)
+    except Exception as e:
+        logger.error(f"Error processing OCR result: {str(e)}")
+        logger.error(f"Result structure: {result}")
+        return OCRResponse(
+            success=False,
+            error=f"Error processing OCR result: {str(e)}"
+        )
+    
+    timings = {**(timings or {}), "total_ms": total_ms}
+    if not boxes:
+        return OCRResponse(
+            success=False,
+            error=NO_TEXT_ERROR,
+            timings=timings
+        )
+    
+    return OCRResponse(
+        success=True,
+        text="\n".join(texts),
+        boxes=boxes,
+        timings=timings
+    )
+
+def should_tile(image_data: BytesLike, tiled: Optional[bool]) -> bool:
+    """Explicit request wins; otherwise tile when the longest side exceeds OCR_TILE_THRESHOLD"""
+    if tiled is not None:
+        return tiled
+    if OCR_TILE_THRESHOLD <= 0:
+        return False
+    try:
+        return max(image_size(image_data)) > OCR_TILE_THRESHOLD
+    except Exception:
+        # Let the engine report undecodable images
+        return False
+
+async def lookup_ocr_cache(image_data: BytesLike, key: str, variant: str, perceptual: bool):
+    """
+    Look an image up by content hash, then by perceptual hash
+    
+    Returns:
+        (response or None, (phash, (width, height)) or None for storing a miss)
+    """
+    entry = ocr_cache.get_exact(key)
+    if entry is not None:
+        ocr_cache.record("exact")
+        return OCRResponse(**entry.payload, cache="exact"), None
+    
+    phash = None
+    if perceptual:
+        try:
+            phash = await asyncio.to_thread(ocr_cache.perceptual_hash, image_data)
+        except Exception:
+            # Let the engine report undecodable images
+            phash = None
+    
+    if phash is not None:
+        match = ocr_cache.get_similar(phash[0], phash[1], variant)
+        if match is not None:
+            entry, distance = match
+            width, height = phash[1]
+            payload = dict(entry.payload)
+            if payload.get("boxes"):
+                payload["boxes"] = scale_boxes(payload["boxes"], width / entry.width, height / entry.height)
+            ocr_cache.record("perceptual")
+            return OCRResponse(**payload, cache="perceptual"), phash
+    
+    ocr_cache.record(None)
+    return None, phash
+
+async def run_ocr(image_data: BytesLike, visualize: bool = False, tiled: Optional[bool] = None) -> OCRResponse:
+    """Run OCR on one image in the engine pool (tiled for very tall or wide images), via the result cache"""
+    start = time.perf_counter()
+    use_tiles = should_tile(image_data, tiled)
+    variant = "tiled" if use_tiles else "full"
+    
+    cache_key = phash = None
+    if ocr_cache.max_entries > 0:
+        cache_key = OCRCache.content_key(image_data, variant)
+        # Tile-sized pages hash too coarsely to tell templates apart; exact hits only
+        cached, phash = await lookup_ocr_cache(image_data, cache_key, variant, perceptual=not use_tiles)
+        if cached is not None:
+            cached.timings = {"total_ms": (time.perf_counter() - start) * 1000}
+            return cached
+    
+    num_tiles = None
+    if use_tiles:
+        image = await asyncio.to_thread(decode_rgb, image_data)
+        result, num_tiles = await ocr_tiled(engine_pool, image, OCR_TILE_SIZE, OCR_TILE_OVERLAP)
+    else:
+        # RapidOCR takes bytes, arrays or paths; memory-mapped input is copied once here
+        result = await engine_pool.run(image_data if isinstance(image_data, bytes) else bytes(image_data))
+    response = build_ocr_response(result, (time.perf_counter() - start) * 1000)
+    response.tiles = num_tiles
+    
+    if cache_key is not None:
+        response.cache = "miss"
+        if response.success or response.error == NO_TEXT_ERROR:
+            payload = {field: getattr(response, field) for field in CACHED_FIELDS}
+            ocr_cache.put(
+                cache_key, variant,
+                phash[0] if phash else None, phash[1] if phash else (0, 0),
+                payload
+            )
+    
+    # Generate visualization if requested
+    if visualize and response.boxes:
+        # Note: Visualization is currently not supported with the new result format
+        # You would need to implement custom visualization using PIL/OpenCV
+        # For now, we'll skip visualization
+        logger.info("Visualization requested but not implemented for current result format")
+        response.visualization_path = None
+    
+    return response
+
+async def run_screen_ocr(device_id: str, image_data: BytesLike) -> OCRResponse:
+    """OCR a screen frame, re-reading only the regions that changed since the device's last frame"""
+    start = time.perf_counter()
+    result, info = await screen_ocr.process(device_id, image_data)
+    response = build_ocr_response(result, (time.perf_counter() - start) * 1000)
+    response.screen = info
+    return response
+
+async def run_ocr_batch(images: List[BytesLike], tiled: Optional[bool] = None) -> List[OCRResponse]:
+    """Spread images across the engine pool, keeping per-image failures in place"""
+    async def _one(image_data: BytesLike) -> OCRResponse:
+        try:
+            return await run_ocr(image_data, tiled=tiled)
+        except Exception as e:
+            return OCRResponse(success=False, error=str(e))
+    
+    return list(await asyncio.gather(*(_one(image_data) for image_data in images)))
 
 @app.get("/")
 async def root():
@@ -153,6 +405,17 @@ async def root():
             "/ocr/file": "POST - Upload image file for OCR",
             "/ocr/base64": "POST - Send base64 encoded image for OCR",
             "/ocr/url": "POST - Send image URL for OCR",
+            "/ocr/raw": "POST - Send the image itself as an application/octet-stream body",
+            "/ocr/path": "POST - OCR a file under INPUT_ROOTS by path or file:// URL",
+            "/ocr/batch": "POST - OCR many base64 images / URLs across the engine pool",
+            "/ocr/batch/file": "POST - OCR many uploaded files across the engine pool",
+            "/ocr/screen": "POST - Incremental OCR of a device's screen frame (base64)",
+            "/ocr/screen/file": "POST - Incremental OCR of a device's screen frame (upload)",
+            "/ocr/screen/raw": "POST - Incremental OCR of a device's screen frame (octet-stream body)",
+            "/ocr/screen/path": "POST - Incremental OCR of a device's screen frame (path under INPUT_ROOTS)",
+            "/ocr/screen/{device_id}": "DELETE - Drop a device's cached frame",
+            "/cache": "GET - OCR result cache hit rates / DELETE - Clear the cache",
+            "/admission": "GET - Admission queue depth, wait and service times per priority",
             "/health": "GET - Health check",
             "/healthz": "GET - Health check (Kubernetes-style)",
             "/docs": "GET - API documentation"
@@ -167,13 +430,31 @@ async def health_check():
         "status": "healthy",
         "service": "rapidocr",
         "model_dir": MODEL_DIR,
-        "models_loaded_from_volume": models_loaded_from_volume
+        "models_loaded_from_volume": models_loaded_from_volume,
+        "engine_pool": engine_pool.settings(),
+        "engine_stats": engine_pool.stats,
+        "max_batch_size": MAX_BATCH_SIZE,
+        "tiling": {
+            "tile_size": OCR_TILE_SIZE,
+            "overlap": OCR_TILE_OVERLAP,
+            "auto_threshold": OCR_TILE_THRESHOLD
+        },
+        "cache": ocr_cache.settings(),
+        "cache_stats": ocr_cache.summary(),
+        "screen": screen_ocr.settings(),
+        "screen_stats": screen_ocr.summary(),
+        "fetch": fetcher.settings(),
+        "fetch_stats": fetcher.stats,
+        "local_input": local_input.settings(),
+        "admission": admission.settings(),
+        "admission_stats": admission.metrics()
     }
 
 @app.post("/ocr/file", response_model=OCRResponse)
 async def ocr_from_file(
     file: UploadFile = File(...),
-    visualize: bool = False
+    visualize: bool = False,
+    tiled: Optional[bool] = None
 ):
     """
     Perform OCR on an uploaded image file
@@ -181,6 +462,7 @@ async def ocr_from_file(
     Args:
         file: Image file (JPEG, PNG, etc.)
         visualize: Whether to generate visualization of detected text boxes
+        tiled: Force tiled OCR on/off (default: automatic for very tall/wide images)
     
     Returns:
         OCR results with detected text and bounding boxes
@@ -190,92 +472,7 @@ async def ocr_from_file(
         content = await file.read()
         
         # Process with RapidOCR
-        result = engine(content)
-        
-        if result is None or (isinstance(result, tuple) and result[0] is None):
-            return OCRResponse(
-                success=False,
-                error="No text detected in the image"
-            )
-        
-        # Extract text and boxes
-        texts = []
-        boxes = []
-        
-        # Debug logging
-        logger.info(f"Result type: {type(result)}")
-        if isinstance(result, tuple):
-            logger.info(f"Result tuple length: {len(result)}")
-            for i, item in enumerate(result):
-                logger.info(f"Result[{i}] type: {type(item)}, is None: {item is None}")
-        
-        # RapidOCR can return different formats based on version
-        try:
-            if isinstance(result, tuple):
-                if len(result) == 2:
-                    # Format: (result_list, elapsed_time) 
-                    actual_results, elapsed = result
-                    if actual_results is not None:
-                        for item in actual_results:
-                            if len(item) == 3:
-                                box, text, score = item
-                                texts.append(text)
-                                boxes.append({
-                                    "box": box.tolist() if hasattr(box, 'tolist') else box,
-                                    "text": text,
-                                    "score": float(score)
-                                })
-                elif len(result) == 3:
-                    # Format: (boxes, texts, scores)
-                    boxes_list, texts_list, scores_list = result
-                    if boxes_list is not None and texts_list is not None:
-                        for box, text, score in zip(boxes_list, texts_list, scores_list):
-                            texts.append(text)
-                            boxes.append({
-                                "box": box.tolist() if hasattr(box, 'tolist') else box,
-                                "text": text,
-                                "score": float(score)
-                            })
-            elif isinstance(result, list):
-                # Format: list of [box, text, score]
-                for item in result:
-                    if len(item) == 3:
-                        box, text, score = item
-                        texts.append(text)
-                        boxes.append({
-                            "box": box.tolist() if hasattr(box, 'tolist') else box,
-                            "text": text,
-                            "score": float(score)
-                        })
-            else:
-                logger.error(f"Unexpected result format: {type(result)}")
-                return OCRResponse(
-                    success=False,
-                    error=f"Unexpected OCR result format: {type(result)}"
-                )
-        except Exception as e:
-            logger.error(f"Error processing OCR result: {str(e)}")
-            logger.error(f"Result structure: {result}")
-            return OCRResponse(
-                success=False,
-                error=f"Error processing OCR result: {str(e)}"
-            )
-        
-        response = OCRResponse(
-            success=True,
-            text="\n".join(texts),
-            boxes=boxes
-        )
-        
-        # Generate visualization if requested
-        if visualize and len(boxes) > 0:
-            # Note: Visualization is currently not supported with the new result format
-            # You would need to implement custom visualization using PIL/OpenCV
-            # For now, we'll skip visualization
-            logger.info("Visualization requested but not implemented for current result format")
-            response.visualization_path = None
-        
-        return response
+        return await run_ocr(content, visualize, tiled)
         
     except Exception as e:
         return OCRResponse(
@@ -302,62 +499,7 @@ async def ocr_from_base64(request: OCRRequest):
             raise HTTPException(status_code=422, detail=str(e))
         
         # Process with RapidOCR
-        result = engine(image_data)
-        
-        if result is None:
-            return OCRResponse(
-                success=False,
-                error="No text detected in the image"
-            )
-        
-        # Extract text and boxes
-        # RapidOCR returns: (boxes_list, texts_list, scores_list) or list of [box, text, score]
-        texts = []
-        boxes = []
-        
-        # Check the format of the result
-        if isinstance(result, tuple) and len(result) == 3:
-            # New format: (boxes_list, texts_list, scores_list)
-            boxes_list, texts_list, scores_list = result
-            if boxes_list is not None and texts_list is not None:
-                for box, text, score in zip(boxes_list, texts_list, scores_list):
-                    texts.append(text)
-                    boxes.append({
-                        "box": box.tolist() if hasattr(box, 'tolist') else box,
-                        "text": text,
-                        "score": float(score)
-                    })
-        elif isinstance(result, list):
-            # Old format: list of [box, text, score]
-            for detection in result:
-                if len(detection) == 3:
-                    box, text, score = detection
-                    texts.append(text)
-                    boxes.append({
-                        "box": box.tolist() if hasattr(box, 'tolist') else box,
-                        "text": text,
-                        "score": float(score)
-                    })
-        else:
-            logger.warning(f"Unexpected result format: {type(result)}")
-            return OCRResponse(
-                success=False,
-                error="Unexpected OCR result format"
-            )
-        
-        response = OCRResponse(
-            success=True,
-            text="\n".join(texts),
-            boxes=boxes
-        )
-        
-        # Generate visualization if requested
-        if request.visualize:
-            vis_path = f"/tmp/vis_{os.urandom(8).hex()}.jpg"
-            result.vis(vis_path)
-            response.visualization_path = vis_path
-        
-        return response
+        return await run_ocr(image_data, request.visualize, request.tiled)
         
     except HTTPException:
         raise
@@ -379,102 +521,254 @@ async def ocr_from_url(request: OCRURLRequest):
         OCR results with detected text and bounding boxes
     """
     try:
-        # Download image from URL
-        response = requests.get(str(request.image_url), timeout=30)
-        response.raise_for_status()
+        # Download image from URL (non-blocking, size capped)
+        content = await fetcher.fetch(str(request.image_url))
         
         # Process with RapidOCR
-        result = engine(response.content)
-        
-        if result is None:
-            return OCRResponse(
-                success=False,
-                error="No text detected in the image"
-            )
+        return await run_ocr(content, request.visualize, request.tiled)
         
-        # Extract text and boxes
-        texts = []
-        boxes = []
-        
-        # Debug logging
-        logger.info(f"URL Result type: {type(result)}")
-        if isinstance(result, tuple):
-            logger.info(f"URL Result tuple length: {len(result)}")
-        
-        # Handle different result formats from RapidOCR
+    except FetchError as e:
+        raise HTTPException(status_code=422, detail=f"Failed to download image: {str(e)}")
+    except Exception as e:
+        return OCRResponse(
+            success=False,
+            error=str(e)
+        )
+
+@app.post("/ocr/raw", response_model=OCRResponse)
+async def ocr_from_raw(request: Request, visualize: bool = False, tiled: Optional[bool] = None):
+    """
+    Perform OCR on an image sent as the raw request body (Content-Type: application/octet-stream)
+    
+    Args:
+        visualize: Whether to generate visualization of detected text boxes
+        tiled: Force tiled OCR on/off (default: automatic for very tall/wide images)
+    
+    Returns:
+        OCR results with detected text and bounding boxes
+    """
+    try:
+        image_data = await local_input.read_body(request)
+    except InputError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    try:
+        return await run_ocr(image_data, visualize, tiled)
+    except Exception as e:
+        return OCRResponse(
+            success=False,
+            error=str(e)
+        )
+
+@app.post("/ocr/path", response_model=OCRResponse)
+async def ocr_from_path(request: OCRPathRequest):
+    """
+    Perform OCR on a file on a shared volume, memory-mapped instead of uploaded
+    
+    Args:
+        request: OCRPathRequest with a path or file:// URL inside INPUT_ROOTS
+    
+    Returns:
+        OCR results with detected text and bounding boxes
+    """
+    try:
+        image_data = await asyncio.to_thread(local_input.read, request.path)
+    except InputError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    try:
+        return await run_ocr(image_data, request.visualize, request.tiled)
+    except Exception as e:
+        return OCRResponse(
+            success=False,
+            error=str(e)
+        )
+
+@app.post("/ocr/batch", response_model=OCRBatchResponse)
+async def ocr_batch(request: OCRBatchRequest):
+    """
+    Perform OCR on many images at once, spread across the engine pool
+    
+    Args:
+        request: OCRBatchRequest with base64 images, image URLs and/or paths
+    
+    Returns:
+        One OCRResponse per image (base64 images first, then URLs, then paths, in input order)
+    """
+    start = time.perf_counter()
+    
+    num_images = len(request.images_base64) + len(request.image_urls) + len(request.paths)
+    if num_images == 0:
+        raise HTTPException(status_code=422, detail="No images provided")
+    if num_images > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=422, detail=f"Batch size {num_images} exceeds maximum {MAX_BATCH_SIZE}")
+    
+    try:
+        images = [base64.b64decode(image_base64) for image_base64 in request.images_base64]
+    except Exception as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    try:
+        images.extend(await fetcher.fetch_many([str(url) for url in request.image_urls]))
+    except FetchError as e:
+        raise HTTPException(status_code=422, detail=f"Failed to download image: {str(e)}")
+    
+    try:
+        images.extend(await asyncio.to_thread(local_input.read_many, request.paths))
+    except InputError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    results = await run_ocr_batch(images, request.tiled)
+    return OCRBatchResponse(
+        success=True,
+        results=results,
+        processing_time_ms=(time.perf_counter() - start) * 1000
+    )
+
+@app.post("/ocr/batch/file", response_model=OCRBatchResponse)
+async def ocr_batch_files(files: List[UploadFile] = File(...), tiled: Optional[bool] = None):
+    """
+    Perform OCR on many uploaded image files, spread across the engine pool
+    
+    Args:
+        files: Image files (JPEG, PNG, etc.)
+        tiled: Force tiled OCR on/off (default: automatic for very tall/wide images)
+    
+    Returns:
+        One OCRResponse per file, in upload order
+    """
+    start = time.perf_counter()
+    
+    if len(files) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=422, detail=f"Batch size {len(files)} exceeds maximum {MAX_BATCH_SIZE}")
+    
+    images = [await file.read() for file in files]
+    results = await run_ocr_batch(images, tiled)
+    return OCRBatchResponse(
+        success=True,
+        results=results,
+        processing_time_ms=(time.perf_counter() - start) * 1000
+    )
+
+@app.post("/ocr/screen", response_model=OCRResponse)
+async def ocr_screen(request: OCRScreenRequest):
+    """
+    Perform incremental OCR on a screen frame
+    
+    Args:
+        request: OCRScreenRequest with device_id and base64 encoded frame
+    
+    Returns:
+        OCR results for the whole frame, plus which regions were re-read
+    """
+    try:
         try:
-            if isinstance(result, tuple):
-                if len(result) == 2:
-                    # Format: (result_list, elapsed_time) 
-                    actual_results, elapsed = result
-                    if actual_results is not None:
-                        for item in actual_results:
-                            if len(item) == 3:
-                                box, text, score = item
-                                texts.append(text)
-                                boxes.append({
-                                    "box": box.tolist() if hasattr(box, 'tolist') else box,
-                                    "text": text,
-                                    "score": float(score)
-                                })
-                elif len(result) == 3:
-                    # Format: (boxes_list, texts_list, scores_list)
-                    boxes_list, texts_list, scores_list = result
-                    if boxes_list is not None and texts_list is not None:
-                        for box, text, score in zip(boxes_list, texts_list, scores_list):
-                            texts.append(text)
-                            boxes.append({
-                                "box": box.tolist() if hasattr(box, 'tolist') else box,
-                                "text": text,
-                                "score": float(score)
-                            })
-            elif isinstance(result, list):
-                # Format: list of [box, text, score]
-                for item in result:
-                    if len(item) == 3:
-                        box, text, score = item
-                        texts.append(text)
-                        boxes.append({
-                            "box": box.tolist() if hasattr(box, 'tolist') else box,
-                            "text": text,
-                            "score": float(score)
-                        })
-            else:
-                logger.error(f"Unexpected URL result format: {type(result)}")
-                return OCRResponse(
-                    success=False,
-                    error=f"Unexpected OCR result format: {type(result)}"
-                )
+            image_data = base64.b64decode(request.image_base64)
         except Exception as e:
-            logger.error(f"Error processing URL OCR result: {str(e)}")
-            logger.error(f"URL Result structure: {result}")
-            return OCRResponse(
-                success=False,
-                error=f"Error processing OCR result: {str(e)}"
-            )
-        
-        response_data = OCRResponse(
-            success=True,
-            text="\n".join(texts),
-            boxes=boxes
-        )
-        
-        # Generate visualization if requested
-        if request.visualize:
-            vis_path = f"/tmp/vis_{os.urandom(8).hex()}.jpg"
-            result.vis(vis_path)
-            response_data.visualization_path = vis_path
+            raise HTTPException(status_code=422, detail=str(e))
         
-        return response_data
+        return await run_screen_ocr(request.device_id, image_data)
         
-    except requests.RequestException as e:
-        raise HTTPException(status_code=422, detail=f"Failed to download image: {str(e)}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        return OCRResponse(
+            success=False,
+            error=str(e)
+        )
+
+@app.post("/ocr/screen/file", response_model=OCRResponse)
+async def ocr_screen_file(device_id: str, file: UploadFile = File(...)):
+    """
+    Perform incremental OCR on an uploaded screen frame
+    
+    Args:
+        device_id: Capture source; frames are diffed against this device's previous frame
+        file: Frame image (PNG, JPEG, etc.)
+    
+    Returns:
+        OCR results for the whole frame, plus which regions were re-read
+    """
+    try:
+        content = await file.read()
+        return await run_screen_ocr(device_id, content)
+    except Exception as e:
+        return OCRResponse(
+            success=False,
+            error=str(e)
+        )
+
+@app.post("/ocr/screen/raw", response_model=OCRResponse)
+async def ocr_screen_raw(request: Request, device_id: str):
+    """
+    Perform incremental OCR on a screen frame sent as the raw request body
+    
+    Args:
+        device_id: Capture source; frames are diffed against this device's previous frame
+    
+    Returns:
+        OCR results for the whole frame, plus which regions were re-read
+    """
+    try:
+        image_data = await local_input.read_body(request)
+    except InputError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    try:
+        return await run_screen_ocr(device_id, image_data)
     except Exception as e:
         return OCRResponse(
             success=False,
             error=str(e)
         )
 
+@app.post("/ocr/screen/path", response_model=OCRResponse)
+async def ocr_screen_path(request: OCRScreenPathRequest):
+    """
+    Perform incremental OCR on a screen frame that is already on a shared volume
+    
+    Args:
+        request: OCRScreenPathRequest with device_id and a path or file:// URL inside INPUT_ROOTS
+    
+    Returns:
+        OCR results for the whole frame, plus which regions were re-read
+    """
+    try:
+        image_data = await asyncio.to_thread(local_input.read, request.path)
+    except InputError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    
+    try:
+        return await run_screen_ocr(request.device_id, image_data)
+    except Exception as e:
+        return OCRResponse(
+            success=False,
+            error=str(e)
+        )
+
+@app.delete("/ocr/screen/{device_id}")
+async def reset_screen_session(device_id: str):
+    """Forget a device's previous frame so the next one is OCR'd in full"""
+    if not screen_ocr.reset(device_id):
+        raise HTTPException(status_code=404, detail=f"No screen session for device: {device_id}")
+    return {"success": True, "device_id": device_id}
+
+@app.get("/cache")
+async def cache_stats():
+    """OCR result cache settings and hit rates"""
+    return {"settings": ocr_cache.settings(), "stats": ocr_cache.summary()}
+
+@app.delete("/cache")
+async def clear_cache():
+    """Drop every cached OCR result"""
+    ocr_cache.clear()
+    return {"success": True}
+
+@app.get("/admission")
+async def admission_stats():
+    """Admission settings and per-priority queue metrics"""
+    return {"settings": admission.settings(), "stats": admission.metrics()}
+
 @app.get("/visualization/{filename}")
 async def get_visualization(filename: str):
     """
@@ -0,0 +1,134 @@
+"""
+RapidOCR engine pool
+
+A single RapidOCR engine called from async handlers serializes every request
+and blocks the event loop. This pool keeps several engines, each owned by one
+worker thread at a time, and runs OCR off the loop:
+
+- ONNX Runtime releases the GIL during inference, so threads scale without the
+  pickling and memory cost of a process pool
+- intra_op_num_threads is split across engines (engines * threads ~= cores) so
+  concurrent sessions do not oversubscribe the CPU
+"""
+
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("det", "cls", "rec")
+
+
+def default_pool_size() -> int:
+    """A few engines with several ONNX threads each beats many single-threaded ones"""
+    return max(1, (os.cpu_count() or 1) // 4)
+
+
+def thread_kwargs(intra_op_num_threads: int) -> Dict[str, int]:
+    """RapidOCR kwargs pinning ONNX session threads for det, cls and rec"""
+    kwargs = {"intra_op_num_threads": intra_op_num_threads}
+    for stage in STAGES:
+        kwargs[f"{stage}_intra_op_num_threads"] = intra_op_num_threads
+    return kwargs
+
+
+def parse_ocr_result(result: Any) -> Tuple[List[str], List[Dict[str, Any]], Optional[Dict[str, float]]]:
+    """
+    Normalize the result formats returned by different RapidOCR versions
+
+    Args:
+        result: Raw return value of engine(image)
+
+    Returns:
+        (texts, boxes, timings); timings holds det/cls/rec milliseconds when
+        the engine reports them, otherwise None
+    """
+    texts: List[str] = []
+    boxes: List[Dict[str, Any]] = []
+    timings = None
+    items: Sequence[Any] = []
+
+    if isinstance(result, tuple) and len(result) == 2:
+        # Format: (result_list, elapse) with elapse = [det, cls, rec] seconds
+        items, elapse = result
+        if isinstance(elapse, (list, tuple)) and len(elapse) == len(STAGES):
+            timings = {f"{stage}_ms": float(seconds) * 1000 for stage, seconds in zip(STAGES, elapse)}
+        items = items or []
+    elif isinstance(result, tuple) and len(result) == 3:
+        # Format: (boxes, texts, scores)
+        boxes_list, texts_list, scores_list = result
+        if boxes_list is not None and texts_list is not None:
+            items = list(zip(boxes_list, texts_list, scores_list))
+    elif isinstance(result, list):
+        # Format: list of [box, text, score]
+        items = result
+    elif result is not None:
+        raise ValueError(f"Unexpected OCR result format: {type(result)}")
+
+    for item in items:
+        if len(item) == 3:
+            box, text, score = item
+            texts.append(text)
+            boxes.append({
+                "box": box.tolist() if hasattr(box, 'tolist') else box,
+                "text": text,
+                "score": float(score)
+            })
+
+    return texts, boxes, timings
+
+
+class OCREnginePool:
+    """Fixed set of RapidOCR engines shared by a thread pool"""
+
+    def __init__(self, engine_factory: Callable[[], Any], size: int, intra_op_num_threads: int):
+        self.size = size
+        self.intra_op_num_threads = intra_op_num_threads
+        self._engines: "queue.Queue[Any]" = queue.Queue()
+        for _ in range(size):
+            self._engines.put(engine_factory())
+
+        self.executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="ocr-engine")
+        self._lock = threading.Lock()
+        self.stats = {"completed": 0, "failed": 0, "busy": 0, "queued": 0, "total_ms": 0.0}
+        logger.info(f"Started {size} RapidOCR engines with {intra_op_num_threads} ONNX threads each")
+
+    def _run_sync(self, image: Any, kwargs: Dict[str, Any]) -> Any:
+        engine = self._engines.get()
+        with self._lock:
+            self.stats["queued"] -= 1
+            self.stats["busy"] += 1
+        start = time.perf_counter()
+        try:
+            result = engine(image, **kwargs)
+            with self._lock:
+                self.stats["completed"] += 1
+            return result
+        except Exception:
+            with self._lock:
+                self.stats["failed"] += 1
+            raise
+        finally:
+            self._engines.put(engine)
+            with self._lock:
+                self.stats["busy"] -= 1
+                self.stats["total_ms"] += (time.perf_counter() - start) * 1000
+
+    async def run(self, image: Any, **kwargs: Any) -> Any:
+        """Run OCR on a pool thread without blocking the event loop"""
+        with self._lock:
+            self.stats["queued"] += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self._run_sync, image, kwargs)
+
+    def settings(self) -> Dict[str, int]:
+        return {"engines": self.size, "intra_op_num_threads": self.intra_op_num_threads}
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,194 @@
+"""
+Async HTTP fetch layer for the model services
+
+Shared by nomic-embed-api and rapidocr-raw-api (each image builds from its own
+directory, so the module is copied into both; keep the copies identical).
+
+- One pooled httpx.AsyncClient per process (keep-alive connections are reused)
+- Per-host concurrency limits so a batch of URLs cannot hammer a single host
+- Streaming downloads with a hard byte cap
+- Optional on-disk cache revalidated with ETag / Last-Modified
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class FetchError(Exception):
+    """Raised when a URL cannot be downloaded"""
+
+
+class FetchTooLargeError(FetchError):
+    """Raised when a response exceeds the configured byte cap"""
+
+
+class AsyncFetcher:
+    """Pooled, size-capped async downloader with optional conditional-request cache"""
+
+    def __init__(
+        self,
+        max_bytes: int = 20 * 1024 * 1024,
+        per_host_limit: int = 4,
+        max_connections: int = 32,
+        timeout: float = 30.0,
+        cache_dir: Optional[str] = None,
+    ):
+        self.max_bytes = max_bytes
+        self.per_host_limit = per_host_limit
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.cache_dir = cache_dir or None
+
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.stats = {"requests": 0, "cache_hits": 0, "bytes_downloaded": 0}
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> "AsyncFetcher":
+        """Build a fetcher from FETCH_* environment variables"""
+        return cls(
+            max_bytes=int(os.environ.get("FETCH_MAX_BYTES", str(20 * 1024 * 1024))),
+            per_host_limit=int(os.environ.get("FETCH_PER_HOST_LIMIT", "4")),
+            max_connections=int(os.environ.get("FETCH_MAX_CONNECTIONS", "32")),
+            timeout=float(os.environ.get("FETCH_TIMEOUT", "30")),
+            cache_dir=os.environ.get("FETCH_CACHE_DIR", ""),
+        )
+
+    def settings(self) -> Dict[str, object]:
+        return {
+            "max_bytes": self.max_bytes,
+            "per_host_limit": self.per_host_limit,
+            "max_connections": self.max_connections,
+            "timeout": self.timeout,
+            "cache_dir": self.cache_dir,
+        }
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+        return self._client
+
+    def _semaphore(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc.lower()
+        semaphore = self._host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.per_host_limit)
+            self._host_semaphores[host] = semaphore
+        return semaphore
+
+    # Disk cache -----------------------------------------------------------
+
+    def _cache_paths(self, url: str) -> Tuple[str, str]:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.cache_dir, key[:2], key)
+        return base + ".body", base + ".json"
+
+    def _read_cache_meta(self, url: str) -> Optional[Dict[str, str]]:
+        body_path, meta_path = self._cache_paths(url)
+        if not (os.path.exists(body_path) and os.path.exists(meta_path)):
+            return None
+        try:
+            with open(meta_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _read_cache_body(self, url: str) -> bytes:
+        body_path, _ = self._cache_paths(url)
+        with open(body_path, "rb") as f:
+            return f.read()
+
+    def _write_cache(self, url: str, body: bytes, meta: Dict[str, str]) -> None:
+        body_path, meta_path = self._cache_paths(url)
+        os.makedirs(os.path.dirname(body_path), exist_ok=True)
+        # Write-then-rename so concurrent readers never see partial files
+        for path, payload, mode in ((body_path, body, "wb"), (meta_path, json.dumps(meta), "w")):
+            tmp_path = f"{path}.{os.urandom(8).hex()}.tmp"
+            with open(tmp_path, mode) as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+
+    # Fetching -------------------------------------------------------------
+
+    async def _read_capped(self, response: httpx.Response, url: str) -> bytes:
+        content_length = response.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+            raise FetchTooLargeError(
+                f"{url} is {content_length} bytes, exceeds limit of {self.max_bytes}"
+            )
+
+        body = bytearray()
+        async for chunk in response.aiter_bytes():
+            body.extend(chunk)
+            if len(body) > self.max_bytes:
+                raise FetchTooLargeError(f"{url} exceeds limit of {self.max_bytes} bytes")
+        return bytes(body)
+
+    async def fetch(self, url: str) -> bytes:
+        """Download a single URL, honoring the byte cap and the disk cache"""
+        url = str(url)
+        headers = {}
+        cached_meta = None
+        if self.cache_dir:
+            cached_meta = await asyncio.to_thread(self._read_cache_meta, url)
+            if cached_meta:
+                if cached_meta.get("etag"):
+                    headers["If-None-Match"] = cached_meta["etag"]
+                if cached_meta.get("last_modified"):
+                    headers["If-Modified-Since"] = cached_meta["last_modified"]
+
+        async with self._semaphore(url):
+            self.stats["requests"] += 1
+            try:
+                async with self._get_client().stream("GET", url, headers=headers) as response:
+                    if response.status_code == 304 and cached_meta:
+                        self.stats["cache_hits"] += 1
+                        return await asyncio.to_thread(self._read_cache_body, url)
+
+                    response.raise_for_status()
+                    body = await self._read_capped(response, url)
+                    etag = response.headers.get("etag")
+                    last_modified = response.headers.get("last-modified")
+            except httpx.HTTPStatusError as e:
+                raise FetchError(f"{url} returned HTTP {e.response.status_code}") from e
+            except httpx.HTTPError as e:
+                raise FetchError(f"{url}: {e}") from e
+
+        self.stats["bytes_downloaded"] += len(body)
+
+        if self.cache_dir and (etag or last_modified):
+            meta = {"etag": etag or "", "last_modified": last_modified or ""}
+            try:
+                await asyncio.to_thread(self._write_cache, url, body, meta)
+            except OSError as e:
+                logger.warning(f"Failed to cache {url}: {e}")
+
+        return body
+
+    async def fetch_many(self, urls: Sequence[str]) -> List[bytes]:
+        """Download URLs concurrently, returning bodies in input order"""
+        return list(await asyncio.gather(*(self.fetch(url) for url in urls)))
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
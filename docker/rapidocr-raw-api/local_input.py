@@ -0,0 +1,106 @@
+"""
+Raw-bytes and local-path input for the model services
+
+Shared by nomic-embed-api, rapidocr-raw-api, voiceapi-raw-api and
+yunet-face-detection-raw-api (each image builds from its own directory, so the
+module is copied into all of them; keep the copies identical).
+
+Base64 inside JSON adds a third to every payload plus a decode copy. Callers
+can instead:
+- POST the file itself as an application/octet-stream body
+- pass a path or file:// URL to a file on a shared volume; references are
+  resolved (symlinks included) against the INPUT_ROOTS allow-list and the file
+  is memory-mapped, so co-located pipelines hand over a reference, not bytes
+
+Mapped files are returned as read-only mmap objects, which work anywhere a
+bytes-like buffer is accepted (np.frombuffer, cv2.imdecode, hashlib, io.BytesIO).
+The mapping is released when the last reference to it goes away.
+"""
+
+import mmap
+import os
+from typing import Dict, List, Optional, Sequence, Union
+from urllib.parse import unquote, urlsplit
+
+from starlette.requests import Request
+
+BytesLike = Union[bytes, mmap.mmap]
+
+
+class InputError(ValueError):
+    """Raised when a raw body or path reference cannot be used as input"""
+
+
+class LocalInput:
+    """Resolves path / file:// references inside allow-listed roots and maps them into memory"""
+
+    def __init__(self, roots: Sequence[str] = (), max_bytes: int = 256 * 1024 * 1024):
+        self.roots: List[str] = [root for root in roots if root]
+        self.max_bytes = max_bytes
+        self._real_roots = [os.path.realpath(root) for root in self.roots]
+
+    @classmethod
+    def from_env(cls) -> "LocalInput":
+        """Build from INPUT_ROOTS (comma separated; empty disables path input) and INPUT_MAX_BYTES"""
+        return cls(
+            roots=[root.strip() for root in os.environ.get("INPUT_ROOTS", "").split(",")],
+            max_bytes=int(os.environ.get("INPUT_MAX_BYTES", str(256 * 1024 * 1024))),
+        )
+
+    def settings(self) -> Dict[str, object]:
+        return {"roots": self.roots, "max_bytes": self.max_bytes}
+
+    def resolve(self, reference: str) -> str:
+        """
+        Turn a path or file:// URL into a real path inside one of the roots
+
+        Relative paths are taken relative to the first root.
+        """
+        if not self.roots:
+            raise InputError("Path input is disabled; set INPUT_ROOTS to allow-list directories")
+
+        path = reference
+        if reference.startswith("file:"):
+            parts = urlsplit(reference)
+            if parts.netloc not in ("", "localhost"):
+                raise InputError(f"Remote file URLs are not supported: {reference}")
+            path = unquote(parts.path)
+        if not os.path.isabs(path):
+            path = os.path.join(self.roots[0], path)
+
+        resolved = os.path.realpath(path)
+        if not any(resolved == root or resolved.startswith(root + os.sep) for root in self._real_roots):
+            raise InputError(f"Path is outside the allowed input roots: {reference}")
+        if not os.path.isfile(resolved):
+            raise InputError(f"File not found: {reference}")
+        return resolved
+
+    def read(self, reference: str) -> BytesLike:
+        """Resolve a reference and memory-map the file read-only"""
+        path = self.resolve(reference)
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size > self.max_bytes:
+                raise InputError(f"{reference} is {size} bytes, exceeds limit of {self.max_bytes}")
+            if size == 0:
+                return b""
+            # The mapping holds its own handle, so the file can be closed right away
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def read_many(self, references: Sequence[str]) -> List[BytesLike]:
+        return [self.read(reference) for reference in references]
+
+    async def read_body(self, request: Request) -> bytes:
+        """Read a raw (application/octet-stream) request body, honoring max_bytes"""
+        content_length: Optional[str] = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_bytes:
+            raise InputError(f"Body is {content_length} bytes, exceeds limit of {self.max_bytes}")
+
+        body = bytearray()
+        async for chunk in request.stream():
+            body.extend(chunk)
+            if len(body) > self.max_bytes:
+                raise InputError(f"Body exceeds limit of {self.max_bytes} bytes")
+        if not body:
+            raise InputError("Empty request body")
+        return bytes(body)
@@ -0,0 +1,231 @@
+"""
+OCR result cache keyed by exact content hash and by perceptual hash
+
+Retried tweet screenshots and memes/slides seen across sources are OCR'd again
+even though the text is the same. Results are cached under:
+
+- the SHA-256 of the image bytes (byte-identical re-uploads)
+- a DCT perceptual hash (pHash) looked up in a BK-tree by Hamming distance
+  (re-encoded, resized or lightly recompressed copies)
+
+Screenshots of the same template (e.g. two tweets) look alike at low
+resolution, so perceptual hashes default to 256 bits, the distance threshold is
+tight, and a candidate must also match the aspect ratio. Boxes from a
+perceptual hit are rescaled to the new image size. Gradient hashes (dHash)
+are not offered: they put different text in the same layout within a few
+bits of each other, well inside any useful threshold.
+
+Entries expire after a TTL and the cache is LRU-bounded; the BK-tree is rebuilt
+once evicted entries outnumber live ones.
+"""
+
+import hashlib
+import io
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(bits.flatten()).tobytes(), "big")
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+def _load_gray(data: bytes, size: Tuple[int, int]) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """Decode to a small grayscale array plus the original (width, height)"""
+    with Image.open(io.BytesIO(data)) as image:
+        original_size = image.size
+        if image.format == "JPEG":
+            image.draft("L", size)
+        small = image.convert("L").resize(size, Image.Resampling.BILINEAR)
+    return np.asarray(small, dtype=np.float32), original_size
+
+
+def phash(data: bytes, hash_size: int = 16) -> Tuple[int, Tuple[int, int]]:
+    """DCT hash: low-frequency DCT coefficients of a 4x oversampled thumbnail against their median"""
+    size = hash_size * 4
+    pixels, original_size = _load_gray(data, (size, size))
+    matrix = _dct_matrix(size)
+    low = (matrix @ pixels @ matrix.T)[:hash_size, :hash_size]
+    return _bits_to_int(low > np.median(low)), original_size
+
+
+class BKTree:
+    """Burkhard-Keller tree over integer hashes with Hamming distance"""
+
+    def __init__(self):
+        # node = (hash, key, {distance: child})
+        self.root: Optional[Tuple[int, str, Dict[int, Any]]] = None
+        self.size = 0
+
+    def add(self, value: int, key: str) -> None:
+        self.size += 1
+        if self.root is None:
+            self.root = (value, key, {})
+            return
+        node = self.root
+        while True:
+            distance = (node[0] ^ value).bit_count()
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = (value, key, {})
+                return
+            node = child
+
+    def search(self, value: int, radius: int) -> List[Tuple[int, str]]:
+        """All (distance, key) within radius, nearest first"""
+        if self.root is None:
+            return []
+        matches = []
+        stack = [self.root]
+        while stack:
+            node_value, key, children = stack.pop()
+            distance = (node_value ^ value).bit_count()
+            if distance <= radius:
+                matches.append((distance, key))
+            # Triangle inequality: only subtrees in [d - r, d + r] can match
+            for child_distance, child in children.items():
+                if distance - radius <= child_distance <= distance + radius:
+                    stack.append(child)
+        return sorted(matches)
+
+
+@dataclass
+class CacheEntry:
+    key: str
+    variant: str
+    phash: Optional[int]
+    width: int
+    height: int
+    payload: Dict[str, Any]
+    expires_at: float
+
+
+class OCRCache:
+    """LRU + TTL cache of OCR payloads with exact and near-duplicate lookup"""
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        ttl: float = 86400.0,
+        max_distance: int = 10,
+        hash_size: int = 16,
+        aspect_tolerance: float = 0.02,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self.hash_size = hash_size
+        self.aspect_tolerance = aspect_tolerance
+
+        self.entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.tree = BKTree()
+        self.stats = {"lookups": 0, "exact_hits": 0, "perceptual_hits": 0, "misses": 0, "evictions": 0}
+
+    def settings(self) -> Dict[str, Any]:
+        return {
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "max_distance": self.max_distance,
+            "hash": "phash",
+            "hash_bits": self.hash_size * self.hash_size,
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        lookups = self.stats["lookups"]
+        hits = self.stats["exact_hits"] + self.stats["perceptual_hits"]
+        return {
+            **self.stats,
+            "entries": len(self.entries),
+            "hit_rate": round(hits / lookups, 4) if lookups else None,
+        }
+
+    @staticmethod
+    def content_key(data: bytes, variant: str) -> str:
+        return f"{hashlib.sha256(data).hexdigest()}:{variant}"
+
+    def perceptual_hash(self, data: bytes) -> Tuple[int, Tuple[int, int]]:
+        """(hash, (width, height)); CPU bound, call from a worker thread"""
+        return phash(data, self.hash_size)
+
+    def _evict(self, key: str) -> None:
+        self.entries.pop(key, None)
+        self.stats["evictions"] += 1
+        # Evicted entries stay in the BK-tree until they outnumber live ones
+        if self.tree.size > 2 * len(self.entries) + 64:
+            self.tree = BKTree()
+            for entry in self.entries.values():
+                if entry.phash is not None:
+                    self.tree.add(entry.phash, entry.key)
+
+    def _live(self, key: str) -> Optional[CacheEntry]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at < time.time():
+            self._evict(key)
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def get_exact(self, key: str) -> Optional[CacheEntry]:
+        return self._live(key)
+
+    def get_similar(self, value: int, size: Tuple[int, int], variant: str) -> Optional[Tuple[CacheEntry, int]]:
+        """Nearest live entry within max_distance with matching variant and aspect ratio"""
+        width, height = size
+        aspect = width / max(height, 1)
+        for distance, key in self.tree.search(value, self.max_distance):
+            entry = self._live(key)
+            if entry is None or entry.variant != variant:
+                continue
+            if abs(entry.width / max(entry.height, 1) - aspect) > self.aspect_tolerance * aspect:
+                continue
+            return entry, distance
+        return None
+
+    def record(self, hit: Optional[str]) -> None:
+        self.stats["lookups"] += 1
+        self.stats[{"exact": "exact_hits", "perceptual": "perceptual_hits"}.get(hit, "misses")] += 1
+
+    def put(
+        self, key: str, variant: str, value: Optional[int], size: Tuple[int, int], payload: Dict[str, Any]
+    ) -> None:
+        if self.max_entries <= 0:
+            return
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            return
+        self.entries[key] = CacheEntry(
+            key=key, variant=variant, phash=value, width=size[0], height=size[1],
+            payload=payload, expires_at=time.time() + self.ttl,
+        )
+        if value is not None:
+            self.tree.add(value, key)
+        while len(self.entries) > self.max_entries:
+            self._evict(next(iter(self.entries)))
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.tree = BKTree()
+
+
+def scale_boxes(boxes: List[Dict[str, Any]], scale_x: float, scale_y: float) -> List[Dict[str, Any]]:
+    """Rescale cached box coordinates to a different-resolution copy of the image"""
+    if scale_x == 1 and scale_y == 1:
+        return boxes
+    return [
+        {**box, "box": [[x * scale_x, y * scale_y] for x, y in box["box"]]}
+        for box in boxes
+    ]
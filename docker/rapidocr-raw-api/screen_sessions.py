@@ -0,0 +1,263 @@
+"""
+Incremental screen OCR
+
+Desktop capture sends nearly identical frames every few seconds. A session per
+device_id keeps the previous frame (grayscale) and its OCR lines; each new frame
+is compared block by block and only changed regions are OCR'd:
+
+1. Blocks whose max pixel difference exceeds a threshold are marked dirty
+2. Dirty blocks are grouped into rectangles (connected components), padded,
+   then grown to cover any cached line they touch so lines are re-read whole
+3. Cached lines outside every dirty rectangle are reused as-is
+4. Dirty rectangles run through the engine pool in parallel
+
+Unchanged frames cost one diff; a frame that mostly changed (or whose size
+changed) falls back to a full OCR pass.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from tiling import decode_rgb
+
+Rect = Tuple[int, int, int, int]  # x0, y0, x1, y1 (exclusive)
+
+
+@dataclass
+class ScreenSession:
+    """Previous frame and OCR lines for one device"""
+    gray: Optional[np.ndarray] = None
+    lines: List[List[Any]] = field(default_factory=list)
+    last_seen: float = 0.0
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+def to_gray(rgb: np.ndarray) -> np.ndarray:
+    """Cheap integer luma approximation, (R + 2G + B) / 4"""
+    rgb = rgb.astype(np.uint16)
+    return ((rgb[:, :, 0] + 2 * rgb[:, :, 1] + rgb[:, :, 2]) >> 2).astype(np.uint8)
+
+
+def dirty_blocks(previous: np.ndarray, current: np.ndarray, block_size: int, threshold: int) -> np.ndarray:
+    """Boolean (rows, cols) grid of blocks whose max absolute difference exceeds threshold"""
+    height, width = current.shape
+    rows, cols = -(-height // block_size), -(-width // block_size)
+    diff = np.zeros((rows * block_size, cols * block_size), dtype=np.uint8)
+    diff[:height, :width] = np.abs(current.astype(np.int16) - previous.astype(np.int16))
+    return diff.reshape(rows, block_size, cols, block_size).max(axis=(1, 3)) > threshold
+
+
+def block_regions(mask: np.ndarray) -> List[Rect]:
+    """Bounding boxes (in block units) of 8-connected groups of dirty blocks"""
+    seen = np.zeros_like(mask)
+    regions = []
+    rows, cols = mask.shape
+    for start_row, start_col in zip(*np.nonzero(mask)):
+        if seen[start_row, start_col]:
+            continue
+        seen[start_row, start_col] = True
+        stack = [(start_row, start_col)]
+        r0, c0, r1, c1 = start_row, start_col, start_row, start_col
+        while stack:
+            row, col = stack.pop()
+            r0, c0, r1, c1 = min(r0, row), min(c0, col), max(r1, row), max(c1, col)
+            for next_row in range(max(row - 1, 0), min(row + 2, rows)):
+                for next_col in range(max(col - 1, 0), min(col + 2, cols)):
+                    if mask[next_row, next_col] and not seen[next_row, next_col]:
+                        seen[next_row, next_col] = True
+                        stack.append((next_row, next_col))
+        regions.append((int(c0), int(r0), int(c1) + 1, int(r1) + 1))
+    return regions
+
+
+def _intersects(a: Rect, b: Rect) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def _union(a: Rect, b: Rect) -> Rect:
+    return min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])
+
+
+def line_bounds(line: List[Any]) -> Rect:
+    box = line[0]
+    return (
+        int(np.floor(box[:, 0].min())), int(np.floor(box[:, 1].min())),
+        int(np.ceil(box[:, 0].max())) + 1, int(np.ceil(box[:, 1].max())) + 1,
+    )
+
+
+def grow_rects(rects: List[Rect], line_rects: List[Rect]) -> List[Rect]:
+    """Grow rectangles over the cached lines they touch and merge overlaps until stable"""
+    changed = True
+    while changed:
+        changed = False
+        grown = []
+        for rect in rects:
+            for line_rect in line_rects:
+                if _intersects(rect, line_rect):
+                    union = _union(rect, line_rect)
+                    if union != rect:
+                        rect, changed = union, True
+            grown.append(rect)
+
+        merged: List[Rect] = []
+        for rect in grown:
+            for i, other in enumerate(merged):
+                if _intersects(rect, other):
+                    merged[i] = _union(rect, other)
+                    changed = True
+                    break
+            else:
+                merged.append(rect)
+        rects = merged
+    return rects
+
+
+def _reading_order(lines: List[List[Any]]) -> List[List[Any]]:
+    return sorted(lines, key=lambda line: (float(line[0][:, 1].min()), float(line[0][:, 0].min())))
+
+
+class ScreenOCR:
+    """Per-device incremental OCR on top of the engine pool"""
+
+    def __init__(
+        self,
+        engine_pool: Any,
+        block_size: int = 32,
+        diff_threshold: int = 16,
+        full_ocr_ratio: float = 0.6,
+        padding: int = 8,
+        max_sessions: int = 32,
+        session_ttl: float = 600.0,
+    ):
+        self.engine_pool = engine_pool
+        self.block_size = block_size
+        self.diff_threshold = diff_threshold
+        self.full_ocr_ratio = full_ocr_ratio
+        self.padding = padding
+        self.max_sessions = max_sessions
+        self.session_ttl = session_ttl
+
+        self.sessions: "OrderedDict[str, ScreenSession]" = OrderedDict()
+        self.stats = {"frames": 0, "full": 0, "incremental": 0, "unchanged": 0, "ocr_area_ratio_sum": 0.0}
+
+    def settings(self) -> Dict[str, Any]:
+        return {
+            "block_size": self.block_size,
+            "diff_threshold": self.diff_threshold,
+            "full_ocr_ratio": self.full_ocr_ratio,
+            "max_sessions": self.max_sessions,
+            "session_ttl": self.session_ttl,
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        frames = self.stats["frames"]
+        return {
+            **{k: v for k, v in self.stats.items() if k != "ocr_area_ratio_sum"},
+            "sessions": len(self.sessions),
+            "avg_ocr_area_ratio": round(self.stats["ocr_area_ratio_sum"] / frames, 4) if frames else None,
+        }
+
+    def _session(self, device_id: str) -> ScreenSession:
+        now = time.time()
+        for stale_id in [k for k, s in self.sessions.items() if now - s.last_seen > self.session_ttl]:
+            if not self.sessions[stale_id].lock.locked():
+                del self.sessions[stale_id]
+
+        session = self.sessions.get(device_id)
+        if session is None:
+            session = self.sessions[device_id] = ScreenSession(last_seen=now)
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+        self.sessions.move_to_end(device_id)
+        return session
+
+    def reset(self, device_id: str) -> bool:
+        return self.sessions.pop(device_id, None) is not None
+
+    async def _ocr_region(self, rgb: np.ndarray, rect: Rect) -> Tuple[List[List[Any]], Optional[List[float]]]:
+        x0, y0, x1, y1 = rect
+        # RapidOCR expects BGR arrays
+        crop = np.ascontiguousarray(rgb[y0:y1, x0:x1, ::-1])
+        items, elapse = await self.engine_pool.run(crop)
+        offset = np.array([x0, y0], dtype=np.float32)
+        return [[np.asarray(box, dtype=np.float32) + offset, text, score] for box, text, score in items or []], elapse
+
+    async def process(self, device_id: str, image_data: bytes) -> Tuple[Tuple[List[List[Any]], List[float]], Dict[str, Any]]:
+        """
+        OCR a frame for a device, reusing lines from unchanged screen regions
+
+        Args:
+            device_id: Session key (one capture source)
+            image_data: Encoded frame
+
+        Returns:
+            ((lines, [det, cls, rec] seconds), info) where lines use the RapidOCR
+            [box, text, score] format and info describes what was re-OCR'd
+        """
+        rgb = await asyncio.to_thread(decode_rgb, image_data)
+        gray = await asyncio.to_thread(to_gray, rgb)
+        height, width = gray.shape
+
+        session = self._session(device_id)
+        async with session.lock:
+            rects: List[Rect] = []
+            dirty_ratio = 1.0
+            if session.gray is not None and session.gray.shape == gray.shape:
+                mask = await asyncio.to_thread(
+                    dirty_blocks, session.gray, gray, self.block_size, self.diff_threshold
+                )
+                dirty_ratio = float(mask.mean())
+                b, p = self.block_size, self.padding
+                rects = [
+                    (max(c0 * b - p, 0), max(r0 * b - p, 0), min(c1 * b + p, width), min(r1 * b + p, height))
+                    for c0, r0, c1, r1 in block_regions(mask)
+                ]
+
+            if session.gray is None or session.gray.shape != gray.shape or dirty_ratio > self.full_ocr_ratio:
+                mode = "full"
+                rects = [(0, 0, width, height)]
+                reused: List[List[Any]] = []
+            elif not rects:
+                mode = "unchanged"
+                reused = session.lines
+            else:
+                mode = "incremental"
+                line_rects = [line_bounds(line) for line in session.lines]
+                rects = grow_rects(rects, line_rects)
+                reused = [
+                    line for line, line_rect in zip(session.lines, line_rects)
+                    if not any(_intersects(line_rect, rect) for rect in rects)
+                ]
+
+            results = await asyncio.gather(*(self._ocr_region(rgb, rect) for rect in rects))
+            elapse = [0.0, 0.0, 0.0]
+            new_lines = []
+            for region_lines, region_elapse in results:
+                new_lines.extend(region_lines)
+                for i, seconds in enumerate(region_elapse or []):
+                    elapse[i] += float(seconds)
+
+            lines = _reading_order(reused + new_lines)
+            session.gray, session.lines, session.last_seen = gray, lines, time.time()
+
+        ocr_area_ratio = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in rects) / float(width * height)
+        self.stats["frames"] += 1
+        self.stats[mode] += 1
+        self.stats["ocr_area_ratio_sum"] += min(ocr_area_ratio, 1.0)
+
+        info = {
+            "device_id": device_id,
+            "mode": mode,
+            "dirty_ratio": round(dirty_ratio, 4),
+            "ocr_area_ratio": round(min(ocr_area_ratio, 1.0), 4),
+            "regions": len(rects),
+            "reused_lines": len(reused),
+            "new_lines": len(new_lines),
+        }
+        return (lines, elapse), info
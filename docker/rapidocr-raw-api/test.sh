@@ -12,7 +12,8 @@ NC='\033[0m' # No Color
 # Configuration
 BASE_URL="${BASE_URL:-http://localhost:8000}"
 VERBOSE="${VERBOSE:-false}"
-TEST_DIR="test_images"
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+TEST_DIR="$SCRIPT_DIR/test_images"
 
 # Test counters
 TESTS_PASSED=0
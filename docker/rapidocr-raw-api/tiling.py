@@ -0,0 +1,160 @@
+"""
+Tiled OCR for very tall (or wide) screenshots
+
+Full-page captures like a 1280x20000 page get downscaled by RapidOCR detection
+until the text is unreadable, and running detection at native size needs
+feature maps for the whole page. Instead the page is cut into overlapping tiles
+that run through the engine pool in parallel:
+
+- Each tile owns a "core" region that ends halfway through the overlap with
+  its neighbour; a line is kept only by the tile whose core contains its
+  center. A line cut at one tile's edge is whole in the neighbouring tile, so
+  as long as the overlap is more than twice the line height every line is
+  reported exactly once.
+- Boxes are shifted back to page coordinates; a final IoU + text check catches
+  any duplicates the ownership rule misses.
+- At most `max_in_flight` tiles (the pool size) are materialized at once, so
+  OCR working memory depends on the tile size, not the page size.
+"""
+
+import asyncio
+import io
+from dataclasses import dataclass
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+
+@dataclass
+class Tile:
+    """Tile bounds and the core region whose lines it reports (page pixels)"""
+    x0: int
+    y0: int
+    x1: int
+    y1: int
+    core_x0: float
+    core_y0: float
+    core_x1: float
+    core_y1: float
+
+
+def image_size(data: bytes) -> Tuple[int, int]:
+    """(width, height) from the image header without decoding pixels"""
+    with Image.open(io.BytesIO(data)) as image:
+        return image.size
+
+
+def decode_rgb(data: bytes) -> np.ndarray:
+    """Decode image bytes to an (H, W, 3) uint8 RGB array"""
+    with Image.open(io.BytesIO(data)) as image:
+        return np.asarray(image.convert("RGB"))
+
+
+def plan_spans(length: int, tile_size: int, overlap: int) -> List[Tuple[int, int, float, float]]:
+    """
+    Overlapping spans covering [0, length) along one axis
+
+    Returns:
+        (start, end, core_start, core_end) per span; cores partition the axis
+    """
+    if length <= tile_size:
+        return [(0, length, 0.0, float(length))]
+    if not 0 <= overlap < tile_size:
+        raise ValueError(f"overlap must be in [0, {tile_size})")
+
+    step = tile_size - overlap
+    starts = list(range(0, length - tile_size, step)) + [length - tile_size]
+    spans = [(start, start + tile_size) for start in starts]
+
+    # Cores meet in the middle of each overlap region
+    cuts = [0.0] + [(spans[i][0] + spans[i - 1][1]) / 2 for i in range(1, len(spans))] + [float(length)]
+    return [(start, end, cuts[i], cuts[i + 1]) for i, (start, end) in enumerate(spans)]
+
+
+def plan_tiles(width: int, height: int, tile_size: int, overlap: int) -> List[Tile]:
+    """Grid of overlapping tiles covering the image, top-to-bottom then left-to-right"""
+    return [
+        Tile(x0, y0, x1, y1, cx0, cy0, cx1, cy1)
+        for y0, y1, cy0, cy1 in plan_spans(height, tile_size, overlap)
+        for x0, x1, cx0, cx1 in plan_spans(width, tile_size, overlap)
+    ]
+
+
+def _owned_lines(tile: Tile, items: Optional[Sequence[Any]]) -> List[List[Any]]:
+    """Shift a tile's lines to page coordinates and keep those centered in its core"""
+    lines = []
+    for box, text, score in items or []:
+        box = np.asarray(box, dtype=np.float32) + np.array([tile.x0, tile.y0], dtype=np.float32)
+        center_x, center_y = box.mean(axis=0)
+        if tile.core_x0 <= center_x < tile.core_x1 and tile.core_y0 <= center_y < tile.core_y1:
+            lines.append([box, text, score])
+    return lines
+
+
+def dedupe_lines(lines: List[List[Any]], iou_threshold: float = 0.5) -> List[List[Any]]:
+    """Drop lines whose text matches a higher-scoring line with overlapping bounds"""
+    if not lines:
+        return lines
+
+    boxes = np.stack([line[0] for line in lines])
+    bounds = np.concatenate([boxes.min(axis=1), boxes.max(axis=1)], axis=1)  # x0, y0, x1, y1
+    areas = np.prod(np.maximum(bounds[:, 2:] - bounds[:, :2], 0), axis=1)
+
+    kept: List[int] = []
+    for i in sorted(range(len(lines)), key=lambda i: -float(lines[i][2])):
+        if kept:
+            other = bounds[kept]
+            inter_w = np.minimum(bounds[i, 2], other[:, 2]) - np.maximum(bounds[i, 0], other[:, 0])
+            inter_h = np.minimum(bounds[i, 3], other[:, 3]) - np.maximum(bounds[i, 1], other[:, 1])
+            inter = np.maximum(inter_w, 0) * np.maximum(inter_h, 0)
+            iou = inter / np.maximum(areas[i] + areas[kept] - inter, 1e-6)
+            if any(lines[kept[j]][1] == lines[i][1] for j in np.flatnonzero(iou > iou_threshold)):
+                continue
+        kept.append(i)
+
+    kept_lines = [lines[i] for i in kept]
+    # Reading order: top-to-bottom, then left-to-right
+    kept_lines.sort(key=lambda line: (float(line[0][:, 1].min()), float(line[0][:, 0].min())))
+    return kept_lines
+
+
+async def ocr_tiled(
+    engine_pool: Any,
+    image: np.ndarray,
+    tile_size: int = 1280,
+    overlap: int = 160,
+    max_in_flight: Optional[int] = None,
+) -> Tuple[Tuple[List[List[Any]], List[float]], int]:
+    """
+    OCR an RGB image tile by tile across the engine pool
+
+    Args:
+        engine_pool: OCREnginePool used for every tile
+        image: (H, W, 3) uint8 RGB array
+        tile_size: Tile edge length in pixels
+        overlap: Pixels shared by neighbouring tiles
+        max_in_flight: Tiles materialized at once (defaults to the pool size)
+
+    Returns:
+        ((lines, [det, cls, rec] seconds summed over tiles), number of tiles),
+        in the same shape as a plain RapidOCR call
+    """
+    height, width = image.shape[:2]
+    tiles = plan_tiles(width, height, tile_size, overlap)
+    semaphore = asyncio.Semaphore(max_in_flight or engine_pool.size)
+    elapse = [0.0, 0.0, 0.0]
+
+    async def _run(tile: Tile) -> List[List[Any]]:
+        async with semaphore:
+            # RapidOCR expects BGR arrays; the copy only ever covers one tile
+            crop = np.ascontiguousarray(image[tile.y0:tile.y1, tile.x0:tile.x1, ::-1])
+            items, tile_elapse = await engine_pool.run(crop)
+        if tile_elapse:
+            for i, seconds in enumerate(tile_elapse):
+                elapse[i] += float(seconds)
+        return _owned_lines(tile, items)
+
+    per_tile = await asyncio.gather(*(_run(tile) for tile in tiles))
+    lines = dedupe_lines([line for tile_lines in per_tile for line in tile_lines])
+    return (lines, elapse), len(tiles)
@@ -3,6 +3,7 @@
 # Unified Docker Services Test Runner
 # Tests all Docker services in the docker/* directories
 # Ensures containers are running and executes their test.sh scripts
+# Set BENCHMARK=true to also run benchmark/run_benchmarks.py against the running services
 
 # Colors for output
 RED='\033[0;31m'
@@ -13,8 +14,8 @@ CYAN='\033[0;36m'
 BOLD='\033[1m'
 NC='\033[0m' # No Color
 
-# Base directory
-BASE_DIR="/home/aoi/code/loomv4/docker"
+# Base directory (the directory containing this script)
+BASE_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 
 # Track overall statistics
 TOTAL_SERVICES=0
@@ -336,6 +337,15 @@ main() {
     # Report saving disabled - output already shown in terminal
     echo ""
     
+    # Optional load/regression benchmarks (BENCHMARK=true, extra flags in BENCHMARK_ARGS)
+    if [ "${BENCHMARK:-false}" = "true" ]; then
+        print_header "BENCHMARKS"
+        python3 "$BASE_DIR/benchmark/run_benchmarks.py" $BENCHMARK_ARGS
+        if [ $? -ne 0 ] && [ $exit_code -eq 0 ]; then
+            exit_code=1
+        fi
+    fi
+    
     exit $exit_code
 }
 
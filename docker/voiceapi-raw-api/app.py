@@ -19,6 +19,8 @@ import time
 from datetime import datetime
 from uuid import uuid4
 import sherpa_onnx
+from admission import AdmissionController, AdmissionMiddleware
+from local_input import BytesLike, InputError, LocalInput
 
 # Service metadata
 SERVICE_NAME = "Voice API"
@@ -36,6 +38,14 @@ CONFIG = {
     "DEBUG": os.environ.get("DEBUG", "false").lower() == "true"
 }
 
+# Raw request bodies and path / file:// references under INPUT_ROOTS
+local_input = LocalInput.from_env()
+
+# Concurrency limits, X-Priority classes and deadlines for POST requests (ADMISSION_* env vars).
+# WebSocket streams are not gated.
+admission = AdmissionController.from_env(default_concurrency=CONFIG["MAX_WORKERS"])
+app.add_middleware(AdmissionMiddleware, controller=admission)
+
 # Logging setup
 logging.basicConfig(level=getattr(logging, CONFIG["LOG_LEVEL"]))
 logger = logging.getLogger(__name__)
@@ -279,6 +289,12 @@ class AudioProcessRequest(BaseRequest):
     language: Optional[str] = Field(None, description="Language code (e.g., 'en', 'es')")
     options: Optional[Dict[str, Any]] = Field(default_factory=dict)
 
+class AudioPathRequest(BaseRequest):
+    """Audio processing request for a file on a shared volume"""
+    path: str = Field(..., description="Path or file:// URL of raw 16 kHz int16 PCM audio inside INPUT_ROOTS")
+    language: Optional[str] = Field(None, description="Language code (e.g., 'en', 'es')")
+    options: Optional[Dict[str, Any]] = Field(default_factory=dict)
+
 class AudioProcessResponse(BaseResponse):
     """Audio processing response"""
     text: Optional[str] = None
@@ -325,10 +341,13 @@ async def root():
             "/demo": "GET - Interactive demo page",
             "/process/audio": "POST - Process audio file for transcription",
             "/process/base64": "POST - Process base64 audio for transcription",
+            "/process/raw": "POST - Process audio sent as an application/octet-stream body",
+            "/process/path": "POST - Process an audio file under INPUT_ROOTS (path or file:// URL)",
             "/tts/generate": "POST - Generate speech from text",
             "/speakers": "GET - List registered speakers",
             "/speakers/register": "POST - Register new speaker",
             "/speakers/{speaker_name}": "DELETE - Delete registered speaker",
+            "/admission": "GET - Admission queue depth, wait and service times per priority",
             "/ws/asr": "WebSocket - Real-time speech recognition",
             "/ws/tts": "WebSocket - Real-time text-to-speech",
             "/ws/speaker_id": "WebSocket - Real-time speaker identification"
@@ -340,6 +359,11 @@ async def root():
         }
     }
 
+@app.get("/admission")
+async def admission_stats():
+    """Admission settings and per-priority queue metrics"""
+    return {"settings": admission.settings(), "stats": admission.metrics()}
+
 @app.get("/demo", response_class=HTMLResponse)
 async def demo_page():
     """Serve interactive demo page"""
@@ -391,7 +415,8 @@ async def health_check():
                 "tts_model": tts_healthy,
                 "speaker_model": speaker_healthy,
                 "models_loaded": all_healthy
-            }
+            },
+            "admission": admission.metrics()
         }
         
         if not all_healthy:
@@ -549,6 +574,56 @@ async def delete_speaker(speaker_name: str):
 
 
 # New processing endpoints following API contract
+def transcribe_pcm(audio_bytes: BytesLike, include_speaker: bool = False) -> Tuple[str, Optional[str]]:
+    """
+    Transcribe raw 16 kHz mono int16 PCM, optionally identifying the speaker
+    
+    Args:
+        audio_bytes: PCM samples as bytes or a memory-mapped file (read without copying)
+        include_speaker: Whether to match the audio against registered speakers
+    
+    Returns:
+        (transcribed text, speaker name or None)
+    """
+    # Convert to numpy array
+    audio_array = np.frombuffer(audio_bytes, dtype=np.int16).astype(np.float32) / 32768.0
+    
+    # Process with ASR
+    asr_engine = asr_engines.get(args.asr_model)
+    if not asr_engine:
+        raise HTTPException(503, "ASR model not available")
+    
+    # Create stream and process
+    stream = asr_engine.create_stream()
+    
+    # Handle online vs offline recognizer differently
+    if isinstance(asr_engine, sherpa_onnx.OnlineRecognizer):
+        stream.accept_waveform(16000, audio_array)
+        while asr_engine.is_ready(stream):
+            asr_engine.decode_stream(stream)
+        text = asr_engine.get_result(stream).text
+    else:  # OfflineRecognizer
+        stream.accept_waveform(16000, audio_array)
+        asr_engine.decode_stream(stream)
+        text = stream.result.text
+    
+    # Speaker identification if requested
+    speaker = None
+    if include_speaker and hasattr(args, 'speaker_model'):
+        speaker_engine = speaker_engines.get(args.speaker_model)
+        if speaker_engine:
+            extractor, manager = speaker_engine
+            speaker_stream = extractor.create_stream()
+            speaker_stream.accept_waveform(16000, audio_array)
+            if extractor.is_ready(speaker_stream):
+                embedding = extractor.compute(speaker_stream)
+                speaker_name = manager.search(embedding, threshold=args.speaker_threshold)
+                if speaker_name:
+                    speaker = speaker_name
+    
+    return text, speaker
+
+
 @app.post("/process/audio", response_model=AudioProcessResponse)
 async def process_audio_file(
     file: UploadFile = File(..., description="Audio file to transcribe"),
@@ -567,41 +642,8 @@ async def process_audio_file(
         # Read audio data
         audio_bytes = await file.read()
         
-        # Convert to numpy array
-        audio_array = np.frombuffer(audio_bytes, dtype=np.int16).astype(np.float32) / 32768.0
-        
-        # Process with ASR
-        asr_engine = asr_engines.get(args.asr_model)
-        if not asr_engine:
-            raise HTTPException(503, "ASR model not available")
-        
-        # Create stream and process
-        stream = asr_engine.create_stream()
-        
-        # Handle online vs offline recognizer differently
-        if isinstance(asr_engine, sherpa_onnx.OnlineRecognizer):
-            stream.accept_waveform(16000, audio_array)
-            while asr_engine.is_ready(stream):
-                asr_engine.decode_stream(stream)
-            text = asr_engine.get_result(stream).text
-        else:  # OfflineRecognizer
-            stream.accept_waveform(16000, audio_array)
-            asr_engine.decode_stream(stream)
-            text = stream.result.text
-        
-        # Speaker identification if requested
-        speaker = None
-        if include_speaker and hasattr(args, 'speaker_model'):
-            speaker_engine = speaker_engines.get(args.speaker_model)
-            if speaker_engine:
-                extractor, manager = speaker_engine
-                speaker_stream = extractor.create_stream()
-                speaker_stream.accept_waveform(16000, audio_array)
-                if extractor.is_ready(speaker_stream):
-                    embedding = extractor.compute(speaker_stream)
-                    speaker_name = manager.search(embedding, threshold=args.speaker_threshold)
-                    if speaker_name:
-                        speaker = speaker_name
+        # Transcribe (and optionally identify the speaker)
+        text, speaker = transcribe_pcm(audio_bytes, include_speaker)
         
         processing_time = (time.time() - start_time) * 1000
         
@@ -636,41 +678,79 @@ async def process_audio_base64(request: AudioProcessRequest):
         # Decode base64 audio
         audio_bytes = base64.b64decode(request.audio_base64)
         
-        # Convert to numpy array
-        audio_array = np.frombuffer(audio_bytes, dtype=np.int16).astype(np.float32) / 32768.0
+        # Transcribe (and optionally identify the speaker)
+        text, speaker = transcribe_pcm(audio_bytes, bool(request.options.get("include_speaker")))
         
-        # Process with ASR
-        asr_engine = asr_engines.get(args.asr_model)
-        if not asr_engine:
-            raise HTTPException(503, "ASR model not available")
+        processing_time = (time.time() - start_time) * 1000
         
-        # Create stream and process
-        stream = asr_engine.create_stream()
+        return AudioProcessResponse(
+            success=True,
+            request_id=request.request_id,
+            text=text.strip(),
+            language=request.language,
+            speaker=speaker,
+            processing_time_ms=processing_time
+        )
         
-        # Handle online vs offline recognizer differently
-        if isinstance(asr_engine, sherpa_onnx.OnlineRecognizer):
-            stream.accept_waveform(16000, audio_array)
-            while asr_engine.is_ready(stream):
-                asr_engine.decode_stream(stream)
-            text = asr_engine.get_result(stream).text
-        else:  # OfflineRecognizer
-            stream.accept_waveform(16000, audio_array)
-            asr_engine.decode_stream(stream)
-            text = stream.result.text
-        
-        # Speaker identification if requested
-        speaker = None
-        if request.options.get("include_speaker") and hasattr(args, 'speaker_model'):
-            speaker_engine = speaker_engines.get(args.speaker_model)
-            if speaker_engine:
-                extractor, manager = speaker_engine
-                speaker_stream = extractor.create_stream()
-                speaker_stream.accept_waveform(16000, audio_array)
-                if extractor.is_ready(speaker_stream):
-                    embedding = extractor.compute(speaker_stream)
-                    speaker_name = manager.search(embedding, threshold=args.speaker_threshold)
-                    if speaker_name:
-                        speaker = speaker_name
+    except Exception as e:
+        logger.error(f"Error processing base64 audio: {e}")
+        processing_time = (time.time() - start_time) * 1000
+        return AudioProcessResponse(
+            success=False,
+            request_id=request.request_id,
+            error=str(e),
+            processing_time_ms=processing_time
+        )
+
+
+@app.post("/process/raw", response_model=AudioProcessResponse)
+async def process_audio_raw(
+    request: Request,
+    language: Optional[str] = None,
+    include_speaker: bool = False
+):
+    """Process raw 16 kHz int16 PCM sent as the request body (Content-Type: application/octet-stream)"""
+    start_time = time.time()
+    request_id = str(uuid4())
+    
+    try:
+        audio_bytes = await local_input.read_body(request)
+        text, speaker = transcribe_pcm(audio_bytes, include_speaker)
+        
+        processing_time = (time.time() - start_time) * 1000
+        
+        return AudioProcessResponse(
+            success=True,
+            request_id=request_id,
+            text=text.strip(),
+            language=language,
+            speaker=speaker,
+            processing_time_ms=processing_time
+        )
+        
+    except InputError as e:
+        raise HTTPException(400, str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error processing raw audio: {e}")
+        processing_time = (time.time() - start_time) * 1000
+        return AudioProcessResponse(
+            success=False,
+            request_id=request_id,
+            error=str(e),
+            processing_time_ms=processing_time
+        )
+
+
+@app.post("/process/path", response_model=AudioProcessResponse)
+async def process_audio_path(request: AudioPathRequest):
+    """Process raw 16 kHz int16 PCM from a file under INPUT_ROOTS, memory-mapped instead of uploaded"""
+    start_time = time.time()
+    
+    try:
+        audio_bytes = await asyncio.to_thread(local_input.read, request.path)
+        text, speaker = transcribe_pcm(audio_bytes, bool(request.options.get("include_speaker")))
         
         processing_time = (time.time() - start_time) * 1000
         
@@ -683,8 +763,12 @@ async def process_audio_base64(request: AudioProcessRequest):
             processing_time_ms=processing_time
         )
         
+    except InputError as e:
+        raise HTTPException(400, str(e))
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error processing base64 audio: {e}")
+        logger.error(f"Error processing audio from path: {e}")
         processing_time = (time.time() - start_time) * 1000
         return AudioProcessResponse(
             success=False,
@@ -12,6 +12,7 @@ NC='\033[0m' # No Color
 # Configuration
 BASE_URL="${BASE_URL:-http://localhost:8257}"
 VERBOSE="${VERBOSE:-false}"
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 
 # Test counters
 TESTS_PASSED=0
@@ -100,9 +101,9 @@ run_test "List Speakers" \
 
 # Test 5: Process Base64 Audio (with test audio)
 # Use 16kHz mono audio if available, otherwise try original
-TEST_AUDIO_FILE="test/test-audio-16k-mono.wav"
+TEST_AUDIO_FILE="$SCRIPT_DIR/test/test-audio-16k-mono.wav"
 if [ ! -f "$TEST_AUDIO_FILE" ]; then
-    TEST_AUDIO_FILE="test/test-audio.wav"
+    TEST_AUDIO_FILE="$SCRIPT_DIR/test/test-audio.wav"
 fi
 
 if [ -f "$TEST_AUDIO_FILE" ]; then
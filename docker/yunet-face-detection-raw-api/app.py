@@ -1,5 +1,5 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
 from pydantic import BaseModel, HttpUrl
 import cv2
 import base64
@@ -7,14 +7,22 @@ import io
 import os
 import tempfile
 import numpy as np
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 import requests
+import asyncio
+import json
 import logging
 from pathlib import Path
 from PIL import Image
 import shutil
 import time
 
+from admission import AdmissionController, AdmissionMiddleware
+from detector_pool import DetectorPool, decode_image
+from face_embedding import FaceEmbedder, FaceGallery
+from face_tracking import FaceTracker, iter_encoded_frames, iter_video_frames
+from local_input import BytesLike, LocalInput
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -28,29 +36,48 @@ SCORE_THRESHOLD = float(os.environ.get("SCORE_THRESHOLD", "0.7"))
 NMS_THRESHOLD = float(os.environ.get("NMS_THRESHOLD", "0.3"))
 TOP_K = int(os.environ.get("TOP_K", "5000"))
 AUTO_DOWNLOAD_MODELS = os.environ.get("AUTO_DOWNLOAD_MODELS", "true").lower() == "true"
+DETECT_MAX_SIDE = int(os.environ.get("DETECT_MAX_SIDE", "1280"))  # 0 = detect at full resolution
+DETECT_BUCKET = int(os.environ.get("DETECT_BUCKET", "64"))
+DETECT_WORKERS = int(os.environ.get("DETECT_WORKERS", str(min(4, os.cpu_count() or 1))))
+DETECT_MAX_BUCKETS = int(os.environ.get("DETECT_MAX_BUCKETS", "16"))
+ENABLE_RECOGNITION = os.environ.get("ENABLE_RECOGNITION", "true").lower() == "true"
+RECOGNITION_MODEL_NAME = os.environ.get("RECOGNITION_MODEL_NAME", "face_recognition_sface_2021dec.onnx")
+EMBED_BATCH_SIZE = int(os.environ.get("EMBED_BATCH_SIZE", "32"))
+MATCH_THRESHOLD = float(os.environ.get("MATCH_THRESHOLD", "0.363"))  # SFace cosine similarity
+
+YUNET_MODEL_URL = "https://github.com/opencv/opencv_zoo/raw/main/models/face_detection_yunet/face_detection_yunet_2023mar_int8.onnx"
+SFACE_MODEL_URL = "https://github.com/opencv/opencv_zoo/raw/main/models/face_recognition_sface/face_recognition_sface_2021dec.onnx"
 
-# Global face detector
-face_detector = None
+# Pool of face detectors keyed by bucketed input size
+detector_pool = None
 models_loaded_from_volume = False
 
-def download_default_model():
+# Face embedding model and the in-memory gallery it is matched against
+face_embedder = None
+face_gallery = FaceGallery()
+
+# Raw request bodies and path / file:// references under INPUT_ROOTS
+local_input = LocalInput.from_env()
+
+# Concurrency limits, X-Priority classes and deadlines for POST requests (ADMISSION_* env vars)
+admission = AdmissionController.from_env(default_concurrency=DETECT_WORKERS * 2)
+app.add_middleware(AdmissionMiddleware, controller=admission)
+
+def download_default_model(model_name: str = MODEL_NAME, model_url: str = YUNET_MODEL_URL):
     """
-    Download the default YuNet model if it doesn't exist.
+    Download a model if it doesn't exist (the YuNet model by default).
     This downloads the model from OpenCV Zoo GitHub repository.
     """
     os.makedirs(MODEL_DIR, exist_ok=True)
     
-    model_path = os.path.join(MODEL_DIR, MODEL_NAME)
+    model_path = os.path.join(MODEL_DIR, model_name)
     
     if os.path.exists(model_path):
         logger.info(f"Model already exists at {model_path}")
         return True
     
     try:
-        # Download YuNet model from OpenCV Zoo
-        model_url = "https://github.com/opencv/opencv_zoo/raw/main/models/face_detection_yunet/face_detection_yunet_2023mar_int8.onnx"
-        
-        logger.info(f"Downloading YuNet model from {model_url}...")
+        logger.info(f"Downloading {model_name} from {model_url}...")
         response = requests.get(model_url, stream=True, timeout=60)
         response.raise_for_status()
         
@@ -66,9 +93,22 @@ def download_default_model():
         logger.error(f"Error downloading model: {e}")
         return False
 
+def create_detector(input_size: Tuple[int, int]):
+    """Create a YuNet face detector for a fixed input size"""
+    return cv2.FaceDetectorYN.create(
+        model=os.path.join(MODEL_DIR, MODEL_NAME),
+        config="",
+        input_size=input_size,
+        score_threshold=SCORE_THRESHOLD,
+        nms_threshold=NMS_THRESHOLD,
+        top_k=TOP_K,
+        backend_id=cv2.dnn.DNN_BACKEND_DEFAULT,
+        target_id=cv2.dnn.DNN_TARGET_CPU
+    )
+
 def initialize_detector():
-    """Initialize YuNet face detector with OpenCV DNN"""
-    global face_detector, models_loaded_from_volume
+    """Initialize the YuNet face detector pool with OpenCV DNN"""
+    global detector_pool, models_loaded_from_volume
     
     model_path = os.path.join(MODEL_DIR, MODEL_NAME)
     
@@ -88,28 +128,54 @@ def initialize_detector():
             return None
     
     try:
-        # Create YuNet face detector
-        face_detector = cv2.FaceDetectorYN.create(
-            model=model_path,
-            config="",
-            input_size=(320, 320),  # Default input size, will be adjusted per image
-            score_threshold=SCORE_THRESHOLD,
-            nms_threshold=NMS_THRESHOLD,
-            top_k=TOP_K,
-            backend_id=cv2.dnn.DNN_BACKEND_DEFAULT,
-            target_id=cv2.dnn.DNN_TARGET_CPU
+        # Load once up front so a broken model fails at startup, not on first request
+        create_detector((320, 320))
+        detector_pool = DetectorPool(
+            create_detector,
+            max_side=DETECT_MAX_SIDE,
+            bucket=DETECT_BUCKET,
+            workers=DETECT_WORKERS,
+            max_buckets=DETECT_MAX_BUCKETS
         )
         models_loaded_from_volume = True
         logger.info(f"Successfully loaded YuNet model from {model_path}")
         logger.info(f"Model size: {os.path.getsize(model_path) / 1024 / 1024:.2f} MB")
-        return face_detector
+        return detector_pool
     except Exception as e:
         logger.error(f"Failed to load model: {e}")
         models_loaded_from_volume = False
         return None
 
-# Initialize detector on startup
+def initialize_embedder():
+    """Initialize the SFace embedder used for face recognition"""
+    global face_embedder
+    
+    if not ENABLE_RECOGNITION:
+        return None
+    
+    model_path = os.path.join(MODEL_DIR, RECOGNITION_MODEL_NAME)
+    if not os.path.exists(model_path):
+        if not AUTO_DOWNLOAD_MODELS or not download_default_model(RECOGNITION_MODEL_NAME, SFACE_MODEL_URL):
+            logger.warning(f"Recognition model not found at {model_path}; embedding and matching are disabled")
+            return None
+    
+    try:
+        face_embedder = FaceEmbedder(model_path, batch_size=EMBED_BATCH_SIZE)
+        logger.info(f"Successfully loaded SFace model from {model_path}")
+        return face_embedder
+    except Exception as e:
+        logger.error(f"Failed to load recognition model: {e}")
+        return None
+
+# Initialize detector and embedder on startup
 initialize_detector()
+initialize_embedder()
+
+@app.on_event("shutdown")
+async def shutdown_detector_pool():
+    """Stop the detection worker threads"""
+    if detector_pool is not None:
+        detector_pool.shutdown()
 
 class FaceDetectionRequest(BaseModel):
     """Request model for face detection with base64 image"""
@@ -118,6 +184,9 @@ class FaceDetectionRequest(BaseModel):
     nms_threshold: Optional[float] = NMS_THRESHOLD
     top_k: Optional[int] = TOP_K
     visualize: bool = False
+    embed: bool = False
+    match: bool = False
+    match_threshold: float = MATCH_THRESHOLD
 
 class FaceDetectionURLRequest(BaseModel):
     """Request model for face detection with image URL"""
@@ -126,6 +195,20 @@ class FaceDetectionURLRequest(BaseModel):
     nms_threshold: Optional[float] = NMS_THRESHOLD
     top_k: Optional[int] = TOP_K
     visualize: bool = False
+    embed: bool = False
+    match: bool = False
+    match_threshold: float = MATCH_THRESHOLD
+
+class FaceDetectionPathRequest(BaseModel):
+    """Request model for face detection with a path or file:// URL under INPUT_ROOTS"""
+    path: str
+    score_threshold: Optional[float] = SCORE_THRESHOLD
+    nms_threshold: Optional[float] = NMS_THRESHOLD
+    top_k: Optional[int] = TOP_K
+    visualize: bool = False
+    embed: bool = False
+    match: bool = False
+    match_threshold: float = MATCH_THRESHOLD
 
 class FaceDetectionResponse(BaseModel):
     """Response model for face detection results"""
@@ -136,6 +219,19 @@ class FaceDetectionResponse(BaseModel):
     processing_time_ms: Optional[float] = None
     visualization_path: Optional[str] = None
 
+class GalleryEmbeddingsRequest(BaseModel):
+    """Request model for adding precomputed embeddings to the gallery"""
+    name: str
+    embeddings: List[List[float]]
+
+class GalleryResponse(BaseModel):
+    """Response model for gallery changes"""
+    success: bool
+    name: Optional[str] = None
+    embeddings: int = 0
+    face: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
 def create_visualization(image: np.ndarray, faces: List[Dict[str, Any]]) -> str:
     """
     Create a visualization of detected faces with bounding boxes and landmarks.
@@ -174,7 +270,8 @@ def create_visualization(image: np.ndarray, faces: List[Dict[str, Any]]) -> str:
     return vis_path
 
 def detect_faces(image: np.ndarray, score_threshold: float = SCORE_THRESHOLD, 
-                 nms_threshold: float = NMS_THRESHOLD, top_k: int = TOP_K) -> List[Dict[str, Any]]:
+                 nms_threshold: float = NMS_THRESHOLD, top_k: int = TOP_K,
+                 original_size: Optional[Tuple[int, int]] = None) -> List[Dict[str, Any]]:
     """
     Detect faces in an image using YuNet
     
@@ -183,28 +280,29 @@ def detect_faces(image: np.ndarray, score_threshold: float = SCORE_THRESHOLD,
         score_threshold: Minimum confidence score for face detection
         nms_threshold: NMS threshold for duplicate removal
         top_k: Maximum number of faces to detect
+        original_size: (width, height) of the source image if image was decoded reduced
     
     Returns:
-        List of detected faces with bounding boxes and landmarks
+        List of detected faces with bounding boxes and landmarks (source image coordinates)
     """
-    if face_detector is None:
+    if detector_pool is None:
         raise RuntimeError("Face detector not initialized")
     
-    height, width = image.shape[:2]
-    
-    # Update detector settings
-    face_detector.setInputSize((width, height))
-    face_detector.setScoreThreshold(score_threshold)
-    face_detector.setNMSThreshold(nms_threshold)
-    face_detector.setTopK(top_k)
+    # Detect faces (downscaled to DETECT_MAX_SIDE, mapped back to source coordinates)
+    faces = detector_pool.detect(image, score_threshold, nms_threshold, top_k, original_size)
     
-    # Detect faces
-    _, faces = face_detector.detect(image)
+    return parse_faces(faces)
+
+def parse_faces(faces: np.ndarray) -> List[Dict[str, Any]]:
+    """
+    Convert raw YuNet rows into face dictionaries
     
-    if faces is None:
-        return []
+    Args:
+        faces: (N, 15) array of x, y, w, h, 5 landmark (x, y) pairs, confidence
     
-    # Parse detection results
+    Returns:
+        List of detected faces with bounding boxes and landmarks
+    """
     detected_faces = []
     for face in faces:
         # YuNet returns: x, y, width, height, landmark_x1, landmark_y1, ..., confidence
@@ -227,6 +325,114 @@ def detect_faces(image: np.ndarray, score_threshold: float = SCORE_THRESHOLD,
     
     return detected_faces
 
+def decode_and_detect(data: BytesLike, score_threshold: float = SCORE_THRESHOLD,
+                      nms_threshold: float = NMS_THRESHOLD, top_k: int = TOP_K,
+                      full_image: bool = False, embed: bool = False, match: bool = False,
+                      match_threshold: float = MATCH_THRESHOLD) -> Tuple[Optional[np.ndarray], List[Dict[str, Any]]]:
+    """
+    Decode image bytes and detect faces (runs on a detector pool thread)
+    
+    Args:
+        data: Encoded image bytes (or a memory-mapped file)
+        full_image: Decode at full resolution (needed when the image is drawn on)
+        embed: Add each face's normalized SFace embedding
+        match: Add each face's best gallery match (or None below match_threshold)
+        match_threshold: Minimum cosine similarity for a gallery match
+    
+    Returns:
+        (decoded image or None if undecodable, detected faces)
+    """
+    image, original_size = decode_image(data, 0 if full_image else DETECT_MAX_SIDE)
+    if image is None:
+        return None, []
+    if not (embed or match):
+        return image, detect_faces(image, score_threshold, nms_threshold, top_k, original_size)
+    
+    if face_embedder is None:
+        raise RuntimeError("Recognition model not loaded. Please ensure the SFace model exists in the models directory.")
+    
+    # Align and embed from the already decoded image, all faces in one batch
+    rows = detector_pool.detect(image, score_threshold, nms_threshold, top_k, original_size)
+    faces = parse_faces(rows)
+    embeddings = face_embedder.embed(image, rows, original_size)
+    
+    matches = face_gallery.match(embeddings, match_threshold) if match else []
+    for i, face in enumerate(faces):
+        if embed:
+            face["embedding"] = embeddings[i].tolist()
+        if match:
+            face["match"] = matches[i]
+    return image, faces
+
+def stream_tracked_faces(frames, tracker: FaceTracker, cleanup_path: Optional[str] = None):
+    """
+    Run the tracker over frames, yielding one NDJSON line per frame and a final summary
+    
+    Starlette iterates sync generators in a worker thread, so detection and
+    optical flow never run on the event loop.
+    """
+    try:
+        for index, timestamp_ms, frame in frames:
+            if frame is None:
+                yield json.dumps({"frame": index, "error": "Invalid image data"}).encode("utf-8") + b"\n"
+                continue
+            result = tracker.process(frame)
+            faces = parse_faces(result["faces"])
+            yield json.dumps({
+                "frame": index,
+                "timestamp_ms": timestamp_ms,
+                "source": result["source"],
+                "tracking_confidence": round(result["confidence"], 3),
+                "face_count": len(faces),
+                "faces": faces
+            }).encode("utf-8") + b"\n"
+        yield json.dumps({"done": True, **tracker.summary()}).encode("utf-8") + b"\n"
+    except Exception as e:
+        logger.error(f"Frame sequence detection failed: {e}")
+        yield json.dumps({"done": False, "error": str(e)}).encode("utf-8") + b"\n"
+    finally:
+        if cleanup_path and os.path.exists(cleanup_path):
+            os.unlink(cleanup_path)
+
+def create_tracker(keyframe_interval: int, min_track_confidence: float, score_threshold: float,
+                   nms_threshold: float, top_k: int) -> FaceTracker:
+    """Tracker whose keyframe detections go through the detector pool"""
+    if keyframe_interval < 1:
+        raise HTTPException(status_code=422, detail="keyframe_interval must be at least 1")
+    return FaceTracker(
+        lambda frame: detector_pool.detect(frame, score_threshold, nms_threshold, top_k),
+        keyframe_interval=keyframe_interval,
+        min_confidence=min_track_confidence
+    )
+
+async def detect_response(content: BytesLike, score_threshold: float, nms_threshold: float, top_k: int,
+                          visualize: bool, embed: bool, match: bool, match_threshold: float,
+                          start_time: float) -> FaceDetectionResponse:
+    """Detect faces in encoded image data on the detector pool and build the response"""
+    image, faces = await detector_pool.run(
+        decode_and_detect, content, score_threshold, nms_threshold, top_k, visualize,
+        embed, match, match_threshold
+    )
+    
+    if image is None:
+        return FaceDetectionResponse(
+            success=False,
+            error="Invalid image data"
+        )
+    
+    response = FaceDetectionResponse(
+        success=True,
+        faces=faces,
+        face_count=len(faces),
+        processing_time_ms=(time.time() - start_time) * 1000
+    )
+    
+    if visualize and len(faces) > 0:
+        vis_path = create_visualization(image, faces)
+        response.visualization_path = os.path.basename(vis_path)
+    
+    return response
+
 @app.get("/")
 async def root():
     """Root endpoint with API information"""
@@ -238,7 +444,15 @@ async def root():
             "/face-detect/file": "POST - Upload image file for face detection",
             "/face-detect/base64": "POST - Send base64 encoded image for face detection",
             "/face-detect/url": "POST - Send image URL for face detection",
+            "/face-detect/raw": "POST - Send the image itself as an application/octet-stream body",
+            "/face-detect/path": "POST - Detect faces in a file under INPUT_ROOTS (path or file:// URL)",
+            "/face-detect/video": "POST - Upload a video; streams per-frame faces (NDJSON)",
+            "/face-detect/video/path": "POST - Same for a video under INPUT_ROOTS, read in place",
+            "/face-detect/frames": "POST - Upload ordered frames; streams per-frame faces (NDJSON)",
+            "/gallery": "GET - List gallery identities; POST - Add precomputed embeddings",
+            "/gallery/{name}": "POST - Enroll the largest face in a photo; DELETE - Remove an identity",
             "/visualization/{filename}": "GET - Retrieve visualization image",
+            "/admission": "GET - Admission queue depth, wait and service times per priority",
             "/health": "GET - Health check",
             "/healthz": "GET - Health check (Kubernetes-style)",
             "/docs": "GET - API documentation"
@@ -259,8 +473,17 @@ async def health_check():
         "settings": {
             "score_threshold": SCORE_THRESHOLD,
             "nms_threshold": NMS_THRESHOLD,
-            "top_k": TOP_K
-        }
+            "top_k": TOP_K,
+            "detector_pool": detector_pool.settings() if detector_pool else None,
+            "recognition": face_embedder.settings() if face_embedder else None,
+            "match_threshold": MATCH_THRESHOLD
+        },
+        "detector_stats": detector_pool.summary() if detector_pool else None,
+        "embedder_stats": face_embedder.stats if face_embedder else None,
+        "gallery": face_gallery.summary(),
+        "local_input": local_input.settings(),
+        "admission": admission.settings(),
+        "admission_stats": admission.metrics()
     }
 
 @app.post("/face-detect/file", response_model=FaceDetectionResponse)
@@ -269,7 +492,10 @@ async def face_detect_from_file(
     score_threshold: float = SCORE_THRESHOLD,
     nms_threshold: float = NMS_THRESHOLD,
     top_k: int = TOP_K,
-    visualize: bool = False
+    visualize: bool = False,
+    embed: bool = False,
+    match: bool = False,
+    match_threshold: float = MATCH_THRESHOLD
 ):
     """
     Perform face detection on an uploaded image file
@@ -280,6 +506,9 @@ async def face_detect_from_file(
         nms_threshold: NMS threshold for duplicate removal
         top_k: Maximum number of faces to detect
         visualize: Whether to generate visualization of detected faces
+        embed: Whether to return a face embedding per face
+        match: Whether to match each face against the gallery
+        match_threshold: Minimum cosine similarity for a gallery match
     
     Returns:
         Face detection results with bounding boxes and landmarks
@@ -296,9 +525,11 @@ async def face_detect_from_file(
         # Read file content
         content = await file.read()
         
-        # Convert to OpenCV image
-        nparr = np.frombuffer(content, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        # Decode and detect faces on the detector pool
+        image, faces = await detector_pool.run(
+            decode_and_detect, content, score_threshold, nms_threshold, top_k, visualize,
+            embed, match, match_threshold
+        )
         
         if image is None:
             return FaceDetectionResponse(
@@ -306,9 +537,6 @@ async def face_detect_from_file(
                 error="Invalid image file"
             )
         
-        # Detect faces
-        faces = detect_faces(image, score_threshold, nms_threshold, top_k)
-        
         processing_time = (time.time() - start_time) * 1000  # Convert to ms
         
         response = FaceDetectionResponse(
@@ -355,9 +583,18 @@ async def face_detect_from_base64(request: FaceDetectionRequest):
         # Decode base64 image
         image_data = base64.b64decode(request.image_base64)
         
-        # Convert to OpenCV image
-        nparr = np.frombuffer(image_data, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        # Decode and detect faces on the detector pool
+        image, faces = await detector_pool.run(
+            decode_and_detect,
+            image_data,
+            request.score_threshold,
+            request.nms_threshold,
+            request.top_k,
+            request.visualize,
+            request.embed,
+            request.match,
+            request.match_threshold
+        )
         
         if image is None:
             return FaceDetectionResponse(
@@ -365,14 +602,6 @@ async def face_detect_from_base64(request: FaceDetectionRequest):
                 error="Invalid image data"
             )
         
-        # Detect faces
-        faces = detect_faces(
-            image, 
-            request.score_threshold, 
-            request.nms_threshold, 
-            request.top_k
-        )
-        
         processing_time = (time.time() - start_time) * 1000  # Convert to ms
         
         response = FaceDetectionResponse(
@@ -415,13 +644,22 @@ async def face_detect_from_url(request: FaceDetectionURLRequest):
                 error="Model not loaded. Please ensure model file exists in the models directory."
             )
         
-        # Download image from URL
-        response = requests.get(str(request.image_url), timeout=30)
+        # Download image from URL (off the event loop)
+        response = await asyncio.to_thread(requests.get, str(request.image_url), timeout=30)
         response.raise_for_status()
         
-        # Convert to OpenCV image
-        nparr = np.frombuffer(response.content, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        # Decode and detect faces on the detector pool
+        image, faces = await detector_pool.run(
+            decode_and_detect,
+            response.content,
+            request.score_threshold,
+            request.nms_threshold,
+            request.top_k,
+            request.visualize,
+            request.embed,
+            request.match,
+            request.match_threshold
+        )
         
         if image is None:
             return FaceDetectionResponse(
@@ -429,14 +667,6 @@ async def face_detect_from_url(request: FaceDetectionURLRequest):
                 error="Invalid image from URL"
             )
         
-        # Detect faces
-        faces = detect_faces(
-            image, 
-            request.score_threshold, 
-            request.nms_threshold, 
-            request.top_k
-        )
-        
         processing_time = (time.time() - start_time) * 1000  # Convert to ms
         
         response = FaceDetectionResponse(
@@ -464,6 +694,276 @@ async def face_detect_from_url(request: FaceDetectionURLRequest):
             error=str(e)
         )
 
+@app.post("/face-detect/raw", response_model=FaceDetectionResponse)
+async def face_detect_from_raw(
+    request: Request,
+    score_threshold: float = SCORE_THRESHOLD,
+    nms_threshold: float = NMS_THRESHOLD,
+    top_k: int = TOP_K,
+    visualize: bool = False,
+    embed: bool = False,
+    match: bool = False,
+    match_threshold: float = MATCH_THRESHOLD
+):
+    """
+    Perform face detection on an image sent as the raw request body (Content-Type: application/octet-stream)
+    
+    Takes the same query parameters as /face-detect/file.
+    
+    Returns:
+        Face detection results with bounding boxes and landmarks
+    """
+    start_time = time.time()
+    
+    try:
+        if not models_loaded_from_volume:
+            return FaceDetectionResponse(
+                success=False,
+                error="Model not loaded. Please ensure model file exists in the models directory."
+            )
+        
+        content = await local_input.read_body(request)
+        return await detect_response(
+            content, score_threshold, nms_threshold, top_k, visualize, embed, match, match_threshold, start_time
+        )
+        
+    except Exception as e:
+        return FaceDetectionResponse(
+            success=False,
+            error=str(e)
+        )
+
+@app.post("/face-detect/path", response_model=FaceDetectionResponse)
+async def face_detect_from_path(request: FaceDetectionPathRequest):
+    """
+    Perform face detection on an image on a shared volume, memory-mapped instead of uploaded
+    
+    Args:
+        request: FaceDetectionPathRequest with a path or file:// URL inside INPUT_ROOTS
+    
+    Returns:
+        Face detection results with bounding boxes and landmarks
+    """
+    start_time = time.time()
+    
+    try:
+        if not models_loaded_from_volume:
+            return FaceDetectionResponse(
+                success=False,
+                error="Model not loaded. Please ensure model file exists in the models directory."
+            )
+        
+        content = await asyncio.to_thread(local_input.read, request.path)
+        return await detect_response(
+            content,
+            request.score_threshold,
+            request.nms_threshold,
+            request.top_k,
+            request.visualize,
+            request.embed,
+            request.match,
+            request.match_threshold,
+            start_time
+        )
+        
+    except Exception as e:
+        return FaceDetectionResponse(
+            success=False,
+            error=str(e)
+        )
+
+@app.post("/face-detect/video")
+async def face_detect_from_video(
+    file: UploadFile = File(...),
+    keyframe_interval: int = 10,
+    min_track_confidence: float = 0.6,
+    stride: int = 1,
+    max_frames: int = 0,
+    score_threshold: float = SCORE_THRESHOLD,
+    nms_threshold: float = NMS_THRESHOLD,
+    top_k: int = TOP_K
+):
+    """
+    Detect faces through a video, running YuNet on keyframes and tracking in between
+    
+    Args:
+        file: Video file (any container/codec OpenCV's FFmpeg build can read)
+        keyframe_interval: Maximum frames between full detections
+        min_track_confidence: Redetect as soon as a face keeps less than this share of tracked points
+        stride: Process every n-th frame
+        max_frames: Stop after this many processed frames (0 = no limit)
+    
+    Returns:
+        NDJSON stream: one line per processed frame, then a summary line with "done": true
+    """
+    if not models_loaded_from_volume:
+        raise HTTPException(status_code=503, detail="Model not loaded. Please ensure model file exists in the models directory.")
+    if stride < 1:
+        raise HTTPException(status_code=422, detail="stride must be at least 1")
+    tracker = create_tracker(keyframe_interval, min_track_confidence, score_threshold, nms_threshold, top_k)
+    
+    # OpenCV needs a file path; copy the upload before the response starts streaming
+    suffix = Path(file.filename or "").suffix or ".mp4"
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as video_file:
+        await asyncio.to_thread(shutil.copyfileobj, file.file, video_file)
+        video_path = video_file.name
+    
+    return StreamingResponse(
+        stream_tracked_faces(iter_video_frames(video_path, stride, max_frames), tracker, video_path),
+        media_type="application/x-ndjson"
+    )
+
+@app.post("/face-detect/video/path")
+async def face_detect_from_video_path(
+    path: str,
+    keyframe_interval: int = 10,
+    min_track_confidence: float = 0.6,
+    stride: int = 1,
+    max_frames: int = 0,
+    score_threshold: float = SCORE_THRESHOLD,
+    nms_threshold: float = NMS_THRESHOLD,
+    top_k: int = TOP_K
+):
+    """
+    Detect faces through a video on a shared volume; OpenCV reads the file in place
+    
+    Args:
+        path: Path or file:// URL inside INPUT_ROOTS
+    
+    Takes the same tracking parameters as /face-detect/video.
+    
+    Returns:
+        NDJSON stream: one line per processed frame, then a summary line with "done": true
+    """
+    if not models_loaded_from_volume:
+        raise HTTPException(status_code=503, detail="Model not loaded. Please ensure model file exists in the models directory.")
+    if stride < 1:
+        raise HTTPException(status_code=422, detail="stride must be at least 1")
+    try:
+        video_path = local_input.resolve(path)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    tracker = create_tracker(keyframe_interval, min_track_confidence, score_threshold, nms_threshold, top_k)
+    
+    return StreamingResponse(
+        stream_tracked_faces(iter_video_frames(video_path, stride, max_frames), tracker),
+        media_type="application/x-ndjson"
+    )
+
+@app.post("/face-detect/frames")
+async def face_detect_from_frames(
+    files: List[UploadFile] = File(...),
+    keyframe_interval: int = 10,
+    min_track_confidence: float = 0.6,
+    score_threshold: float = SCORE_THRESHOLD,
+    nms_threshold: float = NMS_THRESHOLD,
+    top_k: int = TOP_K
+):
+    """
+    Detect faces through an ordered sequence of frames (e.g. a photo burst)
+    
+    Args:
+        files: Frames in order (JPEG, PNG, etc.)
+        keyframe_interval: Maximum frames between full detections
+        min_track_confidence: Redetect as soon as a face keeps less than this share of tracked points
+    
+    Returns:
+        NDJSON stream: one line per frame, then a summary line with "done": true
+    """
+    if not models_loaded_from_volume:
+        raise HTTPException(status_code=503, detail="Model not loaded. Please ensure model file exists in the models directory.")
+    tracker = create_tracker(keyframe_interval, min_track_confidence, score_threshold, nms_threshold, top_k)
+    frames = [await file.read() for file in files]
+    
+    return StreamingResponse(
+        stream_tracked_faces(iter_encoded_frames(frames), tracker),
+        media_type="application/x-ndjson"
+    )
+
+def enroll_face(data: bytes, score_threshold: float) -> Tuple[Optional[np.ndarray], Optional[Dict[str, Any]], Optional[np.ndarray]]:
+    """
+    Decode an enrollment photo and embed its largest face (runs on a detector pool thread)
+    
+    Returns:
+        (decoded image or None if undecodable, enrolled face or None if no face, (1, D) embedding)
+    """
+    image, original_size = decode_image(data, DETECT_MAX_SIDE)
+    if image is None:
+        return None, None, None
+    rows = detector_pool.detect(image, score_threshold, NMS_THRESHOLD, TOP_K, original_size)
+    if len(rows) == 0:
+        return image, None, None
+    largest = rows[np.argmax(rows[:, 2] * rows[:, 3])][None]
+    return image, parse_faces(largest)[0], face_embedder.embed(image, largest, original_size)
+
+@app.get("/admission")
+async def admission_stats():
+    """Admission settings and per-priority queue metrics"""
+    return {"settings": admission.settings(), "stats": admission.metrics()}
+
+@app.get("/gallery")
+async def list_gallery():
+    """List gallery identities and how many embeddings each has"""
+    return {"identities": face_gallery.identities(), "embeddings": face_gallery.summary()["embeddings"]}
+
+@app.post("/gallery", response_model=GalleryResponse)
+async def add_gallery_embeddings(request: GalleryEmbeddingsRequest):
+    """
+    Add precomputed embeddings (e.g. from an earlier embed=true response) under a name
+    
+    The gallery lives in memory only; clients can re-enroll stored embeddings after a restart.
+    """
+    try:
+        if not request.embeddings:
+            return GalleryResponse(success=False, name=request.name, error="No embeddings provided")
+        count = face_gallery.add(request.name, np.array(request.embeddings, dtype=np.float32))
+        return GalleryResponse(success=True, name=request.name, embeddings=count)
+    except ValueError as e:
+        return GalleryResponse(success=False, name=request.name, error=str(e))
+
+@app.post("/gallery/{name}", response_model=GalleryResponse)
+async def enroll_gallery_face(name: str, file: UploadFile = File(...), score_threshold: float = SCORE_THRESHOLD):
+    """
+    Enroll the largest face in an uploaded photo under a name
+    
+    Args:
+        name: Identity to add the face to (repeat to add more photos of the same person)
+        file: Image file (JPEG, PNG, etc.)
+        score_threshold: Minimum confidence score for face detection
+    
+    Returns:
+        The enrolled face and how many embeddings the identity now has
+    """
+    try:
+        if not models_loaded_from_volume or face_embedder is None:
+            return GalleryResponse(
+                success=False,
+                name=name,
+                error="Detection or recognition model not loaded. Please ensure both model files exist in the models directory."
+            )
+        
+        content = await file.read()
+        image, face, embedding = await detector_pool.run(enroll_face, content, score_threshold)
+        
+        if image is None:
+            return GalleryResponse(success=False, name=name, error="Invalid image file")
+        if face is None:
+            return GalleryResponse(success=False, name=name, error="No face detected")
+        
+        count = face_gallery.add(name, embedding)
+        return GalleryResponse(success=True, name=name, embeddings=count, face=face)
+        
+    except Exception as e:
+        return GalleryResponse(success=False, name=name, error=str(e))
+
+@app.delete("/gallery/{name}")
+async def delete_gallery_identity(name: str):
+    """Remove an identity and all of its embeddings from the gallery"""
+    removed = face_gallery.remove(name)
+    if not removed:
+        raise HTTPException(status_code=404, detail="Identity not found")
+    return {"success": True, "name": name, "removed": removed}
+
 @app.get("/visualization/{filename}")
 async def get_visualization(filename: str):
     """
@@ -0,0 +1,226 @@
+"""
+YuNet detector pool
+
+The original service reconfigured one global cv2.FaceDetectorYN on every call
+(setInputSize + thresholds), which races under concurrent requests and makes
+OpenCV reshape the network for every new image size. Full-resolution photos
+were also fed in unscaled.
+
+This pool:
+- downscales images so the longest side is at most max_side (JPEGs are decoded
+  straight at 1/2, 1/4 or 1/8 scale when that is enough) and pads them
+  bottom/right up to a size bucket, so coordinates only need rescaling
+- keeps detectors per bucketed input size; a detector is borrowed by exactly
+  one thread at a time, so thresholds can be set per call without races
+- runs detection in a thread pool (OpenCV DNN releases the GIL)
+"""
+
+import asyncio
+import logging
+import math
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# cv2.imdecode reduced-scale flags, largest reduction first
+REDUCED_DECODE_FLAGS = ((8, cv2.IMREAD_REDUCED_COLOR_8), (4, cv2.IMREAD_REDUCED_COLOR_4), (2, cv2.IMREAD_REDUCED_COLOR_2))
+
+
+def _jpeg_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """(width, height) from a JPEG SOF marker, or None for other formats"""
+    if data[:2] != b"\xff\xd8":
+        return None
+    i = 2
+    while i + 9 < len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        length = int.from_bytes(data[i + 2:i + 4], "big")
+        if marker in (0xC0, 0xC1, 0xC2):
+            height = int.from_bytes(data[i + 5:i + 7], "big")
+            width = int.from_bytes(data[i + 7:i + 9], "big")
+            return width, height
+        i += 2 + length
+    return None
+
+
+def _oriented_size(image: np.ndarray, size: Tuple[int, int], factor: int) -> Tuple[int, int]:
+    """
+    Original size in the orientation of the decoded image
+
+    imdecode applies the EXIF orientation but the SOF marker holds the stored
+    (unrotated) size, so for 90/270 degree rotations the two are swapped.
+    """
+    width, height = size
+    decoded_width, decoded_height = image.shape[1] * factor, image.shape[0] * factor
+    if abs(decoded_width - height) + abs(decoded_height - width) < abs(decoded_width - width) + abs(decoded_height - height):
+        return height, width
+    return width, height
+
+
+def decode_image(data: bytes, max_side: int = 0) -> Tuple[Optional[np.ndarray], Tuple[int, int]]:
+    """
+    Decode image bytes to BGR, reduced at decode time when max_side allows
+
+    Args:
+        data: Encoded image bytes
+        max_side: Longest side needed downstream (0 = always decode at full size)
+
+    Returns:
+        (image or None if undecodable, original (width, height))
+    """
+    buffer = np.frombuffer(data, np.uint8)
+    size = _jpeg_size(data) if max_side > 0 else None
+    if size is not None:
+        for factor, flag in REDUCED_DECODE_FLAGS:
+            if max(size) / factor >= max_side:
+                image = cv2.imdecode(buffer, flag)
+                if image is not None:
+                    return image, _oriented_size(image, size, factor)
+
+    image = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+    if image is None:
+        return None, (0, 0)
+    return image, (image.shape[1], image.shape[0])
+
+
+def letterbox(image: np.ndarray, max_side: int, bucket: int) -> Tuple[np.ndarray, float]:
+    """
+    Downscale so the longest side is at most max_side, then zero-pad bottom/right
+    to the next multiple of bucket
+
+    Returns:
+        (padded image, scale applied to the input)
+    """
+    height, width = image.shape[:2]
+    scale = min(1.0, max_side / max(height, width)) if max_side > 0 else 1.0
+    if scale < 1.0:
+        image = cv2.resize(
+            image, (max(1, round(width * scale)), max(1, round(height * scale))), interpolation=cv2.INTER_AREA
+        )
+        height, width = image.shape[:2]
+
+    padded_width = math.ceil(width / bucket) * bucket
+    padded_height = math.ceil(height / bucket) * bucket
+    if (padded_width, padded_height) != (width, height):
+        image = cv2.copyMakeBorder(
+            image, 0, padded_height - height, 0, padded_width - width, cv2.BORDER_CONSTANT, value=0
+        )
+    return image, scale
+
+
+class DetectorPool:
+    """Bucketed, thread-safe pool of cv2.FaceDetectorYN instances"""
+
+    def __init__(
+        self,
+        detector_factory: Callable[[Tuple[int, int]], Any],
+        max_side: int = 1280,
+        bucket: int = 64,
+        workers: int = 4,
+        max_buckets: int = 16,
+    ):
+        self.detector_factory = detector_factory
+        self.max_side = max_side
+        self.bucket = bucket
+        self.workers = workers
+        self.max_buckets = max_buckets
+
+        self._buckets: "OrderedDict[Tuple[int, int], queue.Queue]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="yunet")
+        self.stats = {"detections": 0, "detectors_created": 0, "buckets_evicted": 0}
+
+    def settings(self) -> Dict[str, int]:
+        return {
+            "max_side": self.max_side,
+            "bucket": self.bucket,
+            "workers": self.workers,
+            "max_buckets": self.max_buckets,
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            buckets = [f"{w}x{h}" for w, h in self._buckets]
+        return {**self.stats, "buckets": buckets}
+
+    def _borrow(self, size: Tuple[int, int]) -> Any:
+        with self._lock:
+            idle = self._buckets.get(size)
+            if idle is None:
+                idle = self._buckets[size] = queue.Queue()
+                # Forget the least recently used bucket; borrowed detectors are simply not returned
+                while len(self._buckets) > self.max_buckets:
+                    self._buckets.popitem(last=False)
+                    self.stats["buckets_evicted"] += 1
+            self._buckets.move_to_end(size)
+            try:
+                return idle.get_nowait()
+            except queue.Empty:
+                self.stats["detectors_created"] += 1
+
+        # At most one detector per worker thread and bucket is ever created
+        return self.detector_factory(size)
+
+    def _return(self, size: Tuple[int, int], detector: Any) -> None:
+        with self._lock:
+            idle = self._buckets.get(size)
+            if idle is not None:
+                idle.put(detector)
+
+    def detect(
+        self,
+        image: np.ndarray,
+        score_threshold: float,
+        nms_threshold: float,
+        top_k: int,
+        original_size: Optional[Tuple[int, int]] = None,
+    ) -> np.ndarray:
+        """
+        Detect faces synchronously, returning YuNet rows in original-image coordinates
+
+        Args:
+            image: BGR image (possibly already reduced at decode time)
+            original_size: (width, height) of the source image if image was reduced
+
+        Returns:
+            (N, 15) float32 array: x, y, w, h, 5 landmark (x, y) pairs, score
+        """
+        height, width = image.shape[:2]
+        padded, scale = letterbox(image, self.max_side, self.bucket)
+        size = (padded.shape[1], padded.shape[0])
+
+        detector = self._borrow(size)
+        try:
+            detector.setScoreThreshold(score_threshold)
+            detector.setNMSThreshold(nms_threshold)
+            detector.setTopK(top_k)
+            _, faces = detector.detect(padded)
+        finally:
+            self._return(size, detector)
+
+        with self._lock:
+            self.stats["detections"] += 1
+        if faces is None:
+            return np.zeros((0, 15), dtype=np.float32)
+
+        original_width, original_height = original_size or (width, height)
+        faces = faces.copy()
+        faces[:, 0:14:2] *= original_width / (width * scale)
+        faces[:, 1:14:2] *= original_height / (height * scale)
+        return faces
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run fn(*args) on the detection thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, fn, *args)
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
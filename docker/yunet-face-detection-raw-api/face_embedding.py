@@ -0,0 +1,187 @@
+"""
+Face alignment, embedding and gallery matching with SFace
+
+Recognizing a face used to mean decoding the image here for detection, shipping
+crops to another service and decoding again. Instead, the decoded image and the
+YuNet landmarks are reused in-process:
+
+- each face is aligned to the canonical 112x112 SFace crop from its 5 landmarks
+  (cv2.FaceRecognizerSF.alignCrop)
+- all crops of a request go through the SFace network as one blob; if the model
+  was exported with a fixed batch of 1, faces are embedded one at a time
+- embeddings are L2-normalized, so matching against the gallery is a single
+  (faces x gallery) matrix product of cosine similarities
+"""
+
+import logging
+import queue
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SFACE_INPUT_SIZE = (112, 112)
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class FaceEmbedder:
+    """Thread-safe SFace embedder; one network per concurrent caller"""
+
+    def __init__(self, model_path: str, batch_size: int = 32):
+        self.model_path = model_path
+        self.batch_size = batch_size
+        # alignCrop only warps the image; the recognizer's own network is never run
+        self.aligner = cv2.FaceRecognizerSF.create(model_path, "")
+        self._nets: "queue.Queue[Any]" = queue.Queue()
+        self._lock = threading.Lock()
+        # None until the first multi-face batch shows whether the model accepts batches
+        self.batch_supported: Optional[bool] = None
+        self.stats = {"faces": 0, "batches": 0, "networks": 0}
+
+    def settings(self) -> Dict[str, Any]:
+        return {
+            "model": self.model_path,
+            "batch_size": self.batch_size,
+            "batch_supported": self.batch_supported,
+        }
+
+    def _borrow(self) -> Any:
+        try:
+            return self._nets.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                self.stats["networks"] += 1
+            return cv2.dnn.readNet(self.model_path)
+
+    def align(self, image: np.ndarray, faces: np.ndarray) -> List[np.ndarray]:
+        """112x112 BGR crops for YuNet rows given in image coordinates"""
+        return [self.aligner.alignCrop(image, face) for face in faces]
+
+    def _forward(self, net: Any, crops: List[np.ndarray]) -> np.ndarray:
+        # Same preprocessing as FaceRecognizerSF.feature: raw pixels, BGR -> RGB
+        net.setInput(cv2.dnn.blobFromImages(crops, 1.0, SFACE_INPUT_SIZE, (0, 0, 0), True, False))
+        return net.forward().reshape(len(crops), -1)
+
+    def _embed_batch(self, net: Any, crops: List[np.ndarray]) -> np.ndarray:
+        if len(crops) > 1 and self.batch_supported is not False:
+            try:
+                features = self._forward(net, crops)
+                self.batch_supported = True
+                return features
+            except (cv2.error, ValueError) as e:
+                logger.warning(f"SFace model does not accept batches, embedding faces one at a time: {e}")
+                self.batch_supported = False
+        return np.concatenate([self._forward(net, [crop]) for crop in crops])
+
+    def embed(
+        self, image: np.ndarray, faces: np.ndarray, original_size: Optional[Tuple[int, int]] = None
+    ) -> np.ndarray:
+        """
+        Align and embed every face in an image
+
+        Args:
+            image: BGR image the faces were detected in (possibly reduced at decode time)
+            faces: (N, 15) YuNet rows
+            original_size: (width, height) the rows' coordinates refer to, if not image's own
+
+        Returns:
+            (N, D) float32 array of L2-normalized embeddings
+        """
+        if len(faces) == 0:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        faces = np.asarray(faces, dtype=np.float32)
+        if original_size is not None and original_size != (image.shape[1], image.shape[0]):
+            faces = faces.copy()
+            faces[:, 0:14:2] *= image.shape[1] / original_size[0]
+            faces[:, 1:14:2] *= image.shape[0] / original_size[1]
+
+        crops = self.align(image, faces)
+        net = self._borrow()
+        try:
+            features = np.concatenate([
+                self._embed_batch(net, crops[start:start + self.batch_size])
+                for start in range(0, len(crops), self.batch_size)
+            ])
+        finally:
+            self._nets.put(net)
+
+        with self._lock:
+            self.stats["faces"] += len(crops)
+            self.stats["batches"] += -(-len(crops) // self.batch_size)
+        return normalize(features)
+
+
+class FaceGallery:
+    """In-memory gallery of named, normalized face embeddings"""
+
+    def __init__(self):
+        # (matrix, names) snapshot, replaced in one assignment on every change
+        # so readers see a consistent pair without taking the lock
+        self._gallery: Tuple[np.ndarray, List[str]] = (np.zeros((0, 0), dtype=np.float32), [])
+        self._lock = threading.Lock()
+
+    def add(self, name: str, embeddings: np.ndarray) -> int:
+        """Add embeddings under a name; returns how many the name now has"""
+        embeddings = normalize(np.atleast_2d(embeddings))
+        with self._lock:
+            matrix, names = self._gallery
+            if names and embeddings.shape[1] != matrix.shape[1]:
+                raise ValueError(
+                    f"Embedding dimension {embeddings.shape[1]} does not match gallery ({matrix.shape[1]})"
+                )
+            matrix = embeddings if not names else np.concatenate([matrix, embeddings])
+            names = names + [name] * len(embeddings)
+            self._gallery = (matrix, names)
+            return names.count(name)
+
+    def remove(self, name: str) -> int:
+        """Drop every embedding stored under a name; returns how many were removed"""
+        with self._lock:
+            matrix, names = self._gallery
+            keep = [i for i, existing in enumerate(names) if existing != name]
+            removed = len(names) - len(keep)
+            if removed:
+                self._gallery = (matrix[keep], [names[i] for i in keep])
+            return removed
+
+    def identities(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for name in self._gallery[1]:
+            counts[name] = counts.get(name, 0) + 1
+        return counts
+
+    def summary(self) -> Dict[str, Any]:
+        names = self._gallery[1]
+        return {"identities": len(set(names)), "embeddings": len(names)}
+
+    def match(self, embeddings: np.ndarray, threshold: float) -> List[Optional[Dict[str, Any]]]:
+        """
+        Best gallery match per embedding
+
+        Args:
+            embeddings: (N, D) L2-normalized query embeddings
+            threshold: Minimum cosine similarity for a match
+
+        Returns:
+            Per query, {"name", "similarity"} of the closest entry, or None below threshold
+        """
+        matrix, names = self._gallery
+        if not names or len(embeddings) == 0:
+            return [None] * len(embeddings)
+
+        similarities = embeddings @ matrix.T
+        best = similarities.argmax(axis=1)
+        scores = similarities[np.arange(len(best)), best]
+        return [
+            {"name": names[index], "similarity": float(score)} if score >= threshold else None
+            for index, score in zip(best, scores)
+        ]
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Offline throughput benchmark: single reconfigured detector vs. DetectorPool
+
+Builds a mixed set of photo sizes from the test face images and measures
+images/second for:
+- legacy: one detector, setInputSize per image, full-resolution decode and
+  detection, one request at a time (the old detect_faces path)
+- pool: reduced decode + letterbox to DETECT_MAX_SIDE, bucketed detectors,
+  DETECT_WORKERS threads
+
+Before timing, it checks that a reduced decode of an EXIF-rotated photo
+reports the same original size as a full decode.
+
+Usage: python test/benchmark_pool.py [--images 60] [--workers 4] [--max-side 1280]
+"""
+
+import argparse
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+
+from detector_pool import DetectorPool, decode_image  # noqa: E402
+
+MODEL_PATH = os.path.join(SERVICE_DIR, "models", "face_detection_yunet_2023mar_int8.onnx")
+PHOTO_SIZES = [(640, 480), (1280, 720), (1920, 1080), (3024, 4032), (4032, 3024), (1080, 1350)]
+
+
+def create_detector(size):
+    return cv2.FaceDetectorYN.create(MODEL_PATH, "", size, 0.7, 0.3, 5000)
+
+
+def build_workload(count):
+    sources = [cv2.imread(os.path.join(SERVICE_DIR, "test", name)) for name in ("test-face.jpg", "test-face2.jpg")]
+    sources = [image for image in sources if image is not None]
+    workload = []
+    for i in range(count):
+        width, height = PHOTO_SIZES[i % len(PHOTO_SIZES)]
+        image = cv2.resize(sources[i % len(sources)], (width, height))
+        workload.append(cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes())
+    return workload
+
+
+def with_exif_orientation(data, orientation):
+    """Insert an APP1 Exif segment holding only the orientation tag after SOI"""
+    ifd = b"MM\x00*" + struct.pack(">I", 8) + struct.pack(">H", 1)
+    ifd += struct.pack(">HHIHH", 0x0112, 3, 1, orientation, 0) + struct.pack(">I", 0)
+    payload = b"Exif\x00\x00" + ifd
+    return data[:2] + b"\xff\xe1" + struct.pack(">H", len(payload) + 2) + payload + data[2:]
+
+
+def check_rotated_jpeg(max_side):
+    """Reduced and full decodes of a rotated phone photo must agree on its (width, height)"""
+    image = np.zeros((3024, 4032, 3), np.uint8)
+    cv2.rectangle(image, (100, 100), (1000, 600), (255, 255, 255), -1)
+    plain = cv2.imencode(".jpg", image)[1].tobytes()
+    for orientation in (1, 3, 6, 8):
+        data = with_exif_orientation(plain, orientation)
+        reduced, reduced_size = decode_image(data, max_side)
+        full, full_size = decode_image(data, 0)
+        expected = (full.shape[1], full.shape[0])
+        assert full_size == expected, (orientation, full_size, expected)
+        assert reduced_size == expected, (orientation, reduced_size, expected)
+        # Same orientation as the full decode, at a fraction of its size
+        assert (reduced.shape[1] > reduced.shape[0]) == (full.shape[1] > full.shape[0]), orientation
+    print("rotated JPEG check: reduced decode sizes match full decode for EXIF orientations 1, 3, 6, 8")
+
+
+def run_legacy(workload):
+    detector = create_detector((320, 320))
+    faces = 0
+    for data in workload:
+        image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+        detector.setInputSize((image.shape[1], image.shape[0]))
+        _, result = detector.detect(image)
+        faces += 0 if result is None else len(result)
+    return faces
+
+
+def run_pool(workload, pool):
+    def one(data):
+        image, original_size = decode_image(data, pool.max_side)
+        return len(pool.detect(image, 0.7, 0.3, 5000, original_size))
+
+    with ThreadPoolExecutor(max_workers=pool.workers) as executor:
+        return sum(executor.map(one, workload))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=60)
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--max-side", type=int, default=1280)
+    parser.add_argument("--bucket", type=int, default=64)
+    args = parser.parse_args()
+
+    check_rotated_jpeg(args.max_side)
+
+    workload = build_workload(args.images)
+    megapixels = sum(w * h for w, h in (PHOTO_SIZES[i % len(PHOTO_SIZES)] for i in range(args.images))) / 1e6
+    print(f"{len(workload)} JPEGs, sizes {PHOTO_SIZES}, {megapixels:.0f} MP total")
+
+    start = time.perf_counter()
+    legacy_faces = run_legacy(workload)
+    legacy_elapsed = time.perf_counter() - start
+    print(f"legacy: {len(workload) / legacy_elapsed:7.1f} images/s  ({legacy_faces} faces)")
+
+    pool = DetectorPool(create_detector, max_side=args.max_side, bucket=args.bucket, workers=args.workers)
+    run_pool(workload[:len(PHOTO_SIZES)], pool)  # warm one detector per bucket
+    start = time.perf_counter()
+    pool_faces = run_pool(workload, pool)
+    pool_elapsed = time.perf_counter() - start
+    print(
+        f"pool:   {len(workload) / pool_elapsed:7.1f} images/s  ({pool_faces} faces, "
+        f"{args.workers} workers, max_side {args.max_side}, buckets {pool.summary()['buckets']})"
+    )
+    print(f"speedup: {legacy_elapsed / pool_elapsed:.1f}x")
+    pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
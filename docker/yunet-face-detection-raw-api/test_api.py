@@ -3,6 +3,7 @@
 Test script for YuNet Face Detection API
 """
 
+import os
 import requests
 import base64
 import json
@@ -10,7 +11,7 @@ import sys
 from pathlib import Path
 
 # API base URL
-BASE_URL = "http://localhost:8001"
+BASE_URL = os.environ.get("BASE_URL", "http://localhost:8002")
 
 def test_health():
     """Test health endpoint"""
@@ -131,8 +132,9 @@ def main():
     if len(sys.argv) > 1:
         test_image = sys.argv[1]
     else:
-        # Look for a test image in the current directory
-        test_images = list(Path('.').glob('*.jpg')) + list(Path('.').glob('*.png'))
+        # Look for a test image in this service's test directory
+        test_dir = Path(__file__).resolve().parent / "test"
+        test_images = sorted(test_dir.glob('*.jpg')) + sorted(test_dir.glob('*.png'))
         if test_images:
             test_image = str(test_images[0])
             print(f"Using test image: {test_image}")
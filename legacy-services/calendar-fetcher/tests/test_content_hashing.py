@@ -3,7 +3,9 @@ Test content hashing for calendar events
 """
 
 from datetime import datetime
-from app.shared.deduplication import content_hasher
+import pytest
+
+from app.shared.deduplication import ContentHasher, content_hasher
 
 
 def test_calendar_hash_with_uid():
@@ -157,3 +159,51 @@ def test_calendar_hash_edge_cases():
     )
 
     assert len(hash3) == 64, "Hash should always be 64 characters (SHA-256)"
+
+
+def test_hash_many_matches_single_hashes():
+    """Test that batch hashing gives the same hashes, in order, as one call per record"""
+    events = [
+        {
+            "start_time": datetime(2024, 1, 1, 10, 0),
+            "end_time": datetime(2024, 1, 1, 11, 0),
+            "title": f"Meeting {i}",
+        }
+        for i in range(50)
+    ]
+    events.append({"uid": "unique-calendar-uid-123"})
+
+    expected = [content_hasher.generate_calendar_hash(**event) for event in events]
+
+    assert content_hasher.hash_many("calendar", events) == expected
+    assert content_hasher.hash_many("calendar", events * 100, workers=4) == expected * 100
+
+
+def test_hash_many_invalid_records():
+    """Test that invalid records raise, or give None with skip_invalid"""
+    events = [{"uid": "uid-1"}, {"title": "No times"}]
+
+    with pytest.raises(ValueError):
+        content_hasher.hash_many("calendar", events)
+
+    hashes = content_hasher.hash_many("calendar", events, skip_invalid=True)
+    assert hashes[0] == content_hasher.generate_calendar_hash(uid="uid-1")
+    assert hashes[1] is None
+
+    with pytest.raises(ValueError):
+        content_hasher.hash_many("unknown", events)
+
+
+def test_calendar_hash_v2_digest():
+    """Test that the BLAKE2b version is stable and never equal to the SHA-256 hash"""
+    hasher = ContentHasher("v2")
+
+    hash1 = hasher.generate_calendar_hash(uid="unique-calendar-uid-123")
+    hash2 = hasher.generate_calendar_hash(uid="unique-calendar-uid-123")
+
+    assert hash1 == hash2, "Same UID should produce same hash"
+    assert len(hash1) == 64, "v2 hashes should also be 64 characters"
+    assert hash1 != content_hasher.generate_calendar_hash(uid="unique-calendar-uid-123")
+
+    with pytest.raises(ValueError):
+        ContentHasher("v3")
@@ -2,11 +2,15 @@
 """Georegion detector that reads GPS data from database instead of Kafka."""
 
 import asyncio
+import json
 import os
 import sys
+import time
+from collections import defaultdict
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 
+import numpy as np
 import structlog
 
 # Add parent directory to path for common imports
@@ -15,8 +19,34 @@ sys.path.append(
 )
 from common.scheduled_db_consumer import ScheduledDatabaseConsumer
 
+from .region_index import RegionIndex
+
 logger = structlog.get_logger(__name__)
 
+# Grid cell size of the region index, in degrees
+REGION_CELL_DEGREES = float(os.getenv("GEOREGION_CELL_DEGREES", "0.05"))
+# How often to check the georegions table for changes
+REGION_RELOAD_SECONDS = float(os.getenv("GEOREGION_RELOAD_SECONDS", "30"))
+# location_georegion_detected columns, in the order _detect_events builds events
+EVENT_COLUMNS = ["device_id", "region_name", "event_type", "timestamp", "latitude", "longitude"]
+
+UPSERT_DEVICE_STATE_SQL = """
+    INSERT INTO georegion_device_state
+        (device_id, latitude, longitude, last_timestamp, regions, updated_at)
+    VALUES ($1, $2, $3, $4, $5::jsonb, NOW())
+    ON CONFLICT (device_id) DO UPDATE SET
+        latitude = EXCLUDED.latitude,
+        longitude = EXCLUDED.longitude,
+        last_timestamp = EXCLUDED.last_timestamp,
+        regions = EXCLUDED.regions,
+        updated_at = NOW()
+"""
+
+# Digest of the whole georegions table; changes on any insert, update or delete
+GEOREGIONS_VERSION_SQL = """
+    SELECT md5(coalesce(string_agg(g::text, ',' ORDER BY g.id), '')) FROM georegions g
+"""
+
 
 class GeoregionDetector(ScheduledDatabaseConsumer):
     """Detects when devices enter/exit predefined geographic regions."""
@@ -31,20 +61,24 @@ class GeoregionDetector(ScheduledDatabaseConsumer):
 
         # Load georegions from database
         self.georegions: List[Dict[str, Any]] = []
+        self.region_index = RegionIndex([], REGION_CELL_DEGREES)
+        self._georegions_version: Optional[str] = None
+        self._georegions_checked_at = 0.0
 
-        # Track last known location per device
+        # Track last known location per device (checkpointed in
+        # georegion_device_state and restored at startup)
         self.device_locations: Dict[str, Dict[str, Any]] = {}
 
     async def start(self):
         """Start the georegion detector."""
-        # Load georegions first
+        # Load georegions and device state first
         await self._load_georegions()
 
         # Start the consumer
         await super().start()
 
     async def _load_georegions(self):
-        """Load georegion definitions from database."""
+        """Create the tables this detector uses and load georegion definitions."""
         # Create temporary connection to load georegions
         import asyncpg
 
@@ -60,6 +94,7 @@ class GeoregionDetector(ScheduledDatabaseConsumer):
                     latitude DOUBLE PRECISION NOT NULL,
                     longitude DOUBLE PRECISION NOT NULL,
                     radius_meters DOUBLE PRECISION NOT NULL,
+                    boundary JSONB,
                     category TEXT,
                     metadata JSONB,
                     created_at TIMESTAMPTZ DEFAULT NOW(),
@@ -68,21 +103,96 @@ class GeoregionDetector(ScheduledDatabaseConsumer):
             """
             )
 
-            # Load all georegions
-            rows = await conn.fetch("SELECT * FROM georegions")
-            self.georegions = [dict(row) for row in rows]
+            # Polygon regions: GeoJSON geometry in lon/lat order
+            await conn.execute(
+                "ALTER TABLE georegions ADD COLUMN IF NOT EXISTS boundary JSONB"
+            )
+
+            # Per-device region state, checkpointed with each batch
+            await conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS georegion_device_state (
+                    device_id TEXT PRIMARY KEY,
+                    latitude DOUBLE PRECISION NOT NULL,
+                    longitude DOUBLE PRECISION NOT NULL,
+                    last_timestamp TIMESTAMPTZ NOT NULL,
+                    regions JSONB NOT NULL,
+                    updated_at TIMESTAMPTZ DEFAULT NOW()
+                )
+            """
+            )
 
-            logger.info("Loaded georegions", count=len(self.georegions))
+            # Event table, created here once rather than before every insert
+            await conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS location_georegion_detected (
+                    id SERIAL PRIMARY KEY,
+                    device_id TEXT NOT NULL,
+                    timestamp TIMESTAMPTZ NOT NULL,
+                    event_type TEXT NOT NULL,
+                    region_name TEXT NOT NULL,
+                    latitude DOUBLE PRECISION,
+                    longitude DOUBLE PRECISION,
+                    created_at TIMESTAMPTZ DEFAULT NOW()
+                )
+            """
+            )
 
             # Insert default georegions if none exist
-            if not self.georegions:
+            if not await conn.fetchval("SELECT EXISTS (SELECT 1 FROM georegions)"):
                 await self._insert_default_georegions(conn)
-                rows = await conn.fetch("SELECT * FROM georegions")
-                self.georegions = [dict(row) for row in rows]
+
+            await self._reload_georegions(conn)
+            await self._load_device_state(conn)
 
         finally:
             await conn.close()
 
+    async def _load_device_state(self, conn):
+        """Restore every device's regions from the last committed batch."""
+        rows = await conn.fetch(
+            "SELECT device_id, latitude, longitude, last_timestamp, regions FROM georegion_device_state"
+        )
+        for row in rows:
+            regions = json.loads(row["regions"])
+            self.device_locations[row["device_id"]] = {
+                "latitude": row["latitude"],
+                "longitude": row["longitude"],
+                "timestamp": row["last_timestamp"],
+                "in_regions": set(regions),
+                "entered_at": {
+                    name: datetime.fromisoformat(entered_at) for name, entered_at in regions.items()
+                },
+            }
+
+        logger.info("Loaded device region state", devices=len(rows))
+
+    async def _reload_georegions(self, conn):
+        """Rebuild the region index from the georegions table."""
+        version = await conn.fetchval(GEOREGIONS_VERSION_SQL)
+        rows = await conn.fetch("SELECT * FROM georegions")
+        self.georegions = [dict(row) for row in rows]
+        self.region_index = RegionIndex(self.georegions, REGION_CELL_DEGREES)
+        self._georegions_version = version
+        self._georegions_checked_at = time.monotonic()
+
+        logger.info(
+            "Loaded georegions",
+            count=len(self.georegions),
+            indexed=len(self.region_index),
+        )
+
+    async def _maybe_reload_georegions(self):
+        """Hot-reload georegions when the table has changed, at most every REGION_RELOAD_SECONDS."""
+        if time.monotonic() - self._georegions_checked_at < REGION_RELOAD_SECONDS:
+            return
+        self._georegions_checked_at = time.monotonic()
+
+        async with self.db_pool.acquire() as conn:
+            version = await conn.fetchval(GEOREGIONS_VERSION_SQL)
+            if version != self._georegions_version:
+                await self._reload_georegions(conn)
+
     async def _insert_default_georegions(self, conn):
         """Insert some default georegions for testing."""
         default_regions = [
@@ -119,133 +229,139 @@ class GeoregionDetector(ScheduledDatabaseConsumer):
 
     async def process_row(self, row: Dict[str, Any]):
         """Process a GPS reading and check for georegion events."""
-        device_id = row["device_id"]
-        latitude = row["latitude"]
-        longitude = row["longitude"]
-        timestamp = row["timestamp"]
-
-        # Get previous location for this device
-        previous_location = self.device_locations.get(device_id)
+        result = await self.process_batch([row])
+        async with self.db_pool.acquire() as conn:
+            async with conn.transaction():
+                await self.persist_batch(conn, result)
+        await self.batch_committed(result)
+
+    async def process_batch(self, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Detect events for a poll batch of GPS readings, one vectorized pass per
+        device. Nothing is written or remembered yet: the consumer passes the
+        result to persist_batch inside the transaction that advances its
+        watermark, then to batch_committed once that has committed.
+        """
+        await self._maybe_reload_georegions()
+
+        by_device: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for row in rows:
+            by_device[row["device_id"]].append(row)
+
+        events: List[Tuple[str, str, str, datetime, float, float]] = []
+        locations: Dict[str, Dict[str, Any]] = {}
+        for device_id, device_rows in by_device.items():
+            device_events, locations[device_id] = self._detect_events(device_id, device_rows)
+            events.extend(device_events)
+
+        return {"events": events, "device_locations": locations}
+
+    async def persist_batch(self, conn, result: Dict[str, Any]):
+        """
+        Write a batch's events in one COPY, and checkpoint the device state
+        they lead to, on the caller's connection and transaction.
+        """
+        events = result["events"]
+        if events:
+            await conn.copy_records_to_table(
+                "location_georegion_detected",
+                records=events,
+                columns=EVENT_COLUMNS,
+            )
 
-        # Update current location
-        current_location = {
-            "latitude": latitude,
-            "longitude": longitude,
-            "timestamp": timestamp,
-            "in_regions": set(),
-        }
+        locations = result["device_locations"]
+        if locations:
+            await conn.executemany(
+                UPSERT_DEVICE_STATE_SQL,
+                [
+                    (
+                        device_id,
+                        location["latitude"],
+                        location["longitude"],
+                        location["timestamp"],
+                        json.dumps(
+                            {
+                                name: entered_at.isoformat()
+                                for name, entered_at in location["entered_at"].items()
+                            }
+                        ),
+                    )
+                    for device_id, location in locations.items()
+                ],
+            )
 
-        # Check which regions the device is currently in
-        for region in self.georegions:
-            distance = self._calculate_distance(
-                latitude, longitude, region["latitude"], region["longitude"]
+        for device_id, region_name, event_type, *_ in events:
+            logger.info(
+                "Georegion event",
+                device_id=device_id,
+                region=region_name,
+                event_type=event_type,
             )
 
-            if distance <= region["radius_meters"]:
-                current_location["in_regions"].add(region["name"])
+    async def batch_committed(self, result: Dict[str, Any]):
+        """Adopt a batch's device locations once its events are durable."""
+        self.device_locations.update(result["device_locations"])
+
+    def _detect_events(
+        self, device_id: str, rows: List[Dict[str, Any]]
+    ) -> Tuple[List[Tuple[str, str, str, datetime, float, float]], Dict[str, Any]]:
+        """
+        Enter/exit events for one device's readings, as
+        (device_id, region_name, event_type, timestamp, latitude, longitude),
+        and the device's location after the last reading.
+        """
+        rows = sorted(rows, key=lambda row: row["timestamp"])
+        latitudes = np.array([row["latitude"] for row in rows], dtype=np.float64)
+        longitudes = np.array([row["longitude"] for row in rows], dtype=np.float64)
+        name_ids, inside = self.region_index.match(latitudes, longitudes)
+        names = [self.region_index.names[name_id] for name_id in name_ids]
+
+        # Get previous location for this device
+        previous_location = self.device_locations.get(device_id)
 
-        # Detect enter/exit events
         if previous_location:
             previous_regions = previous_location.get("in_regions", set())
-            current_regions = current_location["in_regions"]
-
-            # Regions entered
-            entered = current_regions - previous_regions
-            for region_name in entered:
-                await self._emit_georegion_event(
-                    device_id, region_name, "enter", timestamp, latitude, longitude
-                )
-
-            # Regions exited
-            exited = previous_regions - current_regions
-            for region_name in exited:
-                await self._emit_georegion_event(
-                    device_id, region_name, "exit", timestamp, latitude, longitude
-                )
-
-        # Store current location
-        self.device_locations[device_id] = current_location
-
-    async def _emit_georegion_event(
-        self,
-        device_id: str,
-        region_name: str,
-        event_type: str,
-        timestamp: datetime,
-        latitude: float,
-        longitude: float,
-    ):
-        """Emit a georegion enter/exit event."""
-        event = {
-            "device_id": device_id,
-            "timestamp": timestamp.isoformat(),
-            "event_type": event_type,  # "enter" or "exit"
-            "region_name": region_name,
-            "latitude": latitude,
-            "longitude": longitude,
-        }
-
-        # Log the event
-        logger.info(
-            "Georegion event",
-            device_id=device_id,
-            region=region_name,
-            event_type=event_type,
-        )
-
-        # Store in database
-        async with self.db_pool.acquire() as conn:
-            # Create table if it doesn't exist
-            await conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS location_georegion_detected (
-                    id SERIAL PRIMARY KEY,
-                    device_id TEXT NOT NULL,
-                    timestamp TIMESTAMPTZ NOT NULL,
-                    event_type TEXT NOT NULL,
-                    region_name TEXT NOT NULL,
-                    latitude DOUBLE PRECISION,
-                    longitude DOUBLE PRECISION,
-                    created_at TIMESTAMPTZ DEFAULT NOW()
+            # Regions the device was in but no point is near count as columns too
+            names += sorted(previous_regions - set(names))
+            inside = np.pad(inside, ((0, 0), (0, len(names) - inside.shape[1])))
+            previous = np.array([[name in previous_regions for name in names]], dtype=bool)
+        else:
+            # First reading for this device only sets the baseline
+            previous = inside[:1]
+        changes = np.diff(np.vstack([previous, inside]).astype(np.int8), axis=0)
+
+        # Per reading: regions entered, then regions exited
+        events = []
+        entered_at = dict(previous_location.get("entered_at", {})) if previous_location else {}
+        changed_rows, changed_columns = np.nonzero(changes)
+        order = np.lexsort((-changes[changed_rows, changed_columns], changed_rows))
+        for k in order:
+            i, column = changed_rows[k], changed_columns[k]
+            if changes[i, column] > 0:
+                entered_at[names[column]] = rows[i]["timestamp"]
+            events.append(
+                (
+                    device_id,
+                    names[column],
+                    "enter" if changes[i, column] > 0 else "exit",
+                    rows[i]["timestamp"],
+                    rows[i]["latitude"],
+                    rows[i]["longitude"],
                 )
-            """
-            )
-
-            # Insert event
-            await conn.execute(
-                """
-                INSERT INTO location_georegion_detected
-                (device_id, timestamp, event_type, region_name, latitude, longitude)
-                VALUES ($1, $2, $3, $4, $5, $6)
-                """,
-                device_id,
-                timestamp,
-                event_type,
-                region_name,
-                latitude,
-                longitude,
             )
 
-    def _calculate_distance(
-        self, lat1: float, lon1: float, lat2: float, lon2: float
-    ) -> float:
-        """Calculate distance between two points in meters using Haversine formula."""
-        from math import radians, sin, cos, sqrt, atan2
-
-        R = 6371000  # Earth's radius in meters
-
-        lat1_rad = radians(lat1)
-        lat2_rad = radians(lat2)
-        delta_lat = radians(lat2 - lat1)
-        delta_lon = radians(lon2 - lon1)
-
-        a = (
-            sin(delta_lat / 2) ** 2
-            + cos(lat1_rad) * cos(lat2_rad) * sin(delta_lon / 2) ** 2
-        )
-        c = 2 * atan2(sqrt(a), sqrt(1 - a))
-
-        return R * c
+        # Current location, with when each current region was entered (for dwell
+        # time); a device first seen inside a region counts from that reading
+        last = rows[-1]
+        in_regions = {name for name, now in zip(names, inside[-1]) if now}
+        location = {
+            "latitude": last["latitude"],
+            "longitude": last["longitude"],
+            "timestamp": last["timestamp"],
+            "in_regions": in_regions,
+            "entered_at": {name: entered_at.get(name, rows[0]["timestamp"]) for name in in_regions},
+        }
+        return events, location
 
 
 async def main():
@@ -0,0 +1,156 @@
+"""Grid index over georegions for vectorized point-in-region tests."""
+
+import json
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import shapely
+from shapely.geometry import shape
+
+EARTH_RADIUS_METERS = 6371000
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_METERS / 180.0
+
+
+def haversine_matrix(
+    latitudes: np.ndarray,
+    longitudes: np.ndarray,
+    region_latitudes: np.ndarray,
+    region_longitudes: np.ndarray,
+) -> np.ndarray:
+    """Distances in meters from n points to k centres, shape (n, k)."""
+    lat1 = np.radians(latitudes)[:, None]
+    lat2 = np.radians(region_latitudes)[None, :]
+    dlat = lat2 - lat1
+    dlon = np.radians(region_longitudes)[None, :] - np.radians(longitudes)[:, None]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class RegionIndex:
+    """
+    Circle and polygon georegions bucketed into a lat/lon grid.
+
+    Each region is registered in every cell its bounding box overlaps, so a
+    point can only be inside the regions listed for its cell. Membership for a
+    whole batch of points is one broadcast haversine over the candidate
+    circles plus one shapely.contains_xy call per candidate polygon (polygons
+    are prepared once, when the index is built). Results are per region
+    name, since that is what enter/exit events are keyed on.
+    """
+
+    def __init__(self, regions: List[Dict[str, Any]], cell_degrees: float = 0.05):
+        self.cell_degrees = cell_degrees
+        self._columns = int(math.ceil(360.0 / cell_degrees))
+        self.names: List[str] = []
+        name_ids: Dict[str, int] = {}
+
+        self._name_of: List[int] = []
+        self._latitudes: List[float] = []
+        self._longitudes: List[float] = []
+        self._radii: List[float] = []
+        self._polygons: List[Optional[Any]] = []
+        self._cells: Dict[Tuple[int, int], List[int]] = {}
+
+        for region in regions:
+            polygon = self._polygon(region.get("boundary"))
+            if polygon is None and not region.get("radius_meters"):
+                continue
+
+            if region["name"] not in name_ids:
+                name_ids[region["name"]] = len(self.names)
+                self.names.append(region["name"])
+            index = len(self._name_of)
+            self._name_of.append(name_ids[region["name"]])
+            self._latitudes.append(region["latitude"])
+            self._longitudes.append(region["longitude"])
+            self._radii.append(region.get("radius_meters") or 0.0)
+            self._polygons.append(polygon)
+
+            if polygon is not None:
+                min_lon, min_lat, max_lon, max_lat = polygon.bounds
+            else:
+                lat_delta = region["radius_meters"] / METERS_PER_DEGREE
+                widest = math.cos(math.radians(min(90.0, abs(region["latitude"]) + lat_delta)))
+                lon_delta = 180.0 if widest < 1e-9 else min(180.0, lat_delta / widest)
+                min_lat, max_lat = region["latitude"] - lat_delta, region["latitude"] + lat_delta
+                min_lon, max_lon = region["longitude"] - lon_delta, region["longitude"] + lon_delta
+            for cell in self._cells_in_box(min_lat, min_lon, max_lat, max_lon):
+                self._cells.setdefault(cell, []).append(index)
+
+        self._latitude_array = np.array(self._latitudes, dtype=np.float64)
+        self._longitude_array = np.array(self._longitudes, dtype=np.float64)
+        self._radius_array = np.array(self._radii, dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self._name_of)
+
+    @staticmethod
+    def _polygon(boundary: Any) -> Optional[Any]:
+        """Prepared shapely geometry from a GeoJSON boundary, if the region has one."""
+        if not boundary:
+            return None
+        if isinstance(boundary, str):
+            boundary = json.loads(boundary)
+        geometry = shape(boundary)
+        shapely.prepare(geometry)
+        return geometry
+
+    def _cell_rows(self, latitudes: np.ndarray) -> np.ndarray:
+        return np.floor((np.clip(latitudes, -90.0, 90.0) + 90.0) / self.cell_degrees).astype(np.int64)
+
+    def _cell_columns(self, longitudes: np.ndarray) -> np.ndarray:
+        return np.floor((longitudes + 180.0) / self.cell_degrees).astype(np.int64) % self._columns
+
+    def _cells_in_box(
+        self, min_lat: float, min_lon: float, max_lat: float, max_lon: float
+    ) -> List[Tuple[int, int]]:
+        rows = range(
+            int(self._cell_rows(np.array([min_lat]))[0]), int(self._cell_rows(np.array([max_lat]))[0]) + 1
+        )
+        first = int(math.floor((min_lon + 180.0) / self.cell_degrees))
+        last = int(math.floor((max_lon + 180.0) / self.cell_degrees))
+        if last - first + 1 >= self._columns:
+            columns = range(self._columns)
+        else:
+            columns = [column % self._columns for column in range(first, last + 1)]
+        return [(row, column) for row in rows for column in columns]
+
+    def candidates(self, latitudes: np.ndarray, longitudes: np.ndarray) -> List[int]:
+        """Regions registered in any cell the points fall in."""
+        cells = set(zip(self._cell_rows(latitudes).tolist(), self._cell_columns(longitudes).tolist()))
+        found = set()
+        for cell in cells:
+            found.update(self._cells.get(cell, ()))
+        return sorted(found)
+
+    def match(
+        self, latitudes: np.ndarray, longitudes: np.ndarray
+    ) -> Tuple[List[int], np.ndarray]:
+        """
+        (name ids, inside) where inside[i, j] says whether point i lies in any
+        region named self.names[name_ids[j]]; names not listed contain no point.
+        """
+        regions = self.candidates(latitudes, longitudes)
+        name_ids = sorted({self._name_of[region] for region in regions})
+        inside = np.zeros((len(latitudes), len(name_ids)), dtype=bool)
+        if not regions:
+            return name_ids, inside
+        column_of = {name_id: column for column, name_id in enumerate(name_ids)}
+
+        circles = [region for region in regions if self._polygons[region] is None]
+        if circles:
+            within = haversine_matrix(
+                latitudes, longitudes, self._latitude_array[circles], self._longitude_array[circles]
+            ) <= self._radius_array[circles]
+            for j, region in enumerate(circles):
+                inside[:, column_of[self._name_of[region]]] |= within[:, j]
+
+        for region in regions:
+            polygon = self._polygons[region]
+            if polygon is not None:
+                inside[:, column_of[self._name_of[region]]] |= shapely.contains_xy(
+                    polygon, longitudes, latitudes
+                )
+
+        return name_ids, inside
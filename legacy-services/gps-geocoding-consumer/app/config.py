@@ -17,10 +17,26 @@ class Settings(BaseSettings):
     opencage_api_key: str = ""
     opencage_rate_limit: float = 1.0  # requests per second
     opencage_daily_limit: int = 2500  # requests per day
+    opencage_burst: int = 1  # requests allowed back to back before the rate applies
+    opencage_concurrency: int = 4  # OpenCage requests in flight at once (async consumer)
+    street_level_geocoding: bool = False  # Ask OpenCage even where the gazetteer has an answer
+
+    # Offline Gazetteer (GeoNames dumps); empty path = OpenCage only
+    gazetteer_cities_path: str = ""  # cities500.txt / cities1000.txt / cities15000.txt
+    gazetteer_admin1_path: str = ""  # admin1CodesASCII.txt, for state names
+    gazetteer_countries_path: str = ""  # countryInfo.txt, for country names
+    gazetteer_min_population: int = 0  # Skip smaller places
+    gazetteer_max_distance_meters: float = 50000.0  # No answer beyond this distance from a place
 
     # Geocoding Configuration
     min_distance_meters: float = 10.0  # Minimum distance to consider a new location
     cache_radius_meters: float = 10.0  # Radius to search for cached locations
+    cache_index_cell_meters: float = 100.0  # Grid cell size of the in-memory cache index
+    geocoding_batch_size: int = 500  # Messages per getmany batch (async consumer)
+    cache_usage_flush_seconds: float = 30.0  # How often cache hit counts are written back
+    stay_radius_meters: float = 50.0  # Fixes within this distance of a stay's first fix belong to it
+    stay_min_duration_seconds: float = 300.0  # Dwell needed before a stay is geocoded
+    stay_max_commit_lag: int = 10000  # Messages a partition's commit may trail its position by for buffered fixes
 
     # Service Configuration
     host: str = "0.0.0.0"
@@ -27,6 +27,10 @@ class GPSGeocodingConsumer(ConsumerActivityLogger):
         # Initialize services
         self.geocoding_service = GeocodingService()
 
+        # Build the in-memory cache index before the first message arrives
+        with self.SessionLocal() as session:
+            self.geocoding_service.load_cache_index(session)
+
         # Initialize Kafka
         self.consumer = None
         self.producer = None
@@ -207,6 +211,9 @@ class GPSGeocodingConsumer(ConsumerActivityLogger):
 
     def cleanup(self):
         """Clean up resources"""
+        # Write back cache usage still held in memory
+        with self.SessionLocal() as session:
+            self.geocoding_service.flush_usage(session)
         if self.consumer:
             self.consumer.close()
         if self.producer:
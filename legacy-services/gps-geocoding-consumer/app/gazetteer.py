@@ -0,0 +1,228 @@
+"""Offline reverse geocoding against a GeoNames-style gazetteer"""
+
+import math
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import structlog
+
+from .spatial_index import EARTH_RADIUS_METERS
+
+logger = structlog.get_logger()
+
+# Points per leaf; below this a linear scan beats descending further
+LEAF_SIZE = 8
+
+
+def _unit_vectors(latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    lat = np.radians(latitudes)
+    lon = np.radians(longitudes)
+    return np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+
+
+class KDTree:
+    """
+    Static 3-d tree over points on the unit sphere, stored implicitly
+
+    Points are reordered in place so every node is the median of its slice
+    of the array, and the split axis of each node is kept in a parallel
+    array; there are no node objects. Nearest neighbour by chord length is
+    nearest by great-circle distance, so there is no antimeridian or pole
+    special-casing.
+    """
+
+    def __init__(self, latitudes: np.ndarray, longitudes: np.ndarray):
+        self.points = _unit_vectors(latitudes, longitudes)
+        self.order = np.arange(len(self.points))
+        self.axes = np.zeros(len(self.points), dtype=np.int8)
+        self._build(0, len(self.points))
+        self._points = [tuple(point) for point in self.points.tolist()]
+        self._axes = self.axes.tolist()
+        self._order = self.order.tolist()
+
+    def _build(self, lo: int, hi: int):
+        stack = [(lo, hi)]
+        while stack:
+            lo, hi = stack.pop()
+            if hi - lo <= LEAF_SIZE:
+                continue
+            block = self.points[lo:hi]
+            axis = int(np.argmax(block.max(axis=0) - block.min(axis=0)))
+            mid = (lo + hi) // 2
+            partition = np.argpartition(block[:, axis], mid - lo)
+            self.points[lo:hi] = block[partition]
+            self.order[lo:hi] = self.order[lo:hi][partition]
+            self.axes[mid] = axis
+            stack.append((lo, mid))
+            stack.append((mid + 1, hi))
+
+    def nearest(self, latitude: float, longitude: float) -> Tuple[int, float]:
+        """(original index, great-circle meters) of the closest point"""
+        lat, lon = math.radians(latitude), math.radians(longitude)
+        query = (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+        qx, qy, qz = query
+        points, axes = self._points, self._axes
+        best_index, best_distance = -1, math.inf
+        stack = [(0, len(points), 0.0)]
+        # Plain floats: per-node numpy calls would cost more than the arithmetic
+        while stack:
+            lo, hi, bound = stack.pop()
+            if bound >= best_distance:
+                continue  # The split plane is already farther than the best match
+            if hi - lo <= LEAF_SIZE:
+                for i in range(lo, hi):
+                    x, y, z = points[i]
+                    distance = (x - qx) ** 2 + (y - qy) ** 2 + (z - qz) ** 2
+                    if distance < best_distance:
+                        best_index, best_distance = i, distance
+                continue
+
+            mid = (lo + hi) // 2
+            x, y, z = point = points[mid]
+            distance = (x - qx) ** 2 + (y - qy) ** 2 + (z - qz) ** 2
+            if distance < best_distance:
+                best_index, best_distance = mid, distance
+
+            axis = axes[mid]
+            delta = query[axis] - point[axis]
+            if delta < 0:
+                stack.append((mid + 1, hi, delta * delta))
+                stack.append((lo, mid, bound))
+            else:
+                stack.append((lo, mid, delta * delta))
+                stack.append((mid + 1, hi, bound))
+
+        chord = math.sqrt(best_distance)
+        return self._order[best_index], 2 * EARTH_RADIUS_METERS * math.asin(min(1.0, chord / 2))
+
+
+def _read_names(path: Optional[str], key_column: int, name_column: int) -> Dict[str, str]:
+    names: Dict[str, str] = {}
+    if not path:
+        return names
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("#"):
+                continue
+            columns = line.rstrip("\n").split("\t")
+            if len(columns) > max(key_column, name_column):
+                names[columns[key_column]] = columns[name_column]
+    return names
+
+
+class Gazetteer:
+    """
+    Populated places with their admin region and country names
+
+    Reads the GeoNames dump format: a cities file (cities500.txt ...
+    cities15000.txt, or allCountries.txt filtered to feature class P), and
+    optionally admin1CodesASCII.txt and countryInfo.txt to turn codes into
+    names. Coordinates live in a KDTree; names in flat lists indexed by the
+    same row.
+    """
+
+    def __init__(
+        self,
+        latitudes: np.ndarray,
+        longitudes: np.ndarray,
+        cities: List[str],
+        states: List[Optional[str]],
+        countries: List[Optional[str]],
+        max_distance_meters: float = 50000.0,
+    ):
+        self.cities = cities
+        self.states = states
+        self.countries = countries
+        self.max_distance_meters = max_distance_meters
+        self.tree = KDTree(latitudes, longitudes)
+
+    def __len__(self) -> int:
+        return len(self.cities)
+
+    @classmethod
+    def from_geonames(
+        cls,
+        cities_path: str,
+        admin1_path: Optional[str] = None,
+        countries_path: Optional[str] = None,
+        min_population: int = 0,
+        max_distance_meters: float = 50000.0,
+    ) -> "Gazetteer":
+        admin1 = _read_names(admin1_path, 0, 1)
+        country_names = _read_names(countries_path, 0, 4)
+
+        latitudes: List[float] = []
+        longitudes: List[float] = []
+        cities: List[str] = []
+        states: List[Optional[str]] = []
+        countries: List[Optional[str]] = []
+        with open(cities_path, encoding="utf-8") as f:
+            for line in f:
+                columns = line.rstrip("\n").split("\t")
+                if len(columns) < 15 or columns[6] != "P":
+                    continue
+                if min_population and int(columns[14] or 0) < min_population:
+                    continue
+                country_code, admin1_code = columns[8], columns[10]
+                latitudes.append(float(columns[4]))
+                longitudes.append(float(columns[5]))
+                cities.append(columns[1])
+                states.append(admin1.get(f"{country_code}.{admin1_code}"))
+                countries.append(country_names.get(country_code, country_code or None))
+
+        if not cities:
+            raise ValueError(f"No populated places found in {cities_path}")
+
+        return cls(
+            np.array(latitudes),
+            np.array(longitudes),
+            cities,
+            states,
+            countries,
+            max_distance_meters=max_distance_meters,
+        )
+
+    def reverse(self, latitude: float, longitude: float) -> Optional[Dict[str, Any]]:
+        """Nearest place within max_distance_meters, in the geocoded result shape"""
+        index, distance = self.tree.nearest(latitude, longitude)
+        if distance > self.max_distance_meters:
+            return None
+
+        city, state, country = self.cities[index], self.states[index], self.countries[index]
+        return {
+            "address": ", ".join(part for part in (city, state, country) if part),
+            "city": city,
+            "state": state,
+            "country": country,
+            "postal_code": None,
+            "place_name": None,
+            "place_type": "city",
+            "provider": "gazetteer",
+            "cached": False,
+            "distance_meters": round(distance, 1),
+        }
+
+
+def load_gazetteer(settings: Any) -> Optional[Gazetteer]:
+    """The configured gazetteer, or None when no cities file is set or it cannot be read"""
+    if not settings.gazetteer_cities_path:
+        return None
+    if not os.path.exists(settings.gazetteer_cities_path):
+        logger.warning("Gazetteer file not found", path=settings.gazetteer_cities_path)
+        return None
+
+    try:
+        gazetteer = Gazetteer.from_geonames(
+            settings.gazetteer_cities_path,
+            admin1_path=settings.gazetteer_admin1_path or None,
+            countries_path=settings.gazetteer_countries_path or None,
+            min_population=settings.gazetteer_min_population,
+            max_distance_meters=settings.gazetteer_max_distance_meters,
+        )
+    except Exception as e:
+        logger.error("Failed to load gazetteer", error=str(e))
+        return None
+
+    logger.info("Loaded gazetteer", places=len(gazetteer), path=settings.gazetteer_cities_path)
+    return gazetteer
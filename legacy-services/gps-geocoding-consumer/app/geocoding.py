@@ -1,19 +1,47 @@
-"""Geocoding service with caching and rate limiting"""
+"""Geocoding service with caching, an offline gazetteer and optional OpenCage"""
 
 import time
-from typing import Optional, Dict, Any
-from datetime import datetime
-from geopy.distance import distance as geopy_distance
+from typing import Optional, Dict, Any, Tuple
+from datetime import datetime, timezone
+import numpy as np
 from opencage.geocoder import OpenCageGeocode
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import text
 import structlog
 
 from .models import CachedGeocoding
 from .config import settings
+from .gazetteer import load_gazetteer
+from .spatial_index import GeoGridIndex, haversine_meters
 
 logger = structlog.get_logger()
 
+# Cached fields kept in the in-memory index alongside each point
+CACHE_FIELDS = (
+    "geocoded_address",
+    "city",
+    "state",
+    "country",
+    "postal_code",
+    "place_name",
+    "place_type",
+)
+
+# Applies every pending cache hit in one statement, whatever the number of rows
+FLUSH_USAGE_SQL = text(
+    """
+    UPDATE cached_geocoding AS c
+    SET use_count = c.use_count + u.hits,
+        last_used_at = GREATEST(c.last_used_at, u.last_used_at)
+    FROM unnest(
+        CAST(:ids AS BIGINT[]),
+        CAST(:hits AS INTEGER[]),
+        CAST(:last_used_at AS TIMESTAMPTZ[])
+    ) AS u(id, hits, last_used_at)
+    WHERE c.id = u.id
+    """
+)
+
 
 class GeocodingService:
     def __init__(self):
@@ -27,6 +55,35 @@ class GeocodingService:
         self.daily_reset = datetime.utcnow().date()
         self.first_point_processed = False
 
+        # City/state/country without the network; None when not configured
+        self.gazetteer = load_gazetteer(settings)
+
+        # Every cached point, so lookups never scan cached_geocoding
+        self.cache_index = GeoGridIndex(settings.cache_index_cell_meters)
+        self.cache_index_loaded = False
+
+        # Cache hits not yet written back: cache_id -> [hits, last_used_at]
+        self.pending_usage: Dict[int, list] = {}
+        self.last_usage_flush = time.monotonic()
+
+    def load_cache_index(self, session: Session):
+        """Build the spatial index from cached_geocoding (once, at startup)"""
+        columns = [getattr(CachedGeocoding, field) for field in CACHE_FIELDS]
+        rows = session.query(
+            CachedGeocoding.id,
+            CachedGeocoding.latitude,
+            CachedGeocoding.longitude,
+            *columns,
+        ).yield_per(10000)
+
+        for row in rows:
+            self.cache_index.insert(
+                row.id, row.latitude, row.longitude, dict(zip(CACHE_FIELDS, row[3:]))
+            )
+
+        self.cache_index_loaded = True
+        logger.info("Loaded geocoding cache index", cached_points=len(self.cache_index))
+
     def _reset_daily_counter_if_needed(self):
         """Reset daily call counter if it's a new day"""
         today = datetime.utcnow().date()
@@ -35,103 +92,196 @@ class GeocodingService:
             self.daily_reset = today
             logger.info("Reset daily API call counter", date=str(today))
 
-    def _enforce_rate_limit(self):
-        """Enforce 1 request per second rate limit"""
-        now = time.time()
-        time_since_last = now - self.last_api_call
-        if time_since_last < settings.opencage_rate_limit:
-            sleep_time = settings.opencage_rate_limit - time_since_last
-            logger.debug("Rate limiting", sleep_seconds=sleep_time)
-            time.sleep(sleep_time)
-        self.last_api_call = time.time()
+    def _within_rate_limit(self) -> bool:
+        """Whether an API call now stays under opencage_rate_limit; never sleeps"""
+        if settings.opencage_rate_limit <= 0:
+            return True
+        return time.time() - self.last_api_call >= 1.0 / settings.opencage_rate_limit
 
     def _can_make_api_call(self) -> bool:
         """Check if we can make an API call within limits"""
         self._reset_daily_counter_if_needed()
         return self.daily_calls < settings.opencage_daily_limit
 
+    def lookup_local(self, latitude: float, longitude: float) -> Optional[Dict[str, Any]]:
+        """City-level result from the gazetteer, or None without one or out of its range"""
+        if not self.gazetteer:
+            return None
+        return self.gazetteer.reverse(latitude, longitude)
+
+    def wants_api(self, local: Optional[Dict[str, Any]]) -> bool:
+        """
+        Whether to ask OpenCage after the gazetteer: always for street-level
+        detail, otherwise only where the gazetteer has no answer
+        """
+        if not self.geocoder:
+            return False
+        return local is None or settings.street_level_geocoding
+
     def _calculate_distance(
         self, lat1: float, lon1: float, lat2: float, lon2: float
     ) -> float:
         """Calculate distance between two points in meters"""
-        return geopy_distance((lat1, lon1), (lat2, lon2)).meters
+        return float(haversine_meters(lat1, lon1, np.array([lat2]), np.array([lon2]))[0])
 
     def _find_cached_location(
-        self, session: Session, latitude: float, longitude: float
-    ) -> Optional[CachedGeocoding]:
-        """Find a cached location within the cache radius"""
-        # Simple bounding box search (approximation)
-        # 1 degree latitude ≈ 111 km
-        # 1 degree longitude varies by latitude, but we'll use a simple approximation
-        lat_delta = settings.cache_radius_meters / 111000.0
-        lon_delta = settings.cache_radius_meters / (
-            111000.0 * abs(latitude + 0.001)
-        )  # Avoid division by zero
-
-        cached_locations = (
-            session.query(CachedGeocoding)
-            .filter(
-                and_(
-                    CachedGeocoding.latitude.between(
-                        latitude - lat_delta, latitude + lat_delta
-                    ),
-                    CachedGeocoding.longitude.between(
-                        longitude - lon_delta, longitude + lon_delta
-                    ),
-                )
-            )
-            .all()
+        self, latitude: float, longitude: float
+    ) -> Optional[Tuple[int, float, Dict[str, Any]]]:
+        """Find the closest cached location within the cache radius"""
+        closest = self.cache_index.nearest(
+            latitude, longitude, settings.cache_radius_meters
         )
 
-        # Find the closest one within cache radius
-        closest = None
-        min_distance = float("inf")
-
-        for location in cached_locations:
-            dist = self._calculate_distance(
-                latitude, longitude, location.latitude, location.longitude
-            )
-            if dist <= settings.cache_radius_meters and dist < min_distance:
-                min_distance = dist
-                closest = location
-
         if closest:
             logger.debug(
                 "Found cached location",
-                distance_meters=min_distance,
-                cached_id=closest.id,
+                distance_meters=closest[1],
+                cached_id=closest[0],
             )
 
         return closest
 
-    def _should_process_location(
-        self, session: Session, latitude: float, longitude: float
-    ) -> bool:
+    def lookup_cached(
+        self, latitude: float, longitude: float
+    ) -> Optional[Dict[str, Any]]:
+        """Geocoded result of the closest cached location in the cache radius, without DB access"""
+        cached = self._find_cached_location(latitude, longitude)
+        if not cached:
+            return None
+
+        cache_id, _, entry = cached
+        return {
+            "address": entry["geocoded_address"],
+            "city": entry["city"],
+            "state": entry["state"],
+            "country": entry["country"],
+            "postal_code": entry["postal_code"],
+            "place_name": entry["place_name"],
+            "place_type": entry["place_type"],
+            "provider": "opencage",
+            "cached": True,
+            "cache_id": cache_id,
+        }
+
+    def parse_result(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Geocoded fields from one OpenCage result"""
+        components = result.get("components", {})
+        return {
+            "address": result.get("formatted"),
+            "city": components.get("city")
+            or components.get("town")
+            or components.get("village"),
+            "state": components.get("state") or components.get("province"),
+            "country": components.get("country"),
+            "postal_code": components.get("postcode"),
+            "place_name": components.get("neighbourhood") or components.get("suburb"),
+            "place_type": components.get("_type"),
+            "provider": "opencage",
+            "cached": False,
+        }
+
+    def cache_values(
+        self,
+        latitude: float,
+        longitude: float,
+        geocoded_data: Dict[str, Any],
+        raw_response: Dict[str, Any],
+    ) -> Dict[str, Any]:
+        """Column values of the cached_geocoding row for a fresh result"""
+        return {
+            "latitude": latitude,
+            "longitude": longitude,
+            "geocoded_address": geocoded_data["address"],
+            "city": geocoded_data["city"],
+            "state": geocoded_data["state"],
+            "country": geocoded_data["country"],
+            "postal_code": geocoded_data["postal_code"],
+            "place_name": geocoded_data["place_name"],
+            "place_type": geocoded_data["place_type"],
+            "raw_response": raw_response,
+        }
+
+    def index_cached(self, cache_id: int, values: Dict[str, Any]):
+        """Add a stored cached_geocoding row (as cache_values) to the index"""
+        self.cache_index.insert(
+            cache_id,
+            values["latitude"],
+            values["longitude"],
+            {field: values[field] for field in CACHE_FIELDS},
+        )
+
+    def record_use(self, cache_id: int, hits: int = 1):
+        """Count cache hits in memory; flush_usage writes them back"""
+        used_at = datetime.now(timezone.utc)
+        entry = self.pending_usage.get(cache_id)
+        if entry:
+            entry[0] += hits
+            entry[1] = used_at
+        else:
+            self.pending_usage[cache_id] = [hits, used_at]
+
+    def usage_flush_due(self) -> bool:
+        return bool(self.pending_usage) and (
+            time.monotonic() - self.last_usage_flush >= settings.cache_usage_flush_seconds
+        )
+
+    def take_usage(self) -> Optional[Dict[str, list]]:
+        """Parameters for FLUSH_USAGE_SQL covering every pending hit, which are cleared"""
+        self.last_usage_flush = time.monotonic()
+        if not self.pending_usage:
+            return None
+        pending, self.pending_usage = self.pending_usage, {}
+        return {
+            "ids": list(pending),
+            "hits": [entry[0] for entry in pending.values()],
+            "last_used_at": [entry[1] for entry in pending.values()],
+        }
+
+    def restore_usage(self, params: Dict[str, list]):
+        """Put back hits from a flush that failed, merging with any recorded since"""
+        for cache_id, hits, used_at in zip(params["ids"], params["hits"], params["last_used_at"]):
+            entry = self.pending_usage.get(cache_id)
+            if entry:
+                entry[0] += hits
+            else:
+                self.pending_usage[cache_id] = [hits, used_at]
+
+    def flush_usage(self, session: Session):
+        """Write back pending cache hits in one bulk UPDATE"""
+        params = self.take_usage()
+        if not params:
+            return
+        try:
+            session.execute(FLUSH_USAGE_SQL, params)
+            session.commit()
+            logger.debug("Flushed cache usage", rows=len(params["ids"]))
+        except Exception as e:
+            session.rollback()
+            self.restore_usage(params)
+            logger.error("Failed to flush cache usage", error=str(e))
+
+    def _should_process_location(self, latitude: float, longitude: float) -> bool:
         """Determine if we should process this location"""
         # Always process the first point after startup
         if not self.first_point_processed:
             logger.info("Processing first GPS point after startup")
             return True
 
-        # Find all cached locations to check distance
-        all_cached = session.query(CachedGeocoding).all()
-
-        if not all_cached:
+        if not len(self.cache_index):
             logger.info("No cached locations found, processing new point")
             return True
 
         # Check if this point is significantly far from all cached points
-        for cached in all_cached:
-            dist = self._calculate_distance(
-                latitude, longitude, cached.latitude, cached.longitude
+        closest = self.cache_index.nearest(
+            latitude, longitude, settings.min_distance_meters
+        )
+        if closest:
+            logger.debug(
+                "Location too close to cached point",
+                distance_meters=closest[1],
+                min_required=settings.min_distance_meters,
             )
-            if dist <= settings.min_distance_meters:
-                logger.debug(
-                    "Location too close to cached point",
-                    distance_meters=dist,
-                    min_required=settings.min_distance_meters,
-                )
-                return False
+            return False
 
         logger.info("Location is far enough from all cached points, processing")
         return True
@@ -140,43 +290,41 @@ class GeocodingService:
         self, session: Session, latitude: float, longitude: float
     ) -> Optional[Dict[str, Any]]:
         """Geocode a location with caching"""
+        if not self.cache_index_loaded:
+            self.load_cache_index(session)
+
         # Check cache first
-        cached = self._find_cached_location(session, latitude, longitude)
+        cached = self.lookup_cached(latitude, longitude)
         if cached:
-            # Update usage stats
-            cached.last_used_at = datetime.utcnow()
-            cached.use_count += 1
-            session.commit()
+            cache_id = cached["cache_id"]
 
-            logger.info(
-                "Using cached geocoding result",
-                cached_id=cached.id,
-                use_count=cached.use_count,
-            )
+            # Usage stats are written behind, in bulk
+            self.record_use(cache_id)
+            if self.usage_flush_due():
+                self.flush_usage(session)
+
+            logger.info("Using cached geocoding result", cached_id=cache_id)
 
             self.first_point_processed = True
-            return {
-                "address": cached.geocoded_address,
-                "city": cached.city,
-                "state": cached.state,
-                "country": cached.country,
-                "postal_code": cached.postal_code,
-                "place_name": cached.place_name,
-                "place_type": cached.place_type,
-                "provider": "opencage",
-                "cached": True,
-                "cache_id": cached.id,
-            }
+            return cached
+
+        # Gazetteer answers city-level lookups without the network
+        local = self.lookup_local(latitude, longitude)
+        if not self.wants_api(local):
+            if not local and not self.geocoder:
+                logger.warning("No gazetteer match and OpenCage API key not configured")
+            self.first_point_processed = True
+            return local
 
         # Check if we should process this location
-        if not self._should_process_location(session, latitude, longitude):
+        if not self._should_process_location(latitude, longitude):
             logger.debug(
                 "Skipping geocoding for location",
                 latitude=latitude,
                 longitude=longitude,
             )
             self.first_point_processed = True
-            return None
+            return local
 
         # Check API limits
         if not self._can_make_api_call():
@@ -185,15 +333,15 @@ class GeocodingService:
                 daily_calls=self.daily_calls,
                 daily_limit=settings.opencage_daily_limit,
             )
-            return None
+            return local
 
-        # No cache hit and we should process - make API call
-        if not self.geocoder:
-            logger.warning("OpenCage API key not configured")
-            return None
+        # Over the request rate: answer locally rather than block the consumer
+        if not self._within_rate_limit():
+            logger.debug("Rate limited, using gazetteer result", latitude=latitude, longitude=longitude)
+            return local
 
         try:
-            self._enforce_rate_limit()
+            self.last_api_call = time.time()
 
             logger.info(
                 "Making OpenCage API call", latitude=latitude, longitude=longitude
@@ -205,44 +353,20 @@ class GeocodingService:
 
             if not results:
                 logger.warning("No geocoding results returned")
-                return None
+                return local
 
             result = results[0]
-            components = result.get("components", {})
-
-            # Extract relevant fields
-            geocoded_data = {
-                "address": result.get("formatted"),
-                "city": components.get("city")
-                or components.get("town")
-                or components.get("village"),
-                "state": components.get("state") or components.get("province"),
-                "country": components.get("country"),
-                "postal_code": components.get("postcode"),
-                "place_name": components.get("neighbourhood")
-                or components.get("suburb"),
-                "place_type": components.get("_type"),
-                "provider": "opencage",
-                "cached": False,
-            }
+            geocoded_data = self.parse_result(result)
 
             # Save to cache
-            cached_location = CachedGeocoding(
-                latitude=latitude,
-                longitude=longitude,
-                geocoded_address=geocoded_data["address"],
-                city=geocoded_data["city"],
-                state=geocoded_data["state"],
-                country=geocoded_data["country"],
-                postal_code=geocoded_data["postal_code"],
-                place_name=geocoded_data["place_name"],
-                place_type=geocoded_data["place_type"],
-                raw_response=result,
-            )
+            values = self.cache_values(latitude, longitude, geocoded_data, result)
+            cached_location = CachedGeocoding(**values)
 
             session.add(cached_location)
             session.commit()
 
+            self.index_cached(cached_location.id, values)
+
             logger.info(
                 "Geocoded and cached location",
                 address=geocoded_data["address"],
@@ -255,4 +379,5 @@ class GeocodingService:
 
         except Exception as e:
             logger.error("Geocoding error", error=str(e))
-            return None
+            session.rollback()
+            return local
@@ -1,7 +1,7 @@
 """Main entry point for GPS geocoding consumer"""
+import asyncio
 import signal
 import sys
-import threading
 from contextlib import asynccontextmanager
 import uvicorn
 from fastapi import FastAPI
@@ -10,7 +10,7 @@ from fastapi.responses import PlainTextResponse
 import structlog
 
 from .config import settings
-from .consumer import GPSGeocodingConsumer
+from .async_consumer import AsyncGPSGeocodingConsumer
 
 # Configure structured logging
 structlog.configure(
@@ -41,29 +41,28 @@ processing_duration = Histogram('gps_processing_duration_seconds', 'Time spent p
 
 # Global consumer instance
 consumer = None
-consumer_thread = None
+consumer_task = None
 
 
-def run_consumer():
-    """Run the Kafka consumer in a separate thread"""
+async def run_consumer():
+    """Run the batched Kafka consumer on the server's event loop"""
     global consumer
-    print("DEBUG: run_consumer() called", file=sys.stderr)
     logger.info("run_consumer() called")
+    consumer = AsyncGPSGeocodingConsumer()
     try:
-        print("DEBUG: Creating GPSGeocodingConsumer", file=sys.stderr)
-        consumer = GPSGeocodingConsumer()
-        print("DEBUG: Starting consumer", file=sys.stderr)
-        consumer.start()
+        await consumer.start()
+        await consumer.consume()
     except Exception as e:
-        print(f"DEBUG: Consumer failed: {e}", file=sys.stderr)
         logger.error("Consumer failed", error=str(e))
-        sys.exit(1)
+        raise
+    finally:
+        await consumer.stop()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage application lifecycle"""
-    global consumer_thread
+    global consumer_task
     
     # Startup
     print("DEBUG: lifespan startup called", file=sys.stderr)
@@ -72,19 +71,18 @@ async def lifespan(app: FastAPI):
                 input_topic=settings.kafka_input_topic,
                 output_topic=settings.kafka_output_topic)
     
-    # Start consumer in background thread
-    print("DEBUG: Creating consumer thread", file=sys.stderr)
-    consumer_thread = threading.Thread(target=run_consumer, daemon=True)
-    print("DEBUG: Starting consumer thread", file=sys.stderr)
-    consumer_thread.start()
-    print(f"DEBUG: Consumer thread started, is_alive={consumer_thread.is_alive()}", file=sys.stderr)
+    # Start consumer as a background task
+    consumer_task = asyncio.create_task(run_consumer())
     
     yield
     
     # Shutdown
     logger.info("Shutting down GPS geocoding consumer")
-    if consumer:
-        consumer.cleanup()
+    consumer_task.cancel()
+    try:
+        await consumer_task
+    except (asyncio.CancelledError, Exception):
+        pass
 
 
 # Create FastAPI app for health checks and metrics
@@ -104,8 +102,8 @@ async def healthz():
 @app.get("/readyz")
 async def readyz():
     """Readiness probe"""
-    # Check if consumer thread is alive
-    if consumer_thread and consumer_thread.is_alive():
+    # Check if consumer task is still running
+    if consumer_task and not consumer_task.done():
         return {"status": "ready"}
     return {"status": "not ready"}, 503
 
@@ -119,8 +117,6 @@ async def metrics():
 def signal_handler(sig, frame):
     """Handle shutdown signals"""
     logger.info("Received shutdown signal", signal=sig)
-    if consumer:
-        consumer.cleanup()
     sys.exit(0)
 
 
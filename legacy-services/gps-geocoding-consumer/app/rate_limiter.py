@@ -0,0 +1,57 @@
+"""Async token bucket with a daily quota for the OpenCage API"""
+
+import asyncio
+import time
+from datetime import datetime
+from typing import Optional
+
+import structlog
+
+logger = structlog.get_logger()
+
+
+class AsyncTokenBucket:
+    """
+    Hands out at most `rate` tokens per second (bursts up to `burst`) and at
+    most `daily_limit` per UTC day. Waiters are served in arrival order.
+    """
+
+    def __init__(self, rate: float, burst: int = 1, daily_limit: Optional[int] = None):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.daily_limit = daily_limit
+        self.daily_used = 0
+        self.daily_reset = datetime.utcnow().date()
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _reset_daily_if_needed(self):
+        today = datetime.utcnow().date()
+        if today > self.daily_reset:
+            self.daily_used = 0
+            self.daily_reset = today
+            logger.info("Reset daily API call counter", date=str(today))
+
+    def quota_exhausted(self) -> bool:
+        self._reset_daily_if_needed()
+        return self.daily_limit is not None and self.daily_used >= self.daily_limit
+
+    async def acquire(self) -> bool:
+        """Wait for a token; returns False without waiting once today's quota is spent"""
+        async with self._lock:
+            if self.quota_exhausted():
+                return False
+            if self.rate > 0:
+                self._refill()
+                if self._tokens < 1:
+                    await asyncio.sleep((1 - self._tokens) / self.rate)
+                    self._refill()
+                self._tokens -= 1
+            self.daily_used += 1
+            return True
@@ -0,0 +1,137 @@
+"""In-memory spatial index over cached geocoding points"""
+
+import math
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_METERS = 6371008.8
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_METERS / 180.0
+
+
+def haversine_meters(
+    latitude: float, longitude: float, latitudes: np.ndarray, longitudes: np.ndarray
+) -> np.ndarray:
+    """Great-circle distances in meters from one point to arrays of points (degrees)"""
+    lat1 = math.radians(latitude)
+    lat2 = np.radians(latitudes)
+    dlat = lat2 - lat1
+    dlon = np.radians(longitudes) - math.radians(longitude)
+    a = np.sin(dlat / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class GeoGridIndex:
+    """
+    Equal-area-ish grid of points for radius and nearest-neighbour queries
+
+    Latitude is split into rows of cell_meters; each row is split into as many
+    longitude columns as fit cell_meters at the row's centre latitude, so cells
+    stay roughly square from the equator to the poles, and column indices wrap
+    at the antimeridian. A query only visits the cells its radius overlaps and
+    runs one vectorized haversine over the points found there, so its cost
+    depends on local density rather than on the size of the cache.
+    """
+
+    def __init__(self, cell_meters: float = 100.0):
+        self.cell_meters = cell_meters
+        self._lat_step = cell_meters / METERS_PER_DEGREE
+        self._rows = int(math.ceil(180.0 / self._lat_step))
+        self._cells: Dict[Tuple[int, int], List[int]] = {}
+        self._slots: Dict[Hashable, int] = {}
+        self._keys: List[Hashable] = []
+        self._values: List[Any] = []
+        self._latitudes = np.empty(1024, dtype=np.float64)
+        self._longitudes = np.empty(1024, dtype=np.float64)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _row(self, latitude: float) -> int:
+        return min(self._rows - 1, max(0, int((latitude + 90.0) // self._lat_step)))
+
+    def _columns(self, row: int) -> int:
+        centre = math.radians(-90.0 + (row + 0.5) * self._lat_step)
+        return max(1, int(360.0 * METERS_PER_DEGREE * math.cos(centre) // self.cell_meters))
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        row = self._row(latitude)
+        columns = self._columns(row)
+        return row, int((longitude + 180.0) % 360.0 / 360.0 * columns) % columns
+
+    def cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        """(row, column) of the grid cell containing a point"""
+        return self._cell(latitude, longitude)
+
+    def insert(self, key: Hashable, latitude: float, longitude: float, value: Any = None) -> None:
+        """Add a point, or move and replace it if the key is already indexed"""
+        if key in self._slots:
+            self.remove(key)
+
+        slot = len(self._keys)
+        if slot == len(self._latitudes):
+            self._latitudes = np.resize(self._latitudes, slot * 2)
+            self._longitudes = np.resize(self._longitudes, slot * 2)
+        self._latitudes[slot] = latitude
+        self._longitudes[slot] = longitude
+        self._keys.append(key)
+        self._values.append(value)
+        self._slots[key] = slot
+        self._cells.setdefault(self._cell(latitude, longitude), []).append(slot)
+
+    def remove(self, key: Hashable) -> bool:
+        """Drop a point; its slot is left empty rather than compacted"""
+        slot = self._slots.pop(key, None)
+        if slot is None:
+            return False
+        cell = self._cell(self._latitudes[slot], self._longitudes[slot])
+        self._cells[cell].remove(slot)
+        if not self._cells[cell]:
+            del self._cells[cell]
+        self._values[slot] = None
+        return True
+
+    def _candidates(self, latitude: float, longitude: float, radius: float) -> np.ndarray:
+        """Slots in every cell a circle of radius meters around the point can touch"""
+        lat_delta = radius / METERS_PER_DEGREE
+        # Longitude span of the circle is widest at its most poleward latitude
+        widest = math.cos(math.radians(min(90.0, abs(latitude) + lat_delta)))
+        lon_delta = 360.0 if widest < 1e-9 else radius / (METERS_PER_DEGREE * widest)
+
+        slots: List[int] = []
+        for row in range(self._row(latitude - lat_delta), self._row(latitude + lat_delta) + 1):
+            columns = self._columns(row)
+            first = int(math.floor((longitude - lon_delta + 180.0) / 360.0 * columns))
+            last = int(math.floor((longitude + lon_delta + 180.0) / 360.0 * columns))
+            span = range(columns) if last - first + 1 >= columns else range(first, last + 1)
+            for column in span:
+                slots.extend(self._cells.get((row, column % columns), ()))
+        return np.fromiter(slots, dtype=np.int64, count=len(slots))
+
+    def within(
+        self, latitude: float, longitude: float, radius: float
+    ) -> List[Tuple[Hashable, float, Any]]:
+        """(key, distance_meters, value) of every point within radius, nearest first"""
+        slots = self._candidates(latitude, longitude, radius)
+        if not len(slots):
+            return []
+        distances = haversine_meters(latitude, longitude, self._latitudes[slots], self._longitudes[slots])
+        inside = np.flatnonzero(distances <= radius)
+        order = inside[np.argsort(distances[inside], kind="stable")]
+        return [(self._keys[slots[i]], float(distances[i]), self._values[slots[i]]) for i in order]
+
+    def nearest(
+        self, latitude: float, longitude: float, max_radius: float
+    ) -> Optional[Tuple[Hashable, float, Any]]:
+        """(key, distance_meters, value) of the closest point within max_radius, or None"""
+        slots = self._candidates(latitude, longitude, max_radius)
+        if not len(slots):
+            return None
+        distances = haversine_meters(latitude, longitude, self._latitudes[slots], self._longitudes[slots])
+        best = int(np.argmin(distances))
+        if distances[best] > max_radius:
+            return None
+        return self._keys[slots[best]], float(distances[best]), self._values[slots[best]]
+
+    def any_within(self, latitude: float, longitude: float, radius: float) -> bool:
+        return self.nearest(latitude, longitude, radius) is not None
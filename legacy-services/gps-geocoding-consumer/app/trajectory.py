@@ -0,0 +1,181 @@
+"""Per-device stay-point detection over buffered GPS fixes"""
+
+import itertools
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .spatial_index import haversine_meters
+
+
+def fix_time(value: Any) -> float:
+    """Epoch seconds of a GPS timestamp (ISO 8601, epoch seconds or milliseconds)"""
+    if isinstance(value, (int, float)):
+        return value / 1000.0 if value > 1e11 else float(value)
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+        except ValueError:
+            pass
+    return time.time()
+
+
+class Stay:
+    """A dwell: fixes that stayed within the radius of the first one for the minimum duration"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, device_id: str, latitudes: np.ndarray, longitudes: np.ndarray, times: np.ndarray):
+        self.id = next(self._ids)
+        self.device_id = device_id
+        self.latitude = float(latitudes.mean())
+        self.longitude = float(longitudes.mean())
+        self.started_at = float(times[0])
+        self.last_seen_at = float(times[-1])
+        self.fix_count = len(latitudes)
+        self.geocoded: Optional[Dict[str, Any]] = None
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "stay_id": self.id,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "started_at": datetime.utcfromtimestamp(self.started_at).isoformat() + "Z",
+            "dwell_seconds": round(self.last_seen_at - self.started_at, 1),
+        }
+
+
+class _DeviceTrack:
+    def __init__(self):
+        self.latitudes = np.empty(0, dtype=np.float64)
+        self.longitudes = np.empty(0, dtype=np.float64)
+        self.times = np.empty(0, dtype=np.float64)
+        self.items: List[Any] = []
+        self.stay: Optional[Stay] = None
+        self.last_stay: Optional[Stay] = None
+
+    def drop(self, count: int):
+        self.latitudes = self.latitudes[count:]
+        self.longitudes = self.longitudes[count:]
+        self.times = self.times[count:]
+        self.items = self.items[count:]
+
+
+class StayPointDetector:
+    """
+    Splits each device's fixes into stays and movement
+
+    Fixes are buffered per device until they can be classified. Starting at
+    the oldest buffered fix (the anchor), one vectorized haversine finds the
+    first later fix outside radius_meters. If the fixes before it span at
+    least min_duration_seconds they form a stay; otherwise the anchor was
+    moving and is dropped. While a stay is open every new fix within the
+    radius of its centroid joins it straight away, and a stay that forms
+    again on top of the device's previous one resumes it, so a stray fix does
+    not split a dwell. Only one reverse geocode is needed per stay, whatever
+    the sampling rate.
+
+    The newest fix of a device is always buffered until a later one arrives,
+    so a device that goes quiet would hold its fixes forever; expire() lets
+    the caller give up on them.
+    """
+
+    def __init__(self, radius_meters: float = 50.0, min_duration_seconds: float = 300.0):
+        self.radius_meters = radius_meters
+        self.min_duration_seconds = min_duration_seconds
+        self._tracks: Dict[str, _DeviceTrack] = {}
+        self.stats = {"stays": 0, "stay_fixes": 0, "moving_fixes": 0}
+
+    def add(
+        self, device_id: str, fixes: List[Tuple[float, float, float, Any]]
+    ) -> List[Tuple[Any, Stay]]:
+        """
+        Buffer (latitude, longitude, epoch_seconds, item) fixes in time order and
+        return (item, stay) for every fix now known to belong to a stay
+        """
+        track = self._tracks.setdefault(device_id, _DeviceTrack())
+        fixes = sorted(fixes, key=lambda fix: fix[2])
+        # Fixes older than the buffer (late deliveries) cannot extend it in order
+        if track.times.size:
+            fixes = [fix for fix in fixes if fix[2] >= track.times[-1]]
+        elif track.stay:
+            fixes = [fix for fix in fixes if fix[2] >= track.stay.last_seen_at]
+        if not fixes:
+            return []
+
+        track.latitudes = np.concatenate([track.latitudes, [fix[0] for fix in fixes]])
+        track.longitudes = np.concatenate([track.longitudes, [fix[1] for fix in fixes]])
+        track.times = np.concatenate([track.times, [fix[2] for fix in fixes]])
+        track.items.extend(fix[3] for fix in fixes)
+
+        ready: List[Tuple[Any, Stay]] = []
+        while track.items:
+            # An open stay is measured from its centroid, which is steadier than any single fix
+            if track.stay:
+                anchor = (track.stay.latitude, track.stay.longitude)
+            else:
+                anchor = (track.latitudes[0], track.longitudes[0])
+            outside = haversine_meters(anchor[0], anchor[1], track.latitudes, track.longitudes) > self.radius_meters
+            end = int(np.argmax(outside)) if outside.any() else len(track.items)
+
+            if track.stay:
+                # Extend the open stay up to the first fix that leaves it
+                track.stay.fix_count += end
+                if end:
+                    track.stay.last_seen_at = float(track.times[end - 1])
+                ready.extend((item, track.stay) for item in track.items[:end])
+                track.drop(end)
+                if track.items:
+                    track.last_stay, track.stay = track.stay, None
+                continue
+
+            if end and track.times[end - 1] - track.times[0] >= self.min_duration_seconds:
+                stay = Stay(device_id, track.latitudes[:end], track.longitudes[:end], track.times[:end])
+                last = track.last_stay
+                if last and haversine_meters(
+                    last.latitude, last.longitude, np.array([stay.latitude]), np.array([stay.longitude])
+                )[0] <= self.radius_meters:
+                    # Back where the previous stay was after a stray fix or short trip: resume it
+                    last.fix_count += stay.fix_count
+                    last.last_seen_at = stay.last_seen_at
+                    stay = last
+                else:
+                    self.stats["stays"] += 1
+                track.stay = stay
+                ready.extend((item, stay) for item in track.items[:end])
+                track.drop(end)
+            elif end < len(track.items):
+                # Left the radius too soon: the anchor was moving
+                self.stats["moving_fixes"] += 1
+                track.drop(1)
+            else:
+                break  # Still within the radius but not long enough yet
+
+        self.stats["stay_fixes"] += len(ready)
+        return ready
+
+    def expire(self, before: float, devices: Optional[Iterable[str]] = None) -> List[Any]:
+        """
+        Give up on buffered fixes of devices whose newest fix is older than
+        before (epoch seconds)
+
+        They never reached min_duration_seconds, so they are counted as moving
+        and dropped. Open stays hold no buffered fixes and are left alone.
+        Only the given devices are checked when devices is set. Returns the
+        dropped items.
+        """
+        dropped: List[Any] = []
+        for device_id in list(self._tracks) if devices is None else devices:
+            track = self._tracks.get(device_id)
+            if track is None or not track.items or track.times[-1] >= before:
+                continue
+            dropped.extend(track.items)
+            track.drop(len(track.items))
+        self.stats["moving_fixes"] += len(dropped)
+        return dropped
+
+    def pending(self) -> List[Any]:
+        """Items buffered but not yet classified, across all devices"""
+        return [item for track in self._tracks.values() for item in track.items]
@@ -0,0 +1 @@
+"""Tests for gps-geocoding-consumer service."""
@@ -0,0 +1,76 @@
+"""Unit tests for StayPointDetector."""
+
+from app.trajectory import StayPointDetector
+
+T0 = 1_700_000_000.0
+
+
+def drive(start_offset, count, latitude, longitude, start_time, step_seconds=10.0):
+    """Fixes moving ~110 m north per step, with their offset as the item"""
+    return [
+        (latitude + i * 0.001, longitude, start_time + i * step_seconds, start_offset + i)
+        for i in range(count)
+    ]
+
+
+def dwell(start_offset, count, latitude, longitude, start_time, step_seconds=30.0):
+    return [(latitude, longitude, start_time + i * step_seconds, start_offset + i) for i in range(count)]
+
+
+class TestStayPointDetector:
+    """Test suite for stay detection and buffering."""
+
+    def test_dwell_becomes_stay(self):
+        """Test that fixes within the radius for min_duration_seconds form one stay."""
+        detector = StayPointDetector(radius_meters=50, min_duration_seconds=300)
+
+        ready = detector.add("A", dwell(0, 20, 37.77, -122.42, T0))
+
+        assert [item for item, _ in ready] == list(range(20))
+        assert len({id(stay) for _, stay in ready}) == 1
+        assert detector.pending() == []
+
+    def test_moving_device_keeps_its_last_fix_buffered(self):
+        """Test that the newest fix of a moving device waits for a later one."""
+        detector = StayPointDetector(radius_meters=50, min_duration_seconds=300)
+
+        ready = detector.add("A", drive(0, 20, 37.7, -122.4, T0))
+
+        assert ready == []
+        assert detector.pending() == [19]
+        assert detector.stats["moving_fixes"] == 19
+
+    def test_quiet_device_is_expired(self):
+        """Test that a device that stops reporting no longer holds buffered fixes."""
+        detector = StayPointDetector(radius_meters=50, min_duration_seconds=300)
+        detector.add("A", drive(0, 20, 37.7, -122.4, T0))
+
+        # Another device reports a day later; A has said nothing since
+        later = T0 + 86400
+        detector.add("B", dwell(20, 200, 40.0, -70.0, later))
+        newest = later + 199 * 30.0
+
+        assert detector.expire(newest - 300, ["A", "B"]) == [19]
+        assert detector.pending() == []
+        assert detector.stats["moving_fixes"] == 20
+
+    def test_expire_keeps_recent_and_unlisted_devices(self):
+        """Test that expire only drops devices that are both listed and quiet."""
+        detector = StayPointDetector(radius_meters=50, min_duration_seconds=300)
+        detector.add("A", drive(0, 5, 37.7, -122.4, T0))
+        detector.add("B", drive(5, 5, 40.0, -70.0, T0 + 1000))
+
+        assert detector.expire(T0 + 500, ["B"]) == []
+        assert detector.expire(T0 + 500) == [4]
+        assert sorted(detector.pending()) == [9]
+
+    def test_expired_device_starts_a_new_track(self):
+        """Test that fixes arriving after expiry are classified from scratch."""
+        detector = StayPointDetector(radius_meters=50, min_duration_seconds=300)
+        detector.add("A", drive(0, 3, 37.7, -122.4, T0))
+        detector.expire(T0 + 10_000)
+
+        ready = detector.add("A", dwell(3, 20, 37.8, -122.4, T0 + 20_000))
+
+        assert [item for item, _ in ready] == list(range(3, 23))
+        assert detector.pending() == []
@@ -40,7 +40,7 @@ class HackerNewsHasher(ContentHasher):
         # Create deterministic content string
         content = f"hackernews:{self.VERSION}:story:{story_id_str}:{url_norm}:{timestamp_unix}"
 
-        return self._sha256(content)
+        return self._digest(content)
 
     def generate_hackernews_comment_hash(
         self, comment_id: int, parent_story_id: int, timestamp: Optional[Any] = None
@@ -62,7 +62,7 @@ class HackerNewsHasher(ContentHasher):
 
         content = f"hackernews:{self.VERSION}:comment:{comment_id_str}:{story_id_str}:{timestamp_unix}"
 
-        return self._sha256(content)
+        return self._digest(content)
 
 
 # Singleton instance